@@ -4,26 +4,67 @@ Action Executors - Executes actions based on command intent
 import subprocess
 import platform
 import logging
-import os
 import webbrowser
-import datetime
+from concurrent.futures import TimeoutError as FutureTimeout
 from strands import Agent, tool
 from strands_tools import current_time
+from conversation_memory import BoundedMemoryManager
+from metrics import stage, timed_tool
+from tracing import tracer
+from app_resolver import default_resolver
+from screenshot_encoder import default_encoder
 
 logger = logging.getLogger(__name__)
 
-# Try to import PIL for screenshot functionality
-try:
-    from PIL import ImageGrab
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    logger.warning("PIL/Pillow not available. Screenshot feature will use fallback method.")
+# How long take_screenshot waits for the encoder before replying that the file is still being saved
+SCREENSHOT_REPLY_WAIT = 0.25
+
+def _resolve_app(app_name: str, resolver=None):
+    """
+    Resolves a spoken application name through the trigram resolver (default: the shared one)
+
+    Returns:
+        tuple: (argv or None, Windows executable name, resolved name, clarifying question or None)
+    """
+    resolver = resolver or default_resolver()
+    match = resolver.resolve(app_name)
+    if match.score >= resolver.threshold:
+        if match.score < 1.0:
+            logger.info(f"Resolved '{app_name}' to '{match.name}' (score {match.score:.2f})")
+        return match.command, match.executable or f"{match.name}.exe", match.name, None
+    # Until the index is built, unknown names are tried as given rather than questioned
+    if match.name and resolver.index is not None and resolver.index.ready.is_set():
+        options = ' or '.join(name.title() for name in [match.name] + match.suggestions[:1])
+        return None, None, None, f"Could not find an application called {app_name}. Did you mean {options}?"
+    return None, f"{app_name}.exe", app_name, None
+
+
+def _fallback_command(system: str, name: str, exe_name: str) -> list:
+    """
+    Command for a resolved application the index has no entry for
+
+    macOS opens the application by its (resolved) name; elsewhere the executable's
+    name is run from PATH, e.g. 'code' for "visual studio code".
+    """
+    if system == "Darwin":
+        return ["open", "-a", name]
+    return [exe_name[:-len('.exe')] if exe_name.lower().endswith('.exe') else exe_name]
 
 
 # Define custom tools for Strands Agent
 
+def _tool_failed(result) -> bool:
+    """Tools report failures as text instead of raising"""
+    return str(result).startswith(("Error", "Failed", "Could not", "Sorry", "Unsupported"))
+
+
+def _instrumented(function):
+    """Times a tool for /api/metrics and records it as a span of the current turn"""
+    return timed_tool(failed=_tool_failed)(tracer.traced(f"tool:{function.__name__}")(function))
+
+
 @tool
+@_instrumented
 def open_application(app_name: str) -> str:
     """
     Opens an application on the user's computer.
@@ -44,44 +85,20 @@ def open_application(app_name: str) -> str:
     if app_lower in ['youtube', 'yt']:
         return "Use open_youtube tool to open YouTube in browser"
     
-    # Common application mappings for Windows
-    app_mappings = {
-        'chrome': 'chrome.exe',
-        'google chrome': 'chrome.exe',
-        'firefox': 'firefox.exe',
-        'edge': 'msedge.exe',
-        'microsoft edge': 'msedge.exe',
-        'vscode': 'code.exe',
-        'visual studio code': 'code.exe',
-        'vs code': 'code.exe',
-        'notepad': 'notepad.exe',
-        'calculator': 'calc.exe',
-        'calc': 'calc.exe',
-        'paint': 'mspaint.exe',
-        'spotify': 'spotify.exe',
-        'discord': 'discord.exe',
-        'teams': 'teams.exe',
-        'outlook': 'outlook.exe',
-        'word': 'winword.exe',
-        'microsoft word': 'winword.exe',
-        'excel': 'excel.exe',
-        'microsoft excel': 'excel.exe',
-        'powerpoint': 'powerpnt.exe',
-        'microsoft powerpoint': 'powerpnt.exe',
-        'vlc': 'vlc.exe',
-        'steam': 'steam.exe',
-    }
-    
     try:
         logger.info(f"Attempting to open {app_name} on {system}")
         
+        command, exe_name, name, clarification = _resolve_app(app_name)
+        if clarification:
+            return clarification
+        
         if system == "Windows":
-            # Get the executable name
-            exe_name = app_mappings.get(app_lower, f"{app_name}.exe")
-            
-            # Try to launch using shell
+            # Launch the indexed executable, or let the shell search PATH
             try:
-                subprocess.Popen(exe_name, shell=True)
+                if command:
+                    subprocess.Popen(command)
+                else:
+                    subprocess.Popen(exe_name, shell=True)
                 logger.info(f"Successfully opened {app_name}")
                 return f"Successfully opened {app_name}"
             except Exception as e:
@@ -89,11 +106,11 @@ def open_application(app_name: str) -> str:
                 return f"Could not find or open {app_name}. Make sure it's installed."
                 
         elif system == "Darwin":  # macOS
-            subprocess.Popen(["open", "-a", app_name])
+            subprocess.Popen(command or _fallback_command(system, name, exe_name))
             return f"Successfully opened {app_name}"
             
         elif system == "Linux":
-            subprocess.Popen([app_name])
+            subprocess.Popen(command or _fallback_command(system, name, exe_name))
             return f"Successfully opened {app_name}"
             
         else:
@@ -105,6 +122,7 @@ def open_application(app_name: str) -> str:
 
 
 @tool
+@_instrumented
 def open_youtube() -> str:
     """
     Opens YouTube website in the default web browser.
@@ -122,6 +140,7 @@ def open_youtube() -> str:
 
 
 @tool
+@_instrumented
 def play_music_on_youtube(song_name: str) -> str:
     """
     Plays a song or music video on YouTube by opening it in the default web browser.
@@ -154,7 +173,8 @@ def play_music_on_youtube(song_name: str) -> str:
 
 
 @tool
-def take_screenshot(filename: str = None) -> str:
+@_instrumented
+def take_screenshot(filename: str = None, image_format: str = None, primary_monitor_only: bool = False) -> str:
     """
     Takes a screenshot of all monitors and saves it as an image file.
     
@@ -162,126 +182,48 @@ def take_screenshot(filename: str = None) -> str:
         filename (str, optional): The filename to save the screenshot as.
                                   Examples: "my_photo", "vacation", "screenshot1"
                                   If not provided, defaults to 'screenshot_YYYYMMDD_HHMMSS.png'
+        image_format (str, optional): "png" (default), "jpeg" or "webp" (smaller files)
+        primary_monitor_only (bool, optional): Capture only the main monitor instead of all of them
     
     Returns:
         str: Success message with file path or error message
     """
     try:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if filename is None or not filename.strip():
-            filename = f"screenshot_{timestamp}.png"
-        
-        # Ensure .png extension
-        if not filename.lower().endswith('.png'):
-            filename += ".png"
+        logger.info("Taking screenshot...")
         
-        # Create screenshots directory in Pictures folder
-        screenshots_dir = os.path.join(os.path.expanduser("~"), "Pictures", "VoiceAssistant")
-        os.makedirs(screenshots_dir, exist_ok=True)
-        
-        filepath = os.path.join(screenshots_dir, filename)
-        
-        logger.info(f"Taking screenshot using PIL ImageGrab...")
-        
-        # Take screenshot using PIL ImageGrab
-        screenshot = ImageGrab.grab()
-        screenshot.save(filepath)
-        
-        logger.info(f"Screenshot saved successfully at {filepath}")
-        return f"Screenshot saved at {filepath}"
-   
+        # Only the grab happens here; the image is encoded and written by a pool worker
+        filepath, pending = default_encoder().capture(
+            filename,
+            image_format=image_format,
+            all_screens=False if primary_monitor_only else None
+        )
+        logger.info(f"Screenshot captured, saving to {filepath}")
     except Exception as e:
         logger.error(f"Screenshot capture failed: {e}")
         return f"Sorry, couldn't capture screenshot: {str(e)}"
+    
+    # A quick encode is reported as done; a slow one keeps going and logs its outcome
+    try:
+        pending.result(timeout=SCREENSHOT_REPLY_WAIT)
+    except FutureTimeout:
+        return f"Saving screenshot to {filepath}"
+    except Exception as e:
+        return f"Sorry, couldn't save screenshot: {str(e)}"
+    return f"Screenshot saved at {filepath}"
 
 
 class AppLauncher:
     """Launches applications using subprocess"""
     
-    def __init__(self):
-        self.system = platform.system()
-        
-        # Common application mappings for Windows
-        self.app_mappings = {
-            'chrome': ['chrome.exe', 'Google\\Chrome\\Application\\chrome.exe'],
-            'firefox': ['firefox.exe', 'Mozilla Firefox\\firefox.exe'],
-            'edge': ['msedge.exe', 'Microsoft\\Edge\\Application\\msedge.exe'],
-            'vscode': ['code.exe', 'Microsoft VS Code\\Code.exe'],
-            'visual studio code': ['code.exe', 'Microsoft VS Code\\Code.exe'],
-            'notepad': ['notepad.exe'],
-            'calculator': ['calc.exe'],
-            'paint': ['mspaint.exe'],
-            'spotify': ['spotify.exe', 'Spotify\\Spotify.exe'],
-            'discord': ['discord.exe', 'Discord\\Discord.exe'],
-            'teams': ['teams.exe', 'Microsoft\\Teams\\current\\Teams.exe'],
-            'outlook': ['outlook.exe', 'Microsoft Office\\root\\Office16\\OUTLOOK.EXE'],
-            'word': ['winword.exe', 'Microsoft Office\\root\\Office16\\WINWORD.EXE'],
-            'excel': ['excel.exe', 'Microsoft Office\\root\\Office16\\EXCEL.EXE'],
-            'powerpoint': ['powerpnt.exe', 'Microsoft Office\\root\\Office16\\POWERPNT.EXE'],
-            'vlc': ['vlc.exe', 'VideoLAN\\VLC\\vlc.exe'],
-            'steam': ['steam.exe', 'Steam\\steam.exe'],
-        }
-        
-    def _find_app_windows(self, app_name: str) -> str:
+    def __init__(self, resolver=None):
         """
-        Find application executable on Windows
-        
         Args:
-            app_name: Name of the application
-            
-        Returns:
-            str: Path to executable or empty string if not found
+            resolver: AppResolver to match names with (default: the shared one over the app index)
         """
-        app_lower = app_name.lower()
-        
-        # Check if we have a mapping for this app
-        if app_lower in self.app_mappings:
-            search_names = self.app_mappings[app_lower]
-        else:
-            # Try the app name directly
-            search_names = [f"{app_name}.exe"]
-        
-        # Common installation directories
-        search_paths = [
-            os.path.join(os.environ.get('ProgramFiles', 'C:\\Program Files')),
-            os.path.join(os.environ.get('ProgramFiles(x86)', 'C:\\Program Files (x86)')),
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs'),
-            os.path.join(os.environ.get('APPDATA', '')),
-        ]
-        
-        # Search for the application
-        for search_name in search_names:
-            # Try direct execution first (for system apps)
-            try:
-                subprocess.Popen(search_name, shell=True)
-                return search_name
-            except:
-                pass
-            
-            # Search in common directories
-            for base_path in search_paths:
-                if not base_path:
-                    continue
-                    
-                full_path = os.path.join(base_path, search_name)
-                if os.path.exists(full_path):
-                    return full_path
-                
-                # Also try searching subdirectories
-                try:
-                    for root, dirs, files in os.walk(base_path):
-                        if search_name.split('\\')[-1] in files:
-                            potential_path = os.path.join(root, search_name.split('\\')[-1])
-                            if os.path.exists(potential_path):
-                                return potential_path
-                        # Limit search depth to avoid taking too long
-                        if root.count(os.sep) - base_path.count(os.sep) > 2:
-                            break
-                except:
-                    continue
-        
-        return ""
+        self.system = platform.system()
+        self.resolver = resolver or default_resolver()
+        if self.resolver.index is not None:
+            self.resolver.index.start()
         
     def launch_application(self, app_name: str) -> tuple[bool, str]:
         """
@@ -299,26 +241,26 @@ class AppLauncher:
         try:
             logger.info(f"Attempting to launch {app_name} on {self.system}")
             
+            command, exe_name, name, clarification = _resolve_app(app_name, self.resolver)
+            if clarification:
+                return False, clarification
+            
             if self.system == "Windows":
-                # Try to find and launch on Windows
-                app_path = self._find_app_windows(app_name)
-                
-                if app_path:
-                    try:
-                        subprocess.Popen(app_path, shell=True)
-                        return True, f"Opening {app_name}"
-                    except Exception as e:
-                        logger.error(f"Error launching {app_path}: {e}")
-                        return False, f"Found {app_name} but couldn't launch it"
-                else:
-                    return False, f"Could not find application {app_name}. Try saying the full name."
+                # Launch the indexed executable, or let the shell search PATH for the mapped one
+                app_path = command[0] if command else exe_name
+                try:
+                    subprocess.Popen(app_path, shell=True)
+                    return True, f"Opening {app_name}"
+                except Exception as e:
+                    logger.error(f"Error launching {app_path}: {e}")
+                    return False, f"Found {app_name} but couldn't launch it"
                         
             elif self.system == "Darwin":  # macOS
-                subprocess.Popen(["open", "-a", app_name])
+                subprocess.Popen(command or _fallback_command(self.system, name, exe_name))
                 return True, f"Opening {app_name}"
                 
             elif self.system == "Linux":
-                subprocess.Popen([app_name])
+                subprocess.Popen(command or _fallback_command(self.system, name, exe_name))
                 return True, f"Opening {app_name}"
                 
             else:
@@ -359,8 +301,17 @@ class MusicPlayer:
 class QuestionAnswerer:
     """Answers questions and executes commands using Strands Agents LLM with custom tools"""
     
-    def __init__(self):
-        """Initializes the Strands Agents LLM client with all tools and system prompt"""
+    def __init__(self, cache=None, conversation_manager=None):
+        """
+        Initializes the Strands Agents LLM client with all tools and system prompt
+        
+        Args:
+            cache: Optional ResponseCache consulted before calling the agent
+            conversation_manager: Strands conversation manager bounding the history
+                                  (defaults to a BoundedMemoryManager)
+        """
+        self.cache = cache
+        self.conversation_manager = conversation_manager or BoundedMemoryManager()
         try:
             # System prompt to configure agent behavior
             system_prompt = """You are a helpful voice assistant and Your name is AI Buddy. Follow these rules:
@@ -384,20 +335,22 @@ class QuestionAnswerer:
             # Initialize agent with all tools and system prompt
             self.agent = Agent(
                 tools=[current_time, open_application, open_youtube, play_music_on_youtube, take_screenshot],
-                system_prompt=system_prompt
+                system_prompt=system_prompt,
+                conversation_manager=self.conversation_manager
             )
             logger.info("Strands Agent initialized with open_youtube tool, screenshot tool, IST timezone and concise response mode")
         except Exception as e:
             logger.error(f"Error initializing Strands Agent: {e}")
             self.agent = None
     
-    def answer_question(self, question: str) -> str:
+    def answer_question(self, question: str, on_token=None) -> str:
         """
         Processes user input using Strands Agents LLM with tools
         The agent can answer questions, open applications, open YouTube, play music, and take screenshots
         
         Args:
             question: The user's input/question/command
+            on_token: Optional callback receiving each text delta as the model generates it
             
         Returns:
             str: The response from the agent
@@ -408,12 +361,99 @@ class QuestionAnswerer:
         if self.agent is None:
             return "I'm having trouble connecting. Please try again later."
         
+        # The cache only answers questions that stand on their own (follow-ups that refer
+        # back to this session's earlier turns always go to its Agent), at any turn
+        use_cache = self.cache is not None
+        if use_cache:
+            cached = self.cache.get(question)
+            if cached is not None:
+                logger.info(f"Serving cached response for: {question}")
+                tracer.event('response_cache_hit')
+                self._remember_turn(question, cached)
+                return cached
+        
         try:
             logger.info(f"Processing user input: {question}")
-            response = self.agent(question)
+            with stage('agent'), tracer.span('agent'):
+                if on_token is None:
+                    response = self.agent(question)
+                else:
+                    response = self.agent(question, callback_handler=self._token_handler(on_token))
             logger.info(f"Agent response: {response}")
+            
+            if use_cache:
+                self.cache.put(question, str(response), tools_used=self._tools_used_last_turn())
             return response
             
         except Exception as e:
             logger.error(f"Error processing input: {e}")
             return "I'm sorry, I couldn't process that. Please try again."
+    
+    def _remember_turn(self, question: str, answer: str) -> None:
+        """Adds a turn answered from the cache to the Agent's conversation, so follow-ups keep their context"""
+        self.agent.messages.append({'role': 'user', 'content': [{'text': question}]})
+        self.agent.messages.append({'role': 'assistant', 'content': [{'text': answer}]})
+        try:
+            self.conversation_manager.apply_management(self.agent)
+        except Exception as e:
+            logger.error(f"Error trimming conversation after cached answer: {e}")
+    
+    def history(self) -> list:
+        """
+        Returns the Agent's conversation so another worker can continue it
+
+        Returns:
+            list: The Agent's messages (empty if the Agent could not be created)
+        """
+        return list(getattr(self.agent, 'messages', None) or [])
+    
+    def load_history(self, messages: list) -> None:
+        """
+        Replaces the Agent's conversation with one saved by another worker
+        
+        Args:
+            messages: Messages previously returned by history()
+        """
+        if self.agent is None:
+            return
+        self.agent.messages[:] = messages
+        if hasattr(self.conversation_manager, 'restore_summary'):
+            self.conversation_manager.restore_summary(messages)
+    
+    def memory_stats(self) -> dict:
+        """
+        Returns the conversation manager's prompt size metrics
+        
+        Returns:
+            dict: Estimated prompt tokens per turn and trimmed message counts
+        """
+        return self.conversation_manager.stats()
+    
+    def _tools_used_last_turn(self) -> set:
+        """
+        Collects the names of tools the agent called while answering the latest prompt
+        
+        Walks the conversation backwards to the user's text prompt, so it still works
+        after older messages have been trimmed from the front of the history.
+        """
+        tools = set()
+        for message in reversed(getattr(self.agent, 'messages', None) or []):
+            content = message.get('content') or []
+            if message.get('role') == 'user' and any('text' in block for block in content):
+                break
+            for block in content:
+                if 'toolUse' in block:
+                    tools.add(block['toolUse'].get('name'))
+        return tools
+    
+    @staticmethod
+    def _token_handler(on_token):
+        """Builds a Strands callback handler that forwards streamed text deltas"""
+        def handler(**kwargs):
+            data = kwargs.get("data")
+            if data:
+                try:
+                    on_token(data)
+                except Exception as e:
+                    logger.error(f"Error in token callback: {e}")
+        return handler
@@ -3,54 +3,259 @@ Flask Backend Server - Replaces Tkinter UI with REST API + WebSocket
 """
 import logging
 import threading
+import time
 import queue
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit, join_room
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from speech_engine import SpeechEngine
+from speech_pipeline import SpeechPipeline
+from speech_cache import SpeechCache, DEFAULT_PHRASES
+from tts_scheduler import TTSScheduler
+from audio_streamer import AudioStreamer
 from action_executors import QuestionAnswerer
+from job_executor import AgentJobExecutor
+from models import JobStatus, SpeechPriority
+from sentence_buffer import SentenceBuffer
+from response_cache import ResponseCache
+from command_router import CommandRouter
+from session_pool import AgentSessionPool
+from lazy_component import LazyComponent
+from conversation_memory import BoundedMemoryManager
+from session_store import create_session_store
+from socketio_bus import socketio_options
+from socket_rooms import VOICE_ROOM, OBSERVER_ROOM, FanoutCounter, session_rooms
+from status_publisher import StatusPublisher
+from tracing import tracer, current_context
+from log_pipeline import configure_logging, parse_sample_rates
+from app_index import default_index
+from app_resolver import default_resolver
+import metrics
 import json
+import uuid
+import os
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('voice_assistant.log'),
-        logging.StreamHandler()
-    ]
+# Configure logging: handlers run on a background listener, the log file rotates
+# (not in screenshot encoder processes, which re-import this script as __mp_main__)
+log_pipeline = None if __name__ == '__mp_main__' else configure_logging(
+    os.environ.get('LOG_FILE', 'voice_assistant.log') or None,
+    level=getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO),
+    max_bytes=int(float(os.environ.get('LOG_MAX_MB', '10')) * 1024 * 1024),
+    backup_count=int(os.environ.get('LOG_BACKUPS', '5')),
+    rotate_when=os.environ.get('LOG_ROTATE_WHEN') or None,
+    sample_rates=parse_sample_rates(os.environ.get('LOG_SAMPLE', '')),
+    max_message_chars=int(os.environ.get('LOG_MAX_CHARS', '1000'))
 )
 
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app with correct React build paths
-import os
 react_build_path = os.path.join(os.path.dirname(__file__), 'react-app', 'build')
 app = Flask(__name__, 
             template_folder=react_build_path,
             static_folder=os.path.join(react_build_path, 'static'),
             static_url_path='/static')
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With SOCKETIO_MESSAGE_QUEUE set, broadcasts reach clients connected to any worker or host
+socketio = SocketIO(app, cors_allowed_origins="*",
+                    **socketio_options(os.environ.get('SOCKETIO_MESSAGE_QUEUE'),
+                                       channel=os.environ.get('SOCKETIO_CHANNEL', 'voice-assistant')))
+
+# Sent many times per turn; tracing or fan-out counting each one would cost more than it tells
+UNTRACED_EVENTS = ('assistant_message_delta', 'tts_audio_chunk')
 
 # Global state
 class VoiceAssistantServer:
     def __init__(self):
-        self.speech_engine = SpeechEngine()
-        self.question_answerer = QuestionAnswerer()
+        # One JSONL span per hop of every turn, keyed by the turn's request id (empty TRACE_FILE disables)
+        tracer.configure(
+            os.environ.get('TRACE_FILE', 'voice_traces.jsonl'),
+            max_bytes=int(float(os.environ.get('TRACE_MAX_MB', '10')) * 1024 * 1024),
+            backup_count=int(os.environ.get('TRACE_BACKUPS', '3'))
+        )
+        # Rendered audio for repeated phrases, keyed by text + voice + rate
+        tts_cache_mb = float(os.environ.get('TTS_CACHE_MAX_MB', '50'))
+        self.speech_cache = SpeechCache(
+            directory=os.environ.get('TTS_CACHE_DIR', '.tts_cache'),
+            max_bytes=int(tts_cache_mb * 1024 * 1024)
+        ) if tts_cache_mb > 0 else None
+        extra_phrases = [phrase.strip() for phrase in os.environ.get('TTS_PRERENDER', '').split('|') if phrase.strip()]
+        self.prerender_phrases = DEFAULT_PHRASES + extra_phrases
+        # Audio and the Agent are built on first use (or by warm_up), not at import time
+        self._speech_engine = LazyComponent('speech_engine', self._build_speech_engine)
+        self._speech_prepared = False
+        # Asks the TTS thread to build the engine; set by it once a build attempt finished
+        self._speech_warm_up = threading.Event()
+        self._speech_built = threading.Event()
+        # Conversations, job statuses and connected clients; Redis when running several workers
+        store_url = os.environ.get('SESSION_STORE_URL')
+        self.session_store = create_session_store(store_url,
+                                                  ttl_seconds=float(os.environ.get('SESSION_TTL', '86400')))
+        cache_size = int(os.environ.get('RESPONSE_CACHE_SIZE', '256'))
+        self.response_cache = ResponseCache(
+            max_entries=cache_size,
+            ttl_seconds=float(os.environ.get('RESPONSE_CACHE_TTL', '3600'))
+        ) if cache_size > 0 else None
+        # One Agent conversation per client; Agents are built lazily or taken from warm spares
+        self.session_pool = AgentSessionPool(
+            factory=lambda: QuestionAnswerer(
+                cache=self.response_cache,
+                conversation_manager=BoundedMemoryManager(
+                    max_turns=int(os.environ.get('MEMORY_MAX_TURNS', '10')),
+                    max_tokens=int(os.environ.get('MEMORY_MAX_TOKENS', '4000'))
+                )
+            ),
+            max_sessions=int(os.environ.get('AGENT_MAX_SESSIONS', '64')),
+            max_concurrent=int(os.environ.get('AGENT_MAX_CONCURRENT', '4')),
+            idle_timeout=float(os.environ.get('AGENT_IDLE_TIMEOUT', '900')),
+            spare_count=int(os.environ.get('AGENT_SPARES', '1')),
+            store=self.session_store if store_url else None
+        )
+        self.router = CommandRouter(
+            self.session_pool.session('default'),
+            threshold=float(os.environ.get('ROUTER_CONFIDENCE', '0.8'))
+        )
         self.running = False
         self.voice_thread = None
         self.listening = False
         self.message_queue = queue.Queue()
-        self.tts_queue = queue.Queue()
+        # Recipients per emitted event; events go to the originating session, not to everyone
+        self.fanout = FanoutCounter()
+        self.socket_tokens = {}
+        # Listening state is published once it settles; capture timeouts flip it off and on constantly
+        self.status = StatusPublisher(
+            publish=lambda state: self.emit_session('status', state),
+            debounce_seconds=float(os.environ.get('STATUS_DEBOUNCE_MS', '300')) / 1000,
+            initial={'listening': False, 'running': False}
+        )
+        # 'speaker' plays on this machine; 'client' streams audio to the browser that asked
+        self.tts_output = os.environ.get('TTS_OUTPUT', 'speaker')
+        self.audio_streamer = AudioStreamer(
+            synthesize=lambda text: self.speech_engine.synthesize(text),
+            emit=self._emit_to,
+            encoding=os.environ.get('TTS_AUDIO_ENCODING', 'mulaw'),
+            chunk_ms=int(os.environ.get('TTS_CHUNK_MS', '100'))
+        ) if self.tts_output == 'client' else None
+        # Prioritized, bounded speech queue; stale answers are cut off by newer speech
+        self.tts_scheduler = TTSScheduler(
+            max_depth=int(os.environ.get('TTS_MAX_DEPTH', '16')),
+            stop_speaking=self._stop_local_speech if self.audio_streamer is None else None
+        )
+        self.barge_in = os.environ.get('TTS_BARGE_IN', '1') == '1'
+        self.stream_responses = os.environ.get('STREAM_RESPONSES', '1') == '1'
+        self.persistent_mic = os.environ.get('MIC_PERSISTENT', '1') == '1'
+        # Capture the next phrase while earlier ones are still being recognized
+        self.use_speech_pipeline = os.environ.get('SPEECH_PIPELINE', '1') == '1'
+        self.speech_pipeline = None
+        self.job_executor = AgentJobExecutor(
+            handler=self._run_job,
+            max_workers=int(os.environ.get('AGENT_WORKERS', '4')),
+            max_pending=int(os.environ.get('AGENT_MAX_PENDING', '32'))
+        )
+        self._agent = LazyComponent('agent', self.session_pool.warm_up)
+        self._register_gauges()
         self.tts_thread = threading.Thread(target=self._tts_worker, daemon=True)
         self.tts_thread.start()
         logger.info("TTS worker thread started")
+    
+    @property
+    def speech_engine(self) -> SpeechEngine:
+        """
+        The SpeechEngine, built on the TTS thread on first access
+        
+        pyttsx3 must be created and driven on one thread, so other threads (the listen
+        loop) ask the TTS thread to build it and wait.
+        
+        Raises:
+            RuntimeError: If the engine could not be built
+        """
+        if self._speech_engine.ready or threading.current_thread() is self.tts_thread:
+            return self._speech_engine.get()
+        self._speech_warm_up.set()
+        self.tts_scheduler.wake()
+        self._speech_built.wait()
+        if not self._speech_engine.ready:
+            raise RuntimeError(f"Speech engine unavailable: {self._speech_engine.status()['error']}")
+        return self._speech_engine.get()
+    
+    def _build_speech_engine(self) -> SpeechEngine:
+        """Initializes the TTS driver, recognizer and speech-to-text backends"""
+        return SpeechEngine(
+            stt_backend=os.environ.get('STT_BACKEND', 'google'),
+            stt_fallback=os.environ.get('STT_FALLBACK', 'google'),
+            stt_options={
+                'vosk_model_path': os.environ.get('VOSK_MODEL_PATH'),
+                'whisper_model': os.environ.get('WHISPER_MODEL'),
+                'whisper_compute_type': os.environ.get('WHISPER_COMPUTE_TYPE'),
+                'whisper_threads': os.environ.get('WHISPER_THREADS'),
+            },
+            speech_cache=self.speech_cache
+        )
+    
+    def start_warm_up(self, prompt: str = None):
+        """Build components in the background right after boot"""
+        # Installed applications are indexed (or the saved index refreshed) on their own thread
+        default_index().start()
+        threading.Thread(target=self.warm_up, args=(prompt,), daemon=True, name='warm-up').start()
+    
+    def warm_up(self, prompt: str = None):
+        """
+        Build a spare Agent before the first request needs it, and have the TTS thread
+        build the speech engine meanwhile
+        
+        Args:
+            prompt: Optional dummy prompt sent once so the model connection is warm too
+        """
+        start = time.perf_counter()
+        # The engine is built and common phrases pre-rendered on the TTS thread, which owns pyttsx3
+        self._speech_warm_up.set()
+        self.tts_scheduler.wake()
+        try:
+            self._agent.get()
+            if prompt:
+                try:
+                    self.session_pool.answer_question('warm-up', prompt)
+                finally:
+                    self.session_pool.close_session('warm-up')
+        except Exception as e:
+            logger.error(f"Agent warm-up failed: {e}")
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+    
+    def readiness(self) -> dict:
+        """Per-component readiness for /api/ready"""
+        agent = self._agent.status()
+        # Sessions built on demand also prove the Agent can be constructed
+        agent['ready'] = agent['ready'] or self.session_pool.stats()['created'] > 0
+        components = {
+            'speech_engine': self._speech_engine.status(),
+            'agent': agent,
+            'tts_worker': {'ready': self.tts_thread.is_alive()},
+        }
+        return {'ready': all(component['ready'] for component in components.values()), 'components': components}
+    
+    def _register_gauges(self):
+        """Queue depths and in-flight work, read only when /api/metrics is scraped"""
+        metrics.Gauge('voice_tts_queue_depth', 'Utterances waiting to be spoken', callback=self.tts_scheduler.depth)
+        metrics.Gauge('voice_message_queue_depth', 'Messages waiting in the server message queue',
+                      callback=self.message_queue.qsize)
+        metrics.Gauge('voice_agent_calls_in_flight', 'Agent calls running right now',
+                      callback=lambda: self.session_pool.active_calls)
+        metrics.Gauge('voice_jobs_pending', 'Queued or running text commands', callback=self.job_executor.pending_count)
+        metrics.Gauge('voice_active_sockets', 'Socket.IO clients connected to this worker',
+                      callback=lambda: FanoutCounter.count(socketio.server.manager, None))
+        metrics.Gauge('process_resident_memory_bytes', 'Resident memory of this worker',
+                      callback=metrics.resident_memory_bytes)
+    
+    def _stop_local_speech(self):
+        """Cut off speech on this machine's speakers, if anything was ever spoken"""
+        if self._speech_engine.ready:
+            self.speech_engine.stop_speaking()
         
     def start_listening(self):
         """Start voice input in background thread"""
         if not self.running:
             self.running = True
+            self.status.update(running=True)
             self.voice_thread = threading.Thread(target=self._listen_loop, daemon=True)
             self.voice_thread.start()
             logger.info("Started listening thread")
@@ -58,87 +263,305 @@ class VoiceAssistantServer:
     def stop_listening(self):
         """Stop voice input"""
         self.running = False
+        self.status.update(running=False)
+        if self.speech_pipeline:
+            self.speech_pipeline.stop()
         if self.voice_thread:
             self.voice_thread.join(timeout=2)
         logger.info("Stopped listening thread")
     
-    def speak_async(self, text: str):
-        """Queue text for asynchronous speech"""
-        self.tts_queue.put(text)
+    def submit_text_command(self, text: str, session_id: str = None, on_queued=None):
+        """Queue a text command for the agent and deliver the reply over WebSocket when done"""
+        job = self.job_executor.submit(text, on_complete=self._on_job_complete, on_queued=on_queued,
+                                       session_id=session_id)
+        if job is not None:
+            self._record_job(job)
+        return job
+    
+    def get_job(self, job_id: str):
+        """Status dict of a job queued on this or any other worker, or None"""
+        job = self.job_executor.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            return self.session_store.get_job(job_id)
+        except Exception as e:
+            logger.error(f"Error reading job {job_id} from the session store: {e}")
+            return None
+    
+    def _record_job(self, job):
+        """Publish a job's status so /api/jobs/<id> works on every worker"""
+        try:
+            self.session_store.put_job(job.to_dict())
+        except Exception as e:
+            logger.error(f"Error recording job {job.id} in the session store: {e}")
+    
+    def _run_job(self, job):
+        """Answer a queued text command (runs on an agent worker thread)"""
+        with tracer.span('turn', trace_id=job.id, source='text', session=job.session_id):
+            tracer.record('job_queue_wait', job.created_at.timestamp(), time.time())
+            return self.respond(job.text, request_id=job.id, session_id=job.session_id)
+    
+    def _on_job_complete(self, job):
+        """Emit the finished job's reply (runs on the agent worker thread)"""
+        self._record_job(job)
+        if job.status == JobStatus.COMPLETED:
+            self.emit_session('assistant_message', {'text': job.result, 'request_id': job.id}, job.session_id)
+        else:
+            self.emit_session('error', {'message': job.error, 'request_id': job.id}, job.session_id)
+    
+    def respond(self, text: str, request_id: str = None, session_id: str = None) -> str:
+        """
+        Get the agent's reply and queue it for speech
+        
+        In streaming mode every token is emitted as assistant_message_delta and each
+        finished sentence is spoken while the model is still generating. The caller
+        still emits the final assistant_message to close the turn.
+        
+        Args:
+            text: The user's input/question/command
+            request_id: Id attached to streamed deltas so clients can match them to the turn
+            session_id: Client session whose Agent conversation should answer (voice input uses 'voice')
+            
+        Returns:
+            str: The complete response text
+        """
+        answerer = self.session_pool.session(session_id or 'voice')
+        group = request_id or uuid.uuid4().hex
+        target = self._audio_target(session_id)
+        # In client mode nobody hears a session without a connected browser
+        audible = self.audio_streamer is None or target is not None
+        started = []
+        
+        def speak(sentence):
+            if not audible:
+                return
+            # The first sentence of a newer answer cuts off whatever older answer is playing
+            if not started:
+                started.append(True)
+                if self.barge_in:
+                    self._barge_in(keep_group=group, target=target)
+            self.speak_async(sentence, group=group, target=target)
+        
+        with tracer.span('respond', trace_id=group, session=session_id or 'voice'):
+            if not self.stream_responses:
+                response_text = self._route(text, answerer)
+                speak(response_text)
+                return response_text
+            
+            sentences = SentenceBuffer()
+            
+            def on_token(delta):
+                if not sentences.received:
+                    tracer.event('first_token')
+                self.emit_session('assistant_message_delta', {'text': delta, 'request_id': request_id}, session_id)
+                for sentence in sentences.feed(delta):
+                    speak(sentence)
+            
+            response_text = self._route(text, answerer, on_token=on_token)
+            
+            if sentences.received:
+                tail = sentences.flush()
+                if tail:
+                    speak(tail)
+            else:
+                # Nothing was streamed (fast path, cache hit or fallback message), speak the whole reply
+                speak(response_text)
+            return response_text
+    
+    def _route(self, text: str, answerer, on_token=None) -> str:
+        """Route one turn, recording whether the fast path answered it"""
+        with tracer.span('route') as span:
+            result = self.router.route(text, on_token=on_token, question_answerer=answerer)
+            span['fast_path'] = result.fast_path
+            span['intent'] = result.intent.value
+        return result.response
+    
+    def speak_async(self, text: str, priority: SpeechPriority = SpeechPriority.RESPONSE, group: str = None,
+                    target: str = None):
+        """Queue text for asynchronous speech (duplicates of waiting text are coalesced)"""
+        self.tts_scheduler.put(text, priority=priority, group=group, target=target, trace=current_context())
+    
+    def _audio_target(self, session_id: str = None):
+        """Room that should receive streamed audio (None: the local speaker, or no connected client)"""
+        if self.audio_streamer is None:
+            return None
+        if session_id is None:
+            return VOICE_ROOM
+        return session_id if self.session_store.has_client(session_id) else None
+    
+    def _barge_in(self, keep_group: str = None, target: str = None):
+        """Cut off stale speech, queued or already playing in a browser"""
+        self.tts_scheduler.barge_in(keep_group=keep_group, target=target)
+        if self.audio_streamer is not None:
+            self.audio_streamer.stop(keep_group=keep_group, target=target)
+    
+    def emit_session(self, event: str, payload: dict, session_id: str = None):
+        """Emit a conversation event to its session (None: the voice conversation) and to observers"""
+        self._emit_to(event, payload, session_rooms(session_id))
+    
+    def _emit_to(self, event: str, payload: dict, target=None):
+        """Emit to a room or list of rooms, or to everyone when target is None"""
+        # Counting walks the room membership; skipped for token deltas and audio chunks
+        if event not in UNTRACED_EVENTS:
+            recipients = FanoutCounter.count(socketio.server.manager, target)
+            self.fanout.record(event, recipients)
+            tracer.event(f"emit:{event}", recipients=recipients)
+        socketio.emit(event, payload, to=target)
     
     def _tts_worker(self):
         """Background thread that handles all TTS requests"""
         logger.info("TTS worker started and ready")
         while True:
             try:
-                text = self.tts_queue.get(timeout=1)
-                if text is None:
-                    break
+                utterance = self.tts_scheduler.get_utterance(timeout=1)
+                if utterance is None:
+                    if self._speech_warm_up.is_set():
+                        self._prepare_speech()
+                    continue
                 
                 try:
+                    tracer.record('tts_queue_wait', utterance.enqueued_at, time.time(), parent=utterance.trace)
+                    self._prepare_speech()
+                    if self.audio_streamer is None:
+                        # A barge-in from here on stops this utterance; one before it skips it
+                        self.speech_engine.reset_stop()
+                        if not self.tts_scheduler.is_current(utterance):
+                            logger.info("TTS worker: utterance cancelled before it started")
+                            continue
+                    text = utterance.text
                     preview = text[:50] + "..." if len(text) > 50 else text
                     logger.info(f"TTS worker speaking: {preview}")
-                    self.speech_engine.speak(text)
+                    with metrics.stage('tts'), tracer.span('tts', parent=utterance.trace, chars=len(text)):
+                        if self.audio_streamer is not None:
+                            self.audio_streamer.stream(text, target=utterance.target, group=utterance.group)
+                        else:
+                            self.speech_engine.speak(text)
                     logger.info("TTS worker: speech completed")
                 except Exception as e:
                     logger.error(f"TTS worker error: {e}", exc_info=True)
-            except queue.Empty:
-                pass
+                finally:
+                    self.tts_scheduler.task_done()
             except Exception as e:
                 logger.error(f"TTS worker unexpected error: {e}", exc_info=True)
     
+    def _prepare_speech(self):
+        """Build the speech engine and pre-render common phrases once, on the TTS thread"""
+        if self._speech_prepared:
+            return
+        # pyttsx3 must only be created and driven from one thread
+        try:
+            engine = self._speech_engine.get()
+        except Exception:
+            # Logged by LazyComponent; retried when speech is asked for again
+            self._speech_warm_up.clear()
+            return
+        finally:
+            self._speech_built.set()
+        self._speech_prepared = True
+        try:
+            engine.prerender(self.prerender_phrases)
+        except Exception as e:
+            logger.error(f"Error pre-rendering speech: {e}", exc_info=True)
+    
     def _listen_loop(self):
         """Main listening loop"""
-        while self.running:
-            try:
-                self.listening = True
-                with app.app_context():
-                    socketio.emit('status', {'listening': True}, to=None)
-                
-                # Listen for voice input
+        # Keep one microphone stream open for the whole session instead of per phrase
+        if self.persistent_mic:
+            self.speech_engine.open_microphone()
+        try:
+            self._listen_turns()
+        finally:
+            if self.persistent_mic:
+                self.speech_engine.close_microphone()
+    
+    def _listen_turns(self):
+        """Listen and answer until stopped"""
+        if not self.use_speech_pipeline:
+            while self.running:
+                self._set_listening(True)
+                started = time.time()
                 text = self.speech_engine.listen()
-                
-                self.listening = False
-                with app.app_context():
-                    socketio.emit('status', {'listening': False}, to=None)
-                
-                if not text:
-                    continue
-                
-                # Check for exit command
-                if text.lower().strip() in ['bye', 'goodbye', 'exit', 'quit', 'stop']:
-                    with app.app_context():
-                        socketio.emit('user_message', {'text': text}, to=None)
-                        response = "Goodbye! Have a great day!"
-                        socketio.emit('assistant_message', {'text': response}, to=None)
-                    self.speak_async(response)
-                    self.running = False
-                    continue
-                
-                # Add user message
-                with app.app_context():
-                    socketio.emit('user_message', {'text': text}, to=None)
-                
-                # Get response from AI
-                response = self.question_answerer.answer_question(text)
-                response_text = str(response)  # Convert AgentResult to string
-                
-                # Send response
-                with app.app_context():
-                    socketio.emit('assistant_message', {'text': response_text}, to=None)
-                
-                # Queue for async speech
-                self.speak_async(response_text)
-                
-            except Exception as e:
-                logger.error(f"Error in listening loop: {e}")
-                self.listening = False
-                with app.app_context():
-                    socketio.emit('status', {'listening': False}, to=None)
-                    socketio.emit('error', {'message': str(e)}, to=None)
+                self._set_listening(False)
+                if text:
+                    self._handle_utterance(text, {'listen_start': started, 'listen_end': time.time()})
+            return
+        
+        self.speech_pipeline = SpeechPipeline(
+            self.speech_engine,
+            buffer_size=int(os.environ.get('SPEECH_BUFFER', '8')),
+            recognizers=int(os.environ.get('SPEECH_RECOGNIZERS', '2')),
+            on_listening=self._set_listening
+        )
+        self.speech_pipeline.start()
+        try:
+            # Phrases arrive in spoken order while the next one is already being captured
+            for text, timings in self.speech_pipeline.timed_results():
+                if not self.running:
+                    break
+                self._handle_utterance(text, timings)
+        finally:
+            self.speech_pipeline.stop()
+            self._set_listening(False)
+    
+    def _set_listening(self, listening: bool):
+        """Track whether the microphone is capturing; clients hear about it once the state settles"""
+        self.listening = listening
+        self.status.update(listening=listening)
+    
+    def _handle_utterance(self, text: str, timings: dict = None):
+        """
+        Answer one recognized phrase
+        
+        Args:
+            text: The recognized phrase
+            timings: Epoch seconds of the capture/stt (or listen) stages that produced it
+        """
+        # Correlation id of this turn: spans, emits and queued speech all carry it
+        request_id = uuid.uuid4().hex
+        # Capture and recognition finished before the id existed; they precede the turn span
+        for name in ('capture', 'stt', 'listen'):
+            if timings and f'{name}_start' in timings and f'{name}_end' in timings:
+                tracer.record(name, timings[f'{name}_start'], timings[f'{name}_end'], trace_id=request_id)
+        with tracer.span('turn', trace_id=request_id, source='voice'):
+            self._answer_utterance(text, request_id)
+    
+    def _answer_utterance(self, text: str, request_id: str):
+        """Answer a recognized phrase inside its turn's trace"""
+        try:
+            # The user spoke again: stop reading out the previous answer (to the voice session only)
+            if self.barge_in:
+                self._barge_in(target=self._audio_target())
+            
+            # Check for exit command
+            if self.router.is_exit(text):
+                self.emit_session('user_message', {'text': text, 'request_id': request_id})
+                response = CommandRouter.EXIT_RESPONSE
+                self.emit_session('assistant_message', {'text': response, 'request_id': request_id})
+                self.speak_async(response, priority=SpeechPriority.SYSTEM)
+                self.running = False
+                self.status.update(running=False)
+                return
+            
+            # Add user message
+            self.emit_session('user_message', {'text': text, 'request_id': request_id})
+            
+            # Get response from AI (streamed and spoken sentence by sentence)
+            response_text = self.respond(text, request_id=request_id)
+            
+            # Send response
+            self.emit_session('assistant_message', {'text': response_text, 'request_id': request_id})
+            
+        except Exception as e:
+            logger.error(f"Error in listening loop: {e}")
+            self.emit_session('error', {'message': str(e)})
 
-# Initialize server
-assistant_server = VoiceAssistantServer()
+# Initialize server (cheap; heavy components are built by the warm-up thread or on first use).
+# Screenshot encoder processes re-import this script as __mp_main__; they must not start a server.
+if __name__ != '__mp_main__':
+    assistant_server = VoiceAssistantServer()
+    if os.environ.get('WARMUP', '1') == '1':
+        assistant_server.start_warm_up(os.environ.get('WARMUP_PROMPT') or None)
 
 # REST API Routes
 @app.route('/')
@@ -151,6 +574,17 @@ def health():
     """Health check endpoint"""
     return jsonify({'status': 'ok', 'service': 'Voice Assistant API'})
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 once every component is built, 503 with per-component status before that"""
+    status = assistant_server.readiness()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/api/status', methods=['GET'])
+def status():
+    """Latest listening state, without waiting for the next status event"""
+    return jsonify({'success': True, **assistant_server.status.snapshot()})
+
 @app.route('/api/start-listening', methods=['POST'])
 def start_listening():
     """Start listening for voice input"""
@@ -181,26 +615,97 @@ def text_command():
         if not text:
             return jsonify({'success': False, 'error': 'Empty text'}), 400
         
-        # Process command
-        response = assistant_server.question_answerer.answer_question(text)
-        response_text = str(response)  # Convert AgentResult to string
-        
-        # Emit messages via WebSocket to all clients
-        socketio.emit('user_message', {'text': text}, to=None)
-        socketio.emit('assistant_message', {'text': response_text}, to=None)
-        
-        # Queue for async speech
-        assistant_server.speak_async(response_text)
+        # Queue command for the agent; the reply is pushed later as assistant_message
+        # Clients that want their own conversation send a session token
+        session_id = request.headers.get('X-Session-Id') or data.get('session_id') or 'http'
+        job = assistant_server.submit_text_command(
+            text,
+            session_id=session_id,
+            on_queued=lambda job: assistant_server.emit_session('user_message', {'text': text, 'request_id': job.id},
+                                                                session_id)
+        )
+        if job is None:
+            return jsonify({'success': False, 'error': 'Server busy, try again shortly'}), 503
         
         return jsonify({
             'success': True,
-            'response': response_text,
+            'request_id': job.id,
+            'status': job.status.value,
             'user_message': text
-        })
+        }), 202
     except Exception as e:
         logger.error(f"Error processing text command: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of a queued text command (for polling clients)"""
+    job = assistant_server.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown request id'}), 404
+    return jsonify({'success': True, **job})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache hit/miss/eviction counters"""
+    if assistant_server.response_cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({'success': True, 'enabled': True, **assistant_server.response_cache.stats()})
+
+@app.route('/api/speech/stats', methods=['GET'])
+def speech_stats():
+    """Real-time factor and fallbacks per speech-to-text backend"""
+    if not assistant_server._speech_engine.ready:
+        return jsonify({'success': True, 'ready': False})
+    return jsonify({'success': True, 'ready': True, **assistant_server.speech_engine.recognition_stats()})
+
+@app.route('/api/speech-cache/stats', methods=['GET'])
+def speech_cache_stats():
+    """Synthesized speech cache hit rate, disk usage and time saved"""
+    speech_cache = assistant_server.speech_cache
+    if speech_cache is None:
+        return jsonify({'success': True, 'enabled': False})
+    return jsonify({'success': True, 'enabled': True, **speech_cache.stats()})
+
+@app.route('/api/tts/stats', methods=['GET'])
+def tts_stats():
+    """Speech queue depth and coalesced/dropped/interrupted counts"""
+    streamer = assistant_server.audio_streamer
+    return jsonify({'success': True, 'output': assistant_server.tts_output,
+                    'streaming': streamer.stats() if streamer else None,
+                    **assistant_server.tts_scheduler.stats()})
+
+@app.route('/api/router/stats', methods=['GET'])
+def router_stats():
+    """Fast-path vs. LLM-path turn counters"""
+    return jsonify({'success': True, **assistant_server.router.stats()})
+
+@app.route('/api/sessions/stats', methods=['GET'])
+def session_stats():
+    """Agent session pool counters"""
+    return jsonify({'success': True, **assistant_server.session_pool.stats()})
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-stage latency histograms, error/retry counters and gauges in Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/socket/stats', methods=['GET'])
+def socket_stats():
+    """Emits and recipients per Socket.IO event (clients of this worker)"""
+    return jsonify({'success': True, 'events': assistant_server.fanout.stats(),
+                    'status': assistant_server.status.stats()})
+
+@app.route('/api/logging/stats', methods=['GET'])
+def logging_stats():
+    """Log lines waiting for the writer thread, dropped, sampled out and truncated"""
+    return jsonify({'success': True, **log_pipeline.stats()})
+
+@app.route('/api/apps/index', methods=['GET'])
+def app_index_stats():
+    """Indexed application names, what the last refresh had to rescan and fuzzy-match counters"""
+    return jsonify({'success': True, **default_index().stats(), 'resolver': default_resolver().stats()})
+
 @app.route('/api/speak', methods=['POST'])
 def speak():
     """Text to speech only"""
@@ -211,7 +716,9 @@ def speak():
         if not text:
             return jsonify({'success': False, 'error': 'Empty text'}), 400
         
-        assistant_server.speak_async(text)
+        # Browsers streaming audio pass their Socket.IO sid to hear it themselves; without one everybody hears it
+        session_id = data.get('session_id')
+        assistant_server.speak_async(text, target=assistant_server._audio_target(session_id) if session_id else None)
         return jsonify({'success': True, 'message': 'Speaking'})
     except Exception as e:
         logger.error(f"Error speaking: {e}")
@@ -219,20 +726,47 @@ def speak():
 
 # WebSocket Events
 @socketio.on('connect')
-def handle_connect():
-    """Handle client connection"""
+def handle_connect(auth=None):
+    """Handle client connection; auth={'session_id': token} also delivers that API session's events here"""
     logger.info(f"Client connected: {request.sid}")
+    assistant_server.session_store.add_client(request.sid)
+    token = (auth or {}).get('session_id') if isinstance(auth, dict) else None
+    if token:
+        join_room(token)
+        assistant_server.socket_tokens[request.sid] = token
+        assistant_server.session_store.add_client(token)
     emit('connect_response', {'data': 'Connected to Voice Assistant'})
+    # Current state straight away instead of after the next change
+    emit('status', assistant_server.status.snapshot())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {request.sid}")
+    assistant_server.session_pool.close_session(request.sid)
+    assistant_server.session_store.remove_client(request.sid)
+    token = assistant_server.socket_tokens.pop(request.sid, None)
+    if token and token not in assistant_server.socket_tokens.values():
+        assistant_server.session_store.remove_client(token)
+
+@socketio.on('observe')
+def handle_observe():
+    """Opt in to a copy of every session's conversation"""
+    join_room(OBSERVER_ROOM)
+    return {'success': True, 'room': OBSERVER_ROOM}
+
+@socketio.on('unobserve')
+def handle_unobserve():
+    """Stop observing other sessions"""
+    leave_room(OBSERVER_ROOM)
+    return {'success': True}
 
 @socketio.on('start_listening')
 def handle_start_listening():
     """Start listening via WebSocket"""
     try:
+        # Whoever starts the microphone follows the voice conversation
+        join_room(VOICE_ROOM)
         assistant_server.start_listening()
         emit('status', {'listening': True})
     except Exception as e:
@@ -256,16 +790,19 @@ def handle_text_command(data):
             emit('error', {'message': 'Empty text'})
             return
         
-        # Process command
-        response = assistant_server.question_answerer.answer_question(text)
-        response_text = str(response)  # Convert AgentResult to string
-        
-        # Emit messages to all clients using emit() with broadcast
-        emit('user_message', {'text': text}, broadcast=True)
-        emit('assistant_message', {'text': response_text}, broadcast=True)
+        # Queue command for the agent; the reply is pushed later as assistant_message
+        job = assistant_server.submit_text_command(
+            text,
+            session_id=request.sid,
+            on_queued=lambda job: assistant_server.emit_session('user_message', {'text': text, 'request_id': job.id},
+                                                                request.sid)
+        )
+        if job is None:
+            emit('error', {'message': 'Server busy, try again shortly'})
+            return {'success': False, 'error': 'Server busy, try again shortly'}
         
-        # Queue for async speech
-        assistant_server.speak_async(response_text)
+        # Acknowledge with the request id so the client can match the reply
+        return {'success': True, 'request_id': job.id}
     except Exception as e:
         logger.error(f"Error processing text command: {e}")
         emit('error', {'message': str(e)})
@@ -0,0 +1,344 @@
+"""
+App Index - Installed applications by spoken name, built in the background and cached on disk
+"""
+import os
+import json
+import shlex
+import logging
+import platform
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Executables that are never what someone asks to open
+SKIPPED_PREFIXES = ('unins', 'uninstall', 'setup', 'update', 'crashpad', 'crashreporter', 'elevation_service')
+
+# .desktop Exec= field codes (%u, %F, ...) are filled in by the launcher, not by us
+DESKTOP_FIELD_CODES = {'%f', '%F', '%u', '%U', '%d', '%D', '%n', '%N', '%i', '%c', '%k', '%v', '%m'}
+
+
+def normalize_name(name: str) -> str:
+    """Lowercases and collapses separators, so 'Google-Chrome' and 'google chrome' match"""
+    return ' '.join(name.lower().replace('_', ' ').replace('-', ' ').split())
+
+
+def default_roots(system: str = None) -> List[Tuple[str, str, int]]:
+    """
+    Directories searched for applications on this platform
+
+    Args:
+        system: platform.system() value (default: this machine)
+
+    Returns:
+        list: (directory, kind, max_depth) in priority order; kind is 'exe', 'path', 'desktop' or 'app'
+    """
+    system = system or platform.system()
+    path_dirs = [entry for entry in os.environ.get('PATH', '').split(os.pathsep) if entry]
+    if system == "Windows":
+        roots = [(entry, 'exe', 0) for entry in path_dirs]
+        roots += [
+            (os.environ.get('ProgramFiles', 'C:\\Program Files'), 'exe', 3),
+            (os.environ.get('ProgramFiles(x86)', 'C:\\Program Files (x86)'), 'exe', 3),
+            (os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Programs'), 'exe', 3),
+            (os.environ.get('APPDATA', ''), 'exe', 3),
+        ]
+    elif system == "Darwin":
+        roots = [('/Applications', 'app', 1), (os.path.expanduser('~/Applications'), 'app', 1)]
+        roots += [(entry, 'path', 0) for entry in path_dirs]
+    else:
+        data_dirs = [os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')]
+        data_dirs += (os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(':')
+        roots = [(os.path.join(entry, 'applications'), 'desktop', 1) for entry in data_dirs if entry]
+        roots += [('/var/lib/flatpak/exports/share/applications', 'desktop', 0),
+                  ('/var/lib/snapd/desktop/applications', 'desktop', 0)]
+        roots += [(entry, 'path', 0) for entry in path_dirs]
+    # Drop empty and repeated directories, keeping the first (highest priority) occurrence
+    seen = set()
+    unique = []
+    for directory, kind, depth in roots:
+        if directory and directory not in seen:
+            seen.add(directory)
+            unique.append((directory, kind, depth))
+    return unique
+
+
+def parse_desktop_file(path: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Reads the name and command of a Linux .desktop launcher
+
+    Returns:
+        tuple: (Name, argv) or None if the entry is hidden or has no Exec line
+    """
+    name = command = None
+    in_entry = False
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    in_entry = line == '[Desktop Entry]'
+                    continue
+                if not in_entry or '=' not in line:
+                    continue
+                key, _, value = line.partition('=')
+                key = key.strip()
+                if key == 'Name' and name is None:
+                    name = value.strip()
+                elif key == 'Exec' and command is None:
+                    command = value.strip()
+                elif key in ('NoDisplay', 'Hidden') and value.strip().lower() == 'true':
+                    return None
+    except OSError:
+        return None
+    if not name or not command:
+        return None
+    try:
+        argv = [arg for arg in shlex.split(command) if arg not in DESKTOP_FIELD_CODES]
+    except ValueError:
+        return None
+    return (name, argv) if argv else None
+
+
+class AppIndex:
+    """
+    Maps spoken application names to launch commands without touching the disk per request
+
+    Every indexed directory is remembered with its mtime, its launchable entries and its
+    subdirectories. A refresh stats each known directory and only lists the ones whose
+    mtime changed (an entry was added, removed or renamed in it), so refreshing an
+    unchanged tree costs one stat per directory. The result is saved as JSON so the
+    next start can serve lookups from the cache while the refresh runs.
+    """
+
+    def __init__(self, cache_path: Optional[str] = '.app_index.json', roots: List[Tuple[str, str, int]] = None,
+                 system: str = None):
+        """
+        Initializes an empty index (call start() or refresh() to fill it)
+
+        Args:
+            cache_path: JSON file the index is kept in between runs (None keeps it in memory)
+            roots: (directory, kind, max_depth) to search (default: default_roots())
+            system: platform.system() value the commands are built for
+        """
+        self.system = system or platform.system()
+        self.cache_path = cache_path
+        self.roots = roots if roots is not None else default_roots(self.system)
+        self._dirs = {}
+        self._names = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.ready = threading.Event()
+        self.refreshes = 0
+        # Bumped whenever the name table is replaced, so derived indexes know to rebuild
+        self.generation = 0
+        self.last_refresh = {}
+
+    def start(self) -> None:
+        """Loads the saved index and refreshes it on a background thread (once)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._build, daemon=True, name='app-index')
+            self._thread.start()
+
+    def _build(self) -> None:
+        try:
+            if self.load():
+                self.ready.set()
+            self.refresh()
+            self.save()
+        except Exception as e:
+            logger.error(f"Error building application index: {e}")
+        finally:
+            self.ready.set()
+
+    def lookup(self, name: str) -> Optional[List[str]]:
+        """
+        Returns the command that opens an application
+
+        Args:
+            name: Spoken or typed name, e.g. "Google Chrome" or "code"
+
+        Returns:
+            list: argv to pass to subprocess.Popen, or None if the name is not indexed
+        """
+        return self._names.get(normalize_name(name))
+
+    def names(self) -> List[str]:
+        """All indexed names (normalized)"""
+        return list(self._names)
+
+    def refresh(self) -> dict:
+        """
+        Rescans directories whose mtime changed since the last scan
+
+        Returns:
+            dict: Directories scanned and skipped, and the number of indexed names
+        """
+        scanned = skipped = 0
+        directories = {}
+        for root, kind, max_depth in self.roots:
+            pending = [(root, 0)]
+            while pending:
+                directory, depth = pending.pop()
+                if directory in directories:
+                    continue
+                try:
+                    mtime = os.stat(directory).st_mtime
+                except OSError:
+                    continue
+                cached = self._dirs.get(directory)
+                if cached is not None and cached['mtime'] == mtime and cached['kind'] == kind:
+                    entry = cached
+                    skipped += 1
+                else:
+                    entry = self._scan(directory, kind, mtime)
+                    scanned += 1
+                directories[directory] = entry
+                if depth < max_depth:
+                    pending.extend((os.path.join(directory, sub), depth + 1) for sub in reversed(entry['subdirs']))
+        names = self._merge(directories)
+        with self._lock:
+            self._dirs = directories
+            self._names = names
+            self.generation += 1
+            self.refreshes += 1
+            self.last_refresh = {'scanned': scanned, 'skipped': skipped, 'names': len(names)}
+        logger.info(f"Application index: {len(names)} names, {scanned} directories scanned, {skipped} unchanged")
+        return dict(self.last_refresh)
+
+    def _scan(self, directory: str, kind: str, mtime: float) -> dict:
+        """Lists one directory's launchable entries and subdirectories"""
+        apps = {}
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        found = self._launchable(entry, kind)
+                        if found is not None:
+                            for name in found[0]:
+                                apps.setdefault(name, found[1])
+                        elif entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.debug(f"Cannot list {directory}: {e}")
+        return {'mtime': mtime, 'kind': kind, 'apps': apps, 'subdirs': sorted(subdirs)}
+
+    def _launchable(self, entry: os.DirEntry, kind: str) -> Optional[Tuple[List[str], List[str]]]:
+        """Returns (names, argv) if the directory entry is an application of this kind"""
+        lower = entry.name.lower()
+        if kind == 'exe':
+            if not lower.endswith('.exe') or lower.startswith(SKIPPED_PREFIXES) or not entry.is_file():
+                return None
+            return [normalize_name(lower[:-4])], [entry.path]
+        if kind == 'desktop':
+            if not lower.endswith('.desktop') or not entry.is_file():
+                return None
+            parsed = parse_desktop_file(entry.path)
+            if parsed is None:
+                return None
+            name, argv = parsed
+            stem = lower[:-len('.desktop')].split('.')[-1]
+            return [normalize_name(name), normalize_name(stem)], argv
+        if kind == 'app':
+            if not lower.endswith('.app') or not entry.is_dir():
+                return None
+            return [normalize_name(entry.name[:-4])], ['open', '-a', entry.path]
+        # 'path': any executable file
+        if lower.startswith(SKIPPED_PREFIXES) or not entry.is_file() or not os.access(entry.path, os.X_OK):
+            return None
+        stem = lower[:-4] if lower.endswith('.exe') else lower
+        return [normalize_name(stem)], [entry.path]
+
+    def _merge(self, directories: Dict[str, dict]) -> Dict[str, List[str]]:
+        """Combines per-directory entries; roots listed first win, then shallower directories"""
+        names = {}
+        for root, _, _ in self.roots:
+            prefix = os.path.join(root, '')
+            members = [path for path in directories if path == root or path.startswith(prefix)]
+            for path in sorted(members, key=lambda path: (path.count(os.sep), path)):
+                for name, argv in directories[path]['apps'].items():
+                    names.setdefault(name, argv)
+        return names
+
+    def load(self) -> bool:
+        """
+        Reads the saved index
+
+        Returns:
+            bool: True if a compatible index was loaded
+        """
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable application index {self.cache_path}: {e}")
+            return False
+        if data.get('version') != INDEX_VERSION or data.get('system') != self.system:
+            return False
+        directories = data.get('dirs') or {}
+        names = self._merge(directories)
+        with self._lock:
+            self._dirs = directories
+            self._names = names
+            self.generation += 1
+        logger.info(f"Loaded application index with {len(names)} names")
+        return True
+
+    def save(self) -> bool:
+        """
+        Writes the index atomically
+
+        Returns:
+            bool: True if it was written
+        """
+        if not self.cache_path:
+            return False
+        with self._lock:
+            data = {'version': INDEX_VERSION, 'system': self.system, 'dirs': self._dirs}
+        temporary = f"{self.cache_path}.tmp"
+        try:
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temporary, self.cache_path)
+            return True
+        except OSError as e:
+            logger.error(f"Error saving application index: {e}")
+            return False
+
+    def stats(self) -> dict:
+        """
+        Returns index counters
+
+        Returns:
+            dict: Readiness, indexed names and directories, and the last refresh's work
+        """
+        with self._lock:
+            return {
+                'ready': self.ready.is_set(),
+                'names': len(self._names),
+                'directories': len(self._dirs),
+                'refreshes': self.refreshes,
+                'last_refresh': dict(self.last_refresh),
+            }
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def default_index() -> AppIndex:
+    """The process-wide index shared by open_application and AppLauncher"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = AppIndex(os.environ.get('APP_INDEX_PATH', '.app_index.json') or None)
+        return _default_index
@@ -0,0 +1,188 @@
+"""
+App Resolver - Matches loosely spoken application names through a trigram index
+"""
+import os
+import heapq
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Set
+from app_index import AppIndex, default_index, normalize_name
+from models import AppMatch
+
+logger = logging.getLogger(__name__)
+
+# Spoken names -> Windows executables; the executable's name is also looked up in the app index
+APP_MAPPINGS = {
+    'chrome': 'chrome.exe',
+    'google chrome': 'chrome.exe',
+    'firefox': 'firefox.exe',
+    'edge': 'msedge.exe',
+    'microsoft edge': 'msedge.exe',
+    'vscode': 'code.exe',
+    'visual studio code': 'code.exe',
+    'vs code': 'code.exe',
+    'notepad': 'notepad.exe',
+    'calculator': 'calc.exe',
+    'calc': 'calc.exe',
+    'paint': 'mspaint.exe',
+    'spotify': 'spotify.exe',
+    'discord': 'discord.exe',
+    'teams': 'teams.exe',
+    'outlook': 'outlook.exe',
+    'word': 'winword.exe',
+    'microsoft word': 'winword.exe',
+    'excel': 'excel.exe',
+    'microsoft excel': 'excel.exe',
+    'powerpoint': 'powerpnt.exe',
+    'microsoft powerpoint': 'powerpnt.exe',
+    'vlc': 'vlc.exe',
+    'steam': 'steam.exe',
+}
+
+# Words people add around an application's name ("the spotify app")
+FILLER_WORDS = {'the', 'app', 'application', 'program', 'my', 'please'}
+
+
+def trigrams(name: str) -> Set[str]:
+    """Trigrams of each word, padded so word starts weigh more (pg_trgm style)"""
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def clean_query(name: str) -> str:
+    """Normalizes a spoken name and drops filler words (unless that leaves nothing)"""
+    words = normalize_name(name).split()
+    kept = [word for word in words if word not in FILLER_WORDS]
+    return ' '.join(kept or words)
+
+
+class AppResolver:
+    """
+    Resolves spoken application names to the best known alias or indexed application
+
+    Candidates are the alias table plus every name in the AppIndex. Each candidate's
+    trigrams go into an inverted index, so a lookup only touches candidates sharing a
+    trigram with the query. Trigrams found in more than 1 in 20 names (word starts such
+    as "  s") are skipped while collecting candidates; the best few by shared trigrams
+    are then scored exactly by Dice similarity (2 * shared / (query + candidate trigrams)).
+    The table is rebuilt when the AppIndex reports a new generation.
+    """
+
+    def __init__(self, aliases: Dict[str, str] = None, index: AppIndex = None, threshold: float = 0.5):
+        """
+        Initializes the resolver
+
+        Args:
+            aliases: Spoken name -> Windows executable (default: APP_MAPPINGS)
+            index: AppIndex supplying discovered applications (None: aliases only)
+            threshold: Scores below this ask the user to clarify instead of launching
+        """
+        self.aliases = {normalize_name(name): exe for name, exe in (APP_MAPPINGS if aliases is None else aliases).items()}
+        self.index = index
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._generation = None
+        self._table = ([], [], {}, {}, 0)
+        self.lookups = 0
+        self.clarifications = 0
+
+    def _sync(self) -> None:
+        """Rebuilds the trigram table if the app index changed since it was built"""
+        generation = self.index.generation if self.index is not None else 0
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            names = list(self.aliases)
+            if self.index is not None:
+                names += [name for name in self.index.names() if name not in self.aliases]
+            grams = []
+            postings = {}
+            for position, name in enumerate(names):
+                grams.append(frozenset(trigrams(name)))
+                for gram in grams[-1]:
+                    postings.setdefault(gram, []).append(position)
+            dense = max(64, len(names) // 20)
+            self._table = (names, grams, postings, {name: position for position, name in enumerate(names)}, dense)
+            self._generation = generation
+        logger.info(f"App resolver indexed {len(names)} names ({len(postings)} trigrams)")
+
+    def resolve(self, app_name: str, limit: int = 3) -> AppMatch:
+        """
+        Finds the application a spoken name most likely refers to
+
+        Args:
+            app_name: Name as heard, e.g. "visual code" or "ms word"
+            limit: Candidates considered (the runners-up become suggestions)
+
+        Returns:
+            AppMatch: Best name and score (1.0 for an exact match), its command and executable
+        """
+        self._sync()
+        query = clean_query(app_name)
+        names, candidate_grams, postings, positions, dense = self._table
+        self.lookups += 1
+        if query in positions:
+            ranked = [(1.0, positions[query])]
+        else:
+            grams = trigrams(query)
+            shared = Counter()
+            for gram in grams:
+                posting = postings.get(gram, ())
+                if len(posting) <= dense:
+                    shared.update(posting)
+            if not shared:
+                for gram in grams:
+                    shared.update(postings.get(gram, ()))
+            size = len(grams)
+            # Ties go to the earlier candidate, so aliases beat discovered names
+            scored = ((2 * len(grams & candidate_grams[position]) / (size + len(candidate_grams[position])), -position)
+                      for position, _ in shared.most_common(max(24, limit * 8)))
+            ranked = [(score, -negative) for score, negative in heapq.nlargest(limit, scored)]
+        if not ranked:
+            return AppMatch(query=query, name=None, score=0.0)
+        score, position = ranked[0]
+        name = names[position]
+        match = AppMatch(query=query, name=name, score=score,
+                         suggestions=[names[other] for _, other in ranked[1:]])
+        match.executable = self.aliases.get(name)
+        if self.index is not None:
+            match.command = self.index.lookup(name)
+            if match.command is None and match.executable:
+                match.command = self.index.lookup(os.path.splitext(match.executable)[0])
+        if score < self.threshold:
+            self.clarifications += 1
+        return match
+
+    def stats(self) -> dict:
+        """
+        Returns resolver counters
+
+        Returns:
+            dict: Indexed names, threshold, lookups and how many fell below the threshold
+        """
+        return {
+            'names': len(self._table[0]),
+            'threshold': self.threshold,
+            'lookups': self.lookups,
+            'clarifications': self.clarifications,
+        }
+
+
+_default_resolver = None
+_default_lock = threading.Lock()
+
+
+def default_resolver() -> AppResolver:
+    """The process-wide resolver shared by open_application and AppLauncher"""
+    global _default_resolver
+    with _default_lock:
+        if _default_resolver is None:
+            _default_resolver = AppResolver(index=default_index(),
+                                            threshold=float(os.environ.get('APP_MATCH_THRESHOLD', '0.5')))
+        return _default_resolver
@@ -0,0 +1,230 @@
+"""
+Audio Streamer - Sends synthesized speech to browser clients as chunked binary frames
+"""
+import os
+import sys
+import time
+import uuid
+import wave
+import logging
+import threading
+from array import array
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Wire formats: 16-bit little-endian PCM, or G.711 mu-law (8 bits per sample, half the bandwidth)
+AUDIO_ENCODINGS = ('pcm16', 'mulaw')
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+_mulaw_table = None
+
+
+def _mulaw_sample(sample: int) -> int:
+    """Encodes one signed 16-bit sample as a mu-law byte"""
+    sign = 0
+    if sample < 0:
+        sample = -sample
+        sign = 0x80
+    sample = min(sample, _MULAW_CLIP) + _MULAW_BIAS
+    exponent = 7
+    mask = 0x4000
+    while exponent > 0 and not sample & mask:
+        exponent -= 1
+        mask >>= 1
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+
+def encode_mulaw(pcm: bytes) -> bytes:
+    """
+    Compresses 16-bit little-endian PCM to mu-law
+
+    Args:
+        pcm: Raw 16-bit little-endian samples
+
+    Returns:
+        bytes: One mu-law byte per sample
+    """
+    global _mulaw_table
+    if _mulaw_table is None:
+        # Indexed by the unsigned 16-bit view of each sample
+        _mulaw_table = bytes(_mulaw_sample(value - 65536 if value >= 32768 else value) for value in range(65536))
+    samples = array('H', pcm[:len(pcm) - len(pcm) % 2])
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return bytes(map(_mulaw_table.__getitem__, samples))
+
+
+def decode_mulaw(data: bytes) -> list:
+    """
+    Expands mu-law bytes back to signed 16-bit samples (what the browser does)
+
+    Args:
+        data: mu-law bytes
+
+    Returns:
+        list: Signed samples
+    """
+    samples = []
+    for byte in data:
+        byte = ~byte & 0xFF
+        magnitude = (((byte & 0x0F) << 3) + _MULAW_BIAS) << ((byte >> 4) & 0x07)
+        magnitude -= _MULAW_BIAS
+        samples.append(-magnitude if byte & 0x80 else magnitude)
+    return samples
+
+
+class AudioStreamer:
+    """
+    Streams each utterance as tts_audio_start, tts_audio_chunk (binary) and tts_audio_end events
+
+    Responses are synthesized sentence by sentence, so the browser starts playing the
+    first sentence while later ones are still being generated and synthesized. Chunks
+    are sent as fast as they are encoded (the browser schedules playback), so one worker
+    can feed many clients; stop() therefore tracks what each client is still playing.
+    """
+
+    def __init__(self, synthesize: Callable[[str], Tuple[Optional[str], bool]],
+                 emit: Callable[[str, dict, Optional[str]], None], encoding: str = 'mulaw',
+                 chunk_ms: int = 100):
+        """
+        Initializes the streamer
+
+        Args:
+            synthesize: Renders text to a WAV file, returning (path, is_temporary)
+            emit: Sends a Socket.IO event (event, payload, target sid or None for everyone)
+            encoding: 'mulaw' or 'pcm16'
+            chunk_ms: Audio duration per binary frame
+        """
+        if encoding not in AUDIO_ENCODINGS:
+            raise ValueError(f"Unsupported audio encoding: {encoding}")
+        self.synthesize = synthesize
+        self.emit = emit
+        self.encoding = encoding
+        self.chunk_ms = chunk_ms
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._sending = None
+        self._playing = {}
+        self.utterances = 0
+        self.chunks = 0
+        self.bytes_sent = 0
+        self.cancelled = 0
+        self._synthesis_ms = []
+
+    def stream(self, text: str, target: str = None, group: str = None) -> bool:
+        """
+        Synthesizes text and sends it to the client
+
+        Args:
+            text: The text to speak
+            target: Socket.IO sid to send to (None sends to every client)
+            group: Request id the utterance belongs to
+
+        Returns:
+            bool: True if the whole utterance was sent
+        """
+        self._cancel.clear()
+        start = time.perf_counter()
+        path, temporary = self.synthesize(text)
+        if path is None:
+            return False
+
+        utterance_id = uuid.uuid4().hex
+        try:
+            with wave.open(path, 'rb') as f:
+                if f.getsampwidth() != 2:
+                    logger.error(f"Cannot stream {f.getsampwidth() * 8}-bit audio")
+                    return False
+                duration = f.getnframes() / float(f.getframerate())
+                with self._lock:
+                    now = time.monotonic()
+                    self._synthesis_ms.append((time.perf_counter() - start) * 1000)
+                    del self._synthesis_ms[:-100]
+                    # Forget utterances the clients have finished playing
+                    self._playing = {key: value for key, value in self._playing.items() if value[2] > now}
+                    # Queued behind whatever this client is still playing
+                    queued_until = max([ends for sid, _, ends in self._playing.values() if sid == target] + [now])
+                    self._playing[utterance_id] = (target, group, queued_until + duration)
+                    self._sending = utterance_id
+                frames_per_chunk = max(1, f.getframerate() * self.chunk_ms // 1000)
+                self.emit('tts_audio_start', {
+                    'utterance_id': utterance_id,
+                    'request_id': group,
+                    'text': text,
+                    'encoding': self.encoding,
+                    'sample_rate': f.getframerate(),
+                    'channels': f.getnchannels(),
+                }, target)
+
+                sequence = 0
+                while not self._cancel.is_set():
+                    pcm = f.readframes(frames_per_chunk)
+                    if not pcm:
+                        break
+                    data = encode_mulaw(pcm) if self.encoding == 'mulaw' else pcm
+                    self.emit('tts_audio_chunk', {'utterance_id': utterance_id, 'seq': sequence, 'data': data}, target)
+                    sequence += 1
+                    with self._lock:
+                        self.chunks += 1
+                        self.bytes_sent += len(data)
+
+            if self._cancel.is_set():
+                return False
+            self.emit('tts_audio_end', {'utterance_id': utterance_id, 'chunks': sequence}, target)
+            with self._lock:
+                self.utterances += 1
+            return True
+        except Exception as e:
+            logger.error(f"Error streaming speech audio: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._sending = None
+            if temporary and os.path.exists(path):
+                os.remove(path)
+
+    def stop(self, keep_group: str = None, target: str = None) -> int:
+        """
+        Stops utterances that are still being sent or played
+
+        Args:
+            keep_group: Request id whose audio should keep playing
+            target: Only stop audio of this client (None stops every client's)
+
+        Returns:
+            int: Number of utterances stopped
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = [(utterance_id, sid) for utterance_id, (sid, group, ends) in self._playing.items()
+                     if ends > now and (keep_group is None or group != keep_group)
+                     and (target is None or sid == target)]
+            for utterance_id, _ in stale:
+                del self._playing[utterance_id]
+                if utterance_id == self._sending:
+                    self._cancel.set()
+            self.cancelled += len(stale)
+        for utterance_id, sid in stale:
+            self.emit('tts_audio_stop', {'utterance_id': utterance_id}, sid)
+        return len(stale)
+
+    def stats(self) -> dict:
+        """
+        Returns streaming counters
+
+        Returns:
+            dict: Encoding, utterances, chunks, bytes sent, cancellations and mean synthesis time
+        """
+        with self._lock:
+            return {
+                'encoding': self.encoding,
+                'chunk_ms': self.chunk_ms,
+                'utterances': self.utterances,
+                'chunks': self.chunks,
+                'bytes_sent': self.bytes_sent,
+                'cancelled': self.cancelled,
+                'synthesis_ms_mean': sum(self._synthesis_ms) / len(self._synthesis_ms) if self._synthesis_ms else 0.0,
+            }
@@ -0,0 +1,123 @@
+"""
+App Resolver Benchmark - Fuzzy application-name lookups per second over an index of thousands of apps
+
+Builds a real AppIndex over a temporary directory of synthetic executables, then
+resolves misheard variants of indexed names (dropped, swapped and doubled letters,
+filler words) with the trigram resolver and with a linear scan scoring every name.
+
+Run: python benchmarks/bench_app_resolver.py --entries 5000 --queries 20000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_index import AppIndex  # noqa: E402
+from app_resolver import AppResolver, trigrams, clean_query  # noqa: E402
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'te', 'zen', 'vo', 'pix', 'nu', 'sta', 'bel', 'dor', 'fi', 'gro', 'hub',
+             'jet', 'lex', 'mox', 'nova', 'orb', 'qua', 'ryn', 'sol', 'tix', 'ula', 'vex', 'wim', 'yar']
+SUFFIXES = ['', '', '', ' studio', ' player', ' editor', ' manager', ' viewer', ' desktop', ' cli']
+
+
+def synthetic_names(count: int, rng: random.Random) -> list:
+    """Unique application-like names, e.g. 'koravex player'"""
+    names = set()
+    while len(names) < count:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        names.add(word + rng.choice(SUFFIXES))
+    return sorted(names)
+
+
+def mishear(name: str, rng: random.Random) -> str:
+    """A plausible recognition error of a name"""
+    letters = list(name)
+    position = rng.randrange(len(letters))
+    kind = rng.choice(['drop', 'swap', 'double', 'filler', 'exact'])
+    if kind == 'drop' and len(letters) > 4:
+        del letters[position]
+    elif kind == 'swap' and position < len(letters) - 1:
+        letters[position], letters[position + 1] = letters[position + 1], letters[position]
+    elif kind == 'double':
+        letters.insert(position, letters[position])
+    elif kind == 'filler':
+        return f"the {name} app"
+    return ''.join(letters)
+
+
+class LinearResolver:
+    """Scores every name on each lookup (same Dice scores, no inverted index), the baseline"""
+
+    def __init__(self, names: list):
+        self.entries = [(name, trigrams(name)) for name in names]
+
+    def resolve(self, app_name: str) -> tuple:
+        grams = trigrams(clean_query(app_name))
+        best = (0.0, None)
+        for name, candidate in self.entries:
+            score = 2 * len(grams & candidate) / (len(grams) + len(candidate))
+            if score > best[0]:
+                best = (score, name)
+        return best[1], best[0]
+
+
+def measure(resolve, queries: list) -> list:
+    """Microseconds per lookup"""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        resolve(query)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000, help='Applications in the index')
+    parser.add_argument('--queries', type=int, default=20000, help='Lookups timed per resolver')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = synthetic_names(args.entries, rng)
+    with tempfile.TemporaryDirectory() as directory:
+        for name in names:
+            path = os.path.join(directory, name.replace(' ', '-'))
+            with open(path, 'w') as handle:
+                handle.write('')
+            os.chmod(path, 0o755)
+        index = AppIndex(None, roots=[(directory, 'path', 0)])
+        start = time.perf_counter()
+        index.refresh()
+        print(f"Indexed {len(index.names())} executables in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        resolver = AppResolver(index=index)
+        start = time.perf_counter()
+        resolver.resolve('warm up')
+        print(f"Trigram table built in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+        targets = [rng.choice(names) for _ in range(args.queries)]
+        queries = [mishear(target, rng) for target in targets]
+        linear = LinearResolver(resolver._table[0])
+        configurations = [
+            ('trigram index', lambda query: resolver.resolve(query).name),
+            ('linear scan', lambda query: linear.resolve(query)[0]),
+        ]
+        print(f"{'resolver':<16} {'lookups/s':>10} {'p50 us':>8} {'p99 us':>8} {'top-1 correct':>14}")
+        for label, resolve in configurations:
+            count = args.queries if label == 'trigram index' else min(args.queries, 2000)
+            samples = sorted(measure(resolve, queries[:count]))
+            correct = sum(resolve(query) == target for query, target in zip(queries[:count], targets[:count]))
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            rate = len(samples) / (sum(samples) / 1e6)
+            print(f"{label:<16} {rate:10.0f} {statistics.median(samples):8.1f} {p99:8.1f} "
+                  f"{correct / count:14.1%}")
+
+
+if __name__ == "__main__":
+    main()
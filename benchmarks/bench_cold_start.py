@@ -0,0 +1,80 @@
+"""
+Cold Start Benchmark - Worker boot time with lazy components versus building everything at import
+
+Each run is a fresh Python process, like a new gunicorn worker.
+
+Run: python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a child process; prints one JSON line
+CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+result = {{'import_seconds': time.perf_counter() - start, 'errors': {{}}}}
+server = app.assistant_server
+client = app.app.test_client()
+result['health_status'] = client.get('/api/health').status_code
+if {eager!r}:
+    # What the old constructor did before the worker could answer anything
+    for name, build in (('speech_engine', lambda: server.speech_engine), ('agent', server.session_pool.warm_up)):
+        try:
+            build()
+        except Exception as e:
+            result['errors'][name] = str(e)
+    result['serving_seconds'] = time.perf_counter() - start
+else:
+    result['serving_seconds'] = result['import_seconds']
+    server.warm_up()
+    deadline = time.perf_counter() + {timeout!r}
+    while time.perf_counter() < deadline:
+        components = server.readiness()['components']
+        if all(c['ready'] or c.get('error') for c in components.values()):
+            break
+        time.sleep(0.01)
+    for name, component in server.readiness()['components'].items():
+        if component.get('error'):
+            result['errors'][name] = component['error']
+result['warm_seconds'] = time.perf_counter() - start
+print(json.dumps(result))
+'''
+
+
+def run_once(eager: bool, timeout: float) -> dict:
+    """Boots one fresh interpreter and returns its timings"""
+    env = dict(os.environ, WARMUP='0')
+    code = CHILD.format(root=ROOT, eager=eager, timeout=timeout)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                            cwd=ROOT, timeout=timeout + 60)
+    for line in reversed(output.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"Child failed: {output.stderr.strip().splitlines()[-1:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per mode')
+    parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for warm-up')
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'serving (median s)':>19} {'fully warm (median s)':>22}  errors")
+    for mode, eager in (('eager', True), ('lazy', False)):
+        runs = [run_once(eager, args.timeout) for _ in range(args.runs)]
+        serving = statistics.median(run['serving_seconds'] for run in runs)
+        warm = statistics.median(run['warm_seconds'] for run in runs)
+        errors = sorted({f"{name}: {error[:60]}" for run in runs for name, error in run['errors'].items()})
+        print(f"{mode:<8} {serving:19.2f} {warm:22.2f}  {'; '.join(errors) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Command Processor Benchmark - Compares the compiled intent matcher against the legacy keyword loop
+
+Run: python benchmarks/bench_command_processor.py --utterances 100000
+"""
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_processor import CommandProcessor, COMMAND_PREFIX
+from models import Command, CommandIntent
+
+logger = logging.getLogger('command_processor')
+
+APPS = ['chrome', 'google chrome', 'firefox', 'edge', 'vs code', 'visual studio code', 'notepad',
+        'calculator', 'paint', 'spotify', 'discord', 'teams', 'outlook', 'word', 'excel',
+        'powerpoint', 'vlc', 'steam', 'youtube', 'terminal']
+SONGS = ['despacito', 'shape of you', 'blinding lights', 'bohemian rhapsody', 'lofi beats',
+         'kesariya', 'believer', 'perfect by ed sheeran', 'some relaxing music', 'tum hi ho']
+QUESTIONS = ['what is the weather today', 'who are you', 'what can you do', 'how far is the moon',
+             'what is the capital of france', 'tell me a joke', 'how do i restart my router',
+             'what is a nonstop flight', 'explain quantum computing in one line',
+             'who won the world cup in 2011', 'what time is it', 'how do i start a business']
+# (template, slot, weight) - roughly half of real traffic is plain questions
+TEMPLATES = [
+    ('open {app}', 'app', 3), ('launch {app} please', 'app', 1), ('can you open {app}', 'app', 1),
+    ('start {app} now', 'app', 1), ('hey run {app} application', 'app', 1),
+    ('play {song}', 'song', 3), ('play {song} on youtube', 'song', 1), ('please play {song}', 'song', 1),
+    ('{question}', 'question', 9), ('{question}?', 'question', 4),
+    ('bye', None, 1), ('goodbye', None, 1), ('quit', None, 1), ('stop the music', None, 1),
+]
+
+
+class LegacyCommandProcessor:
+    """The previous per-keyword loop (with its confidence scoring and log calls), kept as the baseline"""
+
+    def __init__(self):
+        self.exit_keywords = ['bye', 'exit', 'quit', 'goodbye', 'stop']
+        self.open_keywords = ['open', 'launch', 'start', 'run']
+        self.music_keywords = ['play', 'music', 'song']
+
+    def process_command(self, text: str) -> Command:
+        if not text or not text.strip():
+            return Command(intent=CommandIntent.UNKNOWN, parameters={}, raw_text=text)
+        text_lower = text.lower().strip()
+        if any(keyword in text_lower for keyword in self.exit_keywords):
+            logger.info("Exit command detected")
+            words = COMMAND_PREFIX.sub('', re.sub(r'[^\w\s]', ' ', text_lower).strip()).split()
+            confidence = 1.0 if words and all(word in self.exit_keywords for word in words) else 0.3
+            return Command(intent=CommandIntent.EXIT, parameters={}, raw_text=text, confidence=confidence)
+        app_name = self._extract(text_lower, self.open_keywords, r'\s+(please|now|application|app)$')
+        if app_name:
+            logger.info(f"Open app command detected: {app_name}")
+            return Command(intent=CommandIntent.OPEN_APP, parameters={'app_name': app_name}, raw_text=text,
+                           confidence=self._confidence(text_lower, self.open_keywords, app_name))
+        song_name = self._extract(text_lower, self.music_keywords, r'\s+(please|now|on youtube)$')
+        if song_name:
+            logger.info(f"Play music command detected: {song_name}")
+            return Command(intent=CommandIntent.PLAY_MUSIC, parameters={'song_name': song_name}, raw_text=text,
+                           confidence=self._confidence(text_lower, self.music_keywords, song_name))
+        logger.info("Question answering command detected")
+        return Command(intent=CommandIntent.ANSWER_QUESTION, parameters={'question': text}, raw_text=text)
+
+    @staticmethod
+    def _extract(text: str, keywords: list, suffix: str) -> str:
+        for keyword in keywords:
+            if keyword in text:
+                match = re.search(rf'{keyword}\s+(.+)', text)
+                if match:
+                    return re.sub(suffix, '', match.group(1).strip())
+        return ""
+
+    @staticmethod
+    def _confidence(text: str, keywords: list, parameter: str) -> float:
+        words = COMMAND_PREFIX.sub('', text).split()
+        confidence = 0.9 if words and words[0] in keywords else 0.4
+        if text.rstrip().endswith('?'):
+            confidence -= 0.2
+        if len(parameter.split()) > 5:
+            confidence -= 0.2
+        return max(confidence, 0.0)
+
+
+def build_corpus(size: int, seed: int = 42) -> list:
+    """
+    Generates a reproducible corpus of utterances
+
+    Args:
+        size: Number of utterances
+        seed: Random seed
+
+    Returns:
+        list: Utterance strings
+    """
+    rng = random.Random(seed)
+    weights = [weight for _, _, weight in TEMPLATES]
+    corpus = []
+    for template, slot, _ in rng.choices(TEMPLATES, weights=weights, k=size):
+        if slot == 'app':
+            corpus.append(template.format(app=rng.choice(APPS)))
+        elif slot == 'song':
+            corpus.append(template.format(song=rng.choice(SONGS)))
+        elif slot == 'question':
+            corpus.append(template.format(question=rng.choice(QUESTIONS)))
+        else:
+            corpus.append(template)
+    return corpus
+
+
+def measure(processors: dict, corpus: list, repeats: int) -> dict:
+    """
+    Times each processor over the corpus, interleaving runs so machine noise hits both alike
+
+    Returns:
+        dict: Best commands/sec per processor name
+    """
+    best = {name: 0.0 for name in processors}
+    for _ in range(repeats):
+        for name, processor in processors.items():
+            process = processor.process_command
+            start = time.perf_counter()
+            for text in corpus:
+                process(text)
+            elapsed = time.perf_counter() - start
+            best[name] = max(best[name], len(corpus) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--utterances', type=int, default=100000, help='Corpus size')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per implementation')
+    parser.add_argument('--seed', type=int, default=42, help='Corpus random seed')
+    args = parser.parse_args()
+
+    # Per-command INFO logging would dominate the measurement
+    logging.disable(logging.INFO)
+
+    corpus = build_corpus(args.utterances, args.seed)
+    legacy = LegacyCommandProcessor()
+    compiled = CommandProcessor()
+
+    rates = measure({'legacy': legacy, 'compiled': compiled}, corpus, args.repeats)
+    legacy_rate, compiled_rate = rates['legacy'], rates['compiled']
+
+    distinct = sorted(set(corpus))
+    changed = [text for text in distinct
+               if legacy.process_command(text).intent != compiled.process_command(text).intent]
+
+    print(f"Corpus: {len(corpus)} utterances ({len(distinct)} distinct)")
+    print(f"Legacy keyword loop:    {legacy_rate:12,.0f} commands/sec")
+    print(f"Compiled matcher:       {compiled_rate:12,.0f} commands/sec")
+    print(f"Speedup:                {compiled_rate / legacy_rate:12.2f}x")
+    print(f"Intent changes (word boundaries): {len(changed)} distinct utterances")
+    for text in changed[:10]:
+        print(f"  {text!r}: {legacy.process_command(text).intent.value} -> "
+              f"{compiled.process_command(text).intent.value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Logging Benchmark - Time a turn spends inside log handlers, synchronous versus the queued pipeline
+
+A "turn" replays the log lines the server writes while answering one spoken question:
+the recognized text, the question, the full agent response, tool calls and every
+spoken sentence. The time measured is what the answering thread spends in logging.
+
+Run: python benchmarks/bench_logging.py --turns 2000
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import AsyncLogging, LOG_FORMAT  # noqa: E402
+
+RESPONSE = ("Paris is the capital of France. " * 60).strip()
+SENTENCES = [sentence + '.' for sentence in RESPONSE.split('. ')[:6]]
+
+
+def turn(loggers: dict) -> None:
+    """Emits one turn's worth of log lines"""
+    loggers['speech_engine'].info("Processing speech...")
+    loggers['speech_engine'].info("Recognized: what is the capital of france")
+    loggers['action_executors'].info("Processing user input: what is the capital of france")
+    loggers['action_executors'].info("Attempting to open notepad on Windows")
+    loggers['action_executors'].info(f"Agent response: {RESPONSE}")
+    for sentence in SENTENCES:
+        loggers['app'].info(f"TTS worker speaking: {sentence[:50]}")
+        loggers['speech_engine'].info(f"Speaking: {sentence}")
+        loggers['app'].info("TTS worker: speech completed")
+    loggers['ui_manager'].info("Added user message: what is the capital of france")
+    loggers['ui_manager'].info(f"Added assistant message: {RESPONSE}")
+
+
+def measure(turns: int, loggers: dict, pipeline: AsyncLogging = None) -> list:
+    """Microseconds spent in logging per turn"""
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        turn(loggers)
+        samples.append((time.perf_counter() - start) * 1e6)
+        # Real turns are seconds apart; let the writer catch up (untimed) so nothing is dropped
+        while pipeline is not None and pipeline.queue.qsize():
+            time.sleep(0.0005)
+        time.sleep(0.002)
+    return samples
+
+
+def synchronous(path: str, console) -> logging.Logger:
+    """The old setup: basicConfig-style FileHandler + StreamHandler on the root logger"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+    for handler in (logging.FileHandler(path), logging.StreamHandler(console)):
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=2000, help='Turns per configuration')
+    parser.add_argument('--sample', default='ui_manager=0.1,speech_engine=0.25',
+                        help='LOG_SAMPLE used for the sampled configuration')
+    args = parser.parse_args()
+
+    from log_pipeline import parse_sample_rates
+    loggers = {name: logging.getLogger(name) for name in ('app', 'speech_engine', 'action_executors', 'ui_manager')}
+    lines_per_turn = 7 + 3 * len(SENTENCES)
+    print(f"{lines_per_turn} log lines per turn, agent response {len(RESPONSE)} chars\n")
+    print(f"{'configuration':<30} {'median us/turn':>15} {'p99 us/turn':>12} {'file MB':>8}")
+
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as console:
+        configurations = [
+            ('sync FileHandler + console', None),
+            ('queued, truncated', {}),
+            ('queued, truncated, sampled', parse_sample_rates(args.sample)),
+        ]
+        for name, sample_rates in configurations:
+            path = os.path.join(directory, name.replace(' ', '_').replace(',', '') + '.log')
+            root = logging.getLogger()
+            if sample_rates is None:
+                synchronous(path, console)
+                pipeline = None
+            else:
+                pipeline = AsyncLogging(path, sample_rates=sample_rates, max_message_chars=300)
+                pipeline.handlers[-1].setStream(console)
+                pipeline.install()
+            measure(min(200, args.turns), loggers, pipeline)
+            samples = sorted(measure(args.turns, loggers, pipeline))
+            if pipeline is not None:
+                pipeline.stop()
+            else:
+                for handler in list(root.handlers):
+                    root.removeHandler(handler)
+                    handler.close()
+            p99 = samples[int(len(samples) * 0.99) - 1]
+            size = os.path.getsize(path) / (1024 * 1024)
+            print(f"{name:<30} {statistics.median(samples):15.1f} {p99:12.1f} {size:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
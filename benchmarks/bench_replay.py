@@ -0,0 +1,491 @@
+"""
+Replay Benchmark - End-to-end turn latency and throughput of the server with recorded audio and a fake agent
+
+Drives the real VoiceAssistantServer, Flask routes and Socket.IO handlers in-process.
+Only the edges are replaced: WAV files (or synthetic phrases) stand in for the
+microphone, a local replay recognizer for Google STT, and a fake Strands Agent with
+configurable latency, streaming and tool calls for the LLM.
+
+Scenarios:
+  rest    POST /api/text-command from C concurrent clients, until assistant_message
+  socket  Socket.IO text_command from C concurrent clients, until assistant_message
+  voice   Phrases through the speech pipeline (one microphone), from end of speech
+          until assistant_message
+
+Run: python benchmarks/bench_replay.py --concurrency 1,4,16 --turns 200 --output replay.json
+     python benchmarks/bench_replay.py --wavs path/to/wavs --baseline replay.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import speech_recognition as sr  # noqa: E402
+from stt_backends import STTBackend, audio_duration  # noqa: E402
+from metrics import timed_tool  # noqa: E402
+from tracing import tracer  # noqa: E402
+
+# General questions only: commands like "open chrome" take the router's fast path and really launch apps
+QUESTIONS = [
+    "what is the capital of france",
+    "how far away is the moon",
+    "who wrote pride and prejudice",
+    "explain photosynthesis in one sentence",
+    "what is the boiling point of water",
+    "how many legs does a spider have",
+    "what does a voice assistant do",
+    "tell me something interesting about octopuses",
+]
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class WavAudioSource:
+    """
+    Phrases to 'speak' into the microphone
+
+    Each WAV file may have a transcript next to it (same name, .txt) that the replay
+    recognizer returns. Without a directory, silent phrases of a plausible length
+    (0.35 s per word) are generated for the built-in questions.
+    """
+
+    def __init__(self, directory: str = None, realtime: bool = False):
+        """
+        Args:
+            directory: Folder of WAV fixtures (None for synthetic phrases)
+            realtime: Take as long to capture a phrase as the phrase lasts
+        """
+        self.realtime = realtime
+        self.phrases = []
+        if directory:
+            recognizer = sr.Recognizer()
+            for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+                with sr.AudioFile(path) as source:
+                    audio = recognizer.record(source)
+                transcript_path = os.path.splitext(path)[0] + '.txt'
+                transcript = os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+                if os.path.exists(transcript_path):
+                    with open(transcript_path, encoding='utf-8') as f:
+                        transcript = f.read().strip()
+                self.phrases.append((audio, transcript))
+        else:
+            for question in QUESTIONS:
+                frames = int(0.35 * len(question.split()) * SAMPLE_RATE)
+                self.phrases.append((sr.AudioData(b'\x00\x00' * frames, SAMPLE_RATE, SAMPLE_WIDTH), question))
+        if not self.phrases:
+            raise ValueError(f"No WAV files in {directory}")
+        self.transcripts = {id(audio): transcript for audio, transcript in self.phrases}
+        self._index = 0
+
+    def next(self) -> sr.AudioData:
+        """Returns the next phrase, cycling through the fixtures"""
+        audio, _ = self.phrases[self._index % len(self.phrases)]
+        self._index += 1
+        if self.realtime:
+            time.sleep(audio_duration(audio))
+        return audio
+
+
+class ReplayBackend(STTBackend):
+    """Local recognizer returning each fixture's transcript after rtf x its duration"""
+
+    name = "replay"
+
+    def __init__(self, transcripts: dict, rtf: float = 0.1):
+        """
+        Args:
+            transcripts: id(AudioData) -> text, from WavAudioSource
+            rtf: Simulated real-time factor (0.1: a 2 s phrase takes 200 ms)
+        """
+        super().__init__()
+        self.transcripts = transcripts
+        self.rtf = rtf
+
+    def _transcribe(self, audio: sr.AudioData) -> str:
+        time.sleep(self.rtf * audio_duration(audio))
+        text = self.transcripts.get(id(audio))
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class ReplaySpeechEngine:
+    """
+    Stands in for SpeechEngine: audio comes from a WavAudioSource, text from ReplayBackend
+
+    capture() hands out one phrase per answered turn (the simulated user waits for the
+    reply before speaking again) and remembers when each phrase ended, which is where
+    voice turn latency is measured from. Speech output sleeps instead of playing.
+    """
+
+    def __init__(self, source: WavAudioSource, rtf: float = 0.1, tts_seconds_per_char: float = 0.0):
+        self.source = source
+        self.stt = ReplayBackend(source.transcripts, rtf=rtf)
+        self.tts_seconds_per_char = tts_seconds_per_char
+        self.remaining = 0
+        self.spoken_at = defaultdict(list)
+        self._turn = threading.Semaphore(0)
+        self._stop = threading.Event()
+
+    def expect(self, turns: int) -> None:
+        """Lets the user speak `turns` more phrases, one after each answer"""
+        self.remaining = turns
+        self._turn.release()
+
+    def answered(self) -> None:
+        """Called when a voice turn was answered; the user may speak again"""
+        if self.remaining > 0:
+            self._turn.release()
+
+    def capture(self) -> sr.AudioData:
+        if self.remaining <= 0 or not self._turn.acquire(timeout=0.5):
+            raise sr.WaitTimeoutError("no phrase scheduled")
+        self.remaining -= 1
+        audio = self.source.next()
+        self.spoken_at[self.source.transcripts[id(audio)]].append(time.perf_counter())
+        return audio
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        try:
+            return self.stt.transcribe(audio)
+        except sr.UnknownValueError:
+            return ""
+
+    def listen(self) -> str:
+        try:
+            return self.recognize(self.capture())
+        except sr.WaitTimeoutError:
+            return ""
+
+    def open_microphone(self) -> bool:
+        return True
+
+    def close_microphone(self) -> None:
+        pass
+
+    def speak(self, text: str) -> None:
+        if not self._stop.is_set():
+            self._stop.wait(self.tts_seconds_per_char * len(text))
+
+    def synthesize(self, text: str) -> tuple:
+        return None, False
+
+    def stop_speaking(self) -> None:
+        self._stop.set()
+
+    def reset_stop(self) -> None:
+        self._stop.clear()
+
+    def prerender(self, phrases: list) -> int:
+        return 0
+
+    def recognition_stats(self) -> dict:
+        return {'backends': {self.stt.name: self.stt.stats()}}
+
+
+def make_fake_agent(first_token: float, per_token: float, tokens: int, tool_calls: int, tool_latency: float):
+    """
+    Builds a stand-in for strands.Agent with the given timing
+
+    Args:
+        first_token: Seconds before the first streamed token (model latency)
+        per_token: Seconds between streamed tokens
+        tokens: Words in each answer
+        tool_calls: Tool calls made before answering
+        tool_latency: Seconds each tool call takes
+    """
+    @timed_tool()
+    @tracer.traced('tool:lookup_facts')
+    def lookup_facts(query: str) -> str:
+        time.sleep(tool_latency)
+        return f"Facts about {query}"
+
+    class FakeAgent:
+        """Answers every prompt the same way, streaming through callback_handler like Strands does"""
+
+        def __init__(self, tools=None, system_prompt=None, conversation_manager=None, **kwargs):
+            self.messages = []
+            self.conversation_manager = conversation_manager
+
+        def __call__(self, prompt: str, callback_handler=None, **kwargs):
+            self.messages.append({'role': 'user', 'content': [{'text': prompt}]})
+            for call in range(tool_calls):
+                result = lookup_facts(prompt)
+                tool_use_id = f"tool-{len(self.messages)}-{call}"
+                self.messages.append({'role': 'assistant', 'content': [
+                    {'toolUse': {'toolUseId': tool_use_id, 'name': 'lookup_facts', 'input': {'query': prompt}}}]})
+                self.messages.append({'role': 'user', 'content': [
+                    {'toolResult': {'toolUseId': tool_use_id, 'status': 'success', 'content': [{'text': result}]}}]})
+            time.sleep(first_token)
+            words = [f"word{i}" for i in range(max(1, tokens))]
+            words[-1] += '.'
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(per_token)
+                if callback_handler is not None:
+                    callback_handler(data=word + ' ')
+            answer = ' '.join(words)
+            self.messages.append({'role': 'assistant', 'content': [{'text': answer}]})
+            if self.conversation_manager is not None:
+                self.conversation_manager.apply_management(self)
+            return answer
+
+    return FakeAgent
+
+
+def summarize(values: list) -> dict:
+    """Latency percentiles in milliseconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(fraction):
+        return ordered[max(0, int(round(fraction * len(ordered) + 0.5)) - 1)]
+
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': rank(0.50),
+        'p90': rank(0.90),
+        'p95': rank(0.95),
+        'p99': rank(0.99),
+        'max': ordered[-1],
+    }
+
+
+class Harness:
+    """The in-process server plus bookkeeping of when each request's events were emitted"""
+
+    def __init__(self, engine: ReplaySpeechEngine):
+        import app as server_app
+        from lazy_component import LazyComponent
+
+        self.server_app = server_app
+        self.server = server_app.assistant_server
+        self.engine = engine
+        self.server._speech_engine = LazyComponent('speech_engine', lambda: engine)
+        self._lock = threading.Lock()
+        self._done = defaultdict(threading.Event)
+        self.finished_at = {}
+        self.first_token_at = {}
+        self.voice_text = {}
+        self.voice_latencies = []
+
+        emit_session = self.server.emit_session
+
+        def recording_emit(event, payload, session_id=None):
+            now = time.perf_counter()
+            request_id = payload.get('request_id')
+            if request_id:
+                with self._lock:
+                    if event == 'assistant_message_delta':
+                        self.first_token_at.setdefault(request_id, now)
+                    elif event == 'user_message' and session_id is None:
+                        self.voice_text[request_id] = payload['text']
+                    elif event in ('assistant_message', 'error'):
+                        self.finished_at[request_id] = (now, event == 'error')
+                        self._done[request_id].set()
+                        if session_id is None:
+                            self._voice_answered(request_id, now)
+            emit_session(event, payload, session_id)
+
+        self.server.emit_session = recording_emit
+
+    def _voice_answered(self, request_id: str, now: float) -> None:
+        spoken = self.engine.spoken_at.get(self.voice_text.get(request_id))
+        if spoken:
+            self.voice_latencies.append((now - spoken.pop(0)) * 1000)
+        self.engine.answered()
+
+    def wait(self, request_id: str, timeout: float = 60) -> tuple:
+        """Blocks until the request's assistant_message or error; returns (time, failed)"""
+        with self._lock:
+            done = self._done[request_id]
+        if not done.wait(timeout):
+            return None, True
+        with self._lock:
+            self._done.pop(request_id, None)
+            return self.finished_at.pop(request_id)
+
+    def run_text(self, transport: str, concurrency: int, turns: int) -> dict:
+        """C clients each sending commands back to back until `turns` have been sent in total"""
+        latencies, first_tokens, errors = [], [], []
+        counter = iter(range(turns))
+        counter_lock = threading.Lock()
+
+        def client(index):
+            session_id = f"bench-{transport}-{concurrency}-{index}"
+            http = self.server_app.app.test_client()
+            socket = None
+            if transport == 'socket':
+                socket = self.server_app.socketio.test_client(self.server_app.app, auth={'session_id': session_id})
+            while True:
+                with counter_lock:
+                    turn = next(counter, None)
+                if turn is None:
+                    break
+                text = QUESTIONS[turn % len(QUESTIONS)]
+                start = time.perf_counter()
+                if socket is not None:
+                    ack = socket.emit('text_command', {'text': text}, callback=True) or {}
+                    socket.get_received()
+                    request_id = ack.get('request_id') if ack.get('success') else None
+                else:
+                    response = http.post('/api/text-command', json={'text': text, 'session_id': session_id})
+                    request_id = response.get_json().get('request_id') if response.status_code == 202 else None
+                if request_id is None:
+                    errors.append('rejected')
+                    continue
+                finished, failed = self.wait(request_id)
+                if failed:
+                    errors.append('error' if finished else 'timeout')
+                    continue
+                latencies.append((finished - start) * 1000)
+                with self._lock:
+                    first = self.first_token_at.pop(request_id, None)
+                if first is not None:
+                    first_tokens.append((first - start) * 1000)
+            if socket is not None:
+                socket.disconnect()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return self._result(transport, concurrency, latencies, first_tokens, errors, elapsed)
+
+    def run_voice(self, turns: int) -> dict:
+        """Phrases through the speech pipeline, each spoken after the previous answer"""
+        self.voice_latencies = []
+        start = time.perf_counter()
+        self.engine.expect(turns)
+        self.server.start_listening()
+        deadline = time.monotonic() + 60 + turns * 5
+        while len(self.voice_latencies) < turns and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        self.engine.remaining = 0
+        self.server.stop_listening()
+        errors = ['timeout'] * (turns - len(self.voice_latencies))
+        return self._result('voice', 1, list(self.voice_latencies), [], errors, elapsed)
+
+    @staticmethod
+    def _result(scenario: str, concurrency: int, latencies: list, first_tokens: list, errors: list,
+                elapsed: float) -> dict:
+        return {
+            'scenario': scenario,
+            'concurrency': concurrency,
+            'turns': len(latencies),
+            'errors': len(errors),
+            'seconds': elapsed,
+            'turns_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'latency_ms': summarize(latencies),
+            'first_token_ms': summarize(first_tokens),
+        }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def print_results(results: list, baseline: dict = None) -> None:
+    """Prints one row per scenario and concurrency, with the change against a baseline run"""
+    previous = {(row['scenario'], row['concurrency']): row for row in (baseline or {}).get('results', [])}
+    print(f"{'scenario':<8} {'conc':>4} {'turns':>6} {'err':>4} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'ttft p50':>9}  vs baseline")
+    for row in results:
+        latency = row['latency_ms']
+        ttft = row['first_token_ms'].get('p50')
+        old = previous.get((row['scenario'], row['concurrency']))
+        change = '-'
+        if old and old['latency_ms'] and latency:
+            change = (f"p95 {latency['p95'] - old['latency_ms']['p95']:+.1f} ms, "
+                      f"{row['turns_per_sec'] - old['turns_per_sec']:+.2f} turns/s")
+        print(f"{row['scenario']:<8} {row['concurrency']:4d} {row['turns']:6d} {row['errors']:4d} "
+              f"{row['turns_per_sec']:8.2f} {latency.get('p50', 0):8.1f} {latency.get('p95', 0):8.1f} "
+              f"{latency.get('p99', 0):8.1f} {f'{ttft:.1f}' if ttft is not None else '-':>9}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default='rest,socket,voice', help='Comma-separated: rest, socket, voice')
+    parser.add_argument('--concurrency', default='1,4,16', help='Concurrent clients for rest/socket')
+    parser.add_argument('--turns', type=int, default=100, help='Turns per scenario and concurrency level')
+    parser.add_argument('--wavs', help='Directory of WAV fixtures with .txt transcripts (default: synthetic)')
+    parser.add_argument('--realtime', action='store_true', help='Capture takes as long as each phrase lasts')
+    parser.add_argument('--stt-rtf', type=float, default=0.1, help='Replay recognizer real-time factor')
+    parser.add_argument('--first-token-ms', type=float, default=300, help='Fake agent latency to first token')
+    parser.add_argument('--token-ms', type=float, default=15, help='Fake agent time between tokens')
+    parser.add_argument('--tokens', type=int, default=30, help='Words per fake answer')
+    parser.add_argument('--tool-calls', type=int, default=1, help='Tool calls per fake answer')
+    parser.add_argument('--tool-ms', type=float, default=50, help='Fake tool call latency')
+    parser.add_argument('--cache', action='store_true', help='Keep the response cache on (repeated questions hit it)')
+    parser.add_argument('--output', help='Write results as JSON (diff it against another release)')
+    parser.add_argument('--baseline', help='Earlier JSON result to compare against')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+    # The server reads its configuration when app is imported
+    os.environ.update({
+        'WARMUP': '0', 'TRACE_FILE': '', 'LOG_FILE': '', 'LOG_LEVEL': 'WARNING', 'TTS_OUTPUT': 'speaker',
+        'AGENT_WORKERS': str(max(levels + [4])), 'AGENT_MAX_CONCURRENT': str(max(levels + [4])),
+        'AGENT_MAX_PENDING': str(max(levels) * 4 + 32), 'AGENT_SPARES': '0',
+    })
+    if not args.cache:
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'
+    import action_executors
+    action_executors.Agent = make_fake_agent(args.first_token_ms / 1000, args.token_ms / 1000, args.tokens,
+                                             args.tool_calls, args.tool_ms / 1000)
+
+    engine = ReplaySpeechEngine(WavAudioSource(args.wavs, realtime=args.realtime), rtf=args.stt_rtf)
+    harness = Harness(engine)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    results = []
+    for scenario in scenarios:
+        if scenario == 'voice':
+            results.append(harness.run_voice(args.turns))
+            continue
+        for level in levels:
+            results.append(harness.run_text(scenario, level, args.turns))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'meta': {
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'config': vars(args),
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Screenshot Benchmark - Time the take_screenshot caller waits, synchronous PNG save versus the encoder pool
+
+The image source is injected: a synthetic desktop (flat panels, gradients and a noisy
+photo-like area) the size of three 4K monitors, so this runs headless. "caller ms" is
+the time the tool call blocks; "encode ms" is the worker's downscale + encode + write.
+
+Run: python benchmarks/bench_screenshot.py --monitors 3 --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from screenshot_encoder import ScreenshotEncoder  # noqa: E402
+
+
+def synthetic_desktop(monitors: int):
+    """A 3840x2160-per-monitor frame with UI-like flat areas and one photo-like region"""
+    from PIL import Image, ImageDraw
+    width, height = 3840 * monitors, 2160
+    image = Image.new('RGB', (width, height), (32, 34, 40))
+    draw = ImageDraw.Draw(image)
+    for monitor in range(monitors):
+        left = monitor * 3840
+        draw.rectangle([left, 0, left + 3839, 60], fill=(230, 230, 235))
+        for row in range(120, height - 200, 48):
+            draw.rectangle([left + 200, row, left + 200 + (row * 7) % 2400, row + 20], fill=(200, 205, 210))
+        gradient = Image.linear_gradient('L').resize((1200, 800)).convert('RGB')
+        image.paste(gradient, (left + 2400, 200))
+        noise = Image.effect_noise((1200, 800), 64).convert('RGB')
+        image.paste(noise, (left + 2400, 1200))
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--monitors', type=int, default=3, help='4K monitors side by side')
+    parser.add_argument('--runs', type=int, default=5, help='Screenshots per configuration')
+    args = parser.parse_args()
+
+    frame = synthetic_desktop(args.monitors)
+    print(f"Frame {frame.width}x{frame.height}, {args.runs} runs per configuration\n")
+    print(f"{'configuration':<32} {'caller ms':>10} {'encode ms':>10} {'file KB':>9}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The old tool: grab and a full PNG save on the calling thread
+        samples = []
+        for run in range(args.runs):
+            start = time.perf_counter()
+            frame.copy().save(os.path.join(directory, f'sync_{run}.png'))
+            samples.append((time.perf_counter() - start) * 1000)
+        size = os.path.getsize(os.path.join(directory, 'sync_0.png')) / 1024
+        median = statistics.median(samples)
+        print(f"{'sync PNG save (old)':<32} {median:10.1f} {median:10.1f} {size:9.0f}")
+
+        encoder = ScreenshotEncoder(grab=lambda region, all_screens: frame.copy(), directory=directory)
+        configurations = [
+            ('pool PNG level 6', {'image_format': 'png'}),
+            ('pool PNG level 1', {'image_format': 'png'}),
+            ('pool JPEG q85', {'image_format': 'jpeg'}),
+            ('pool WebP q80', {'image_format': 'webp', 'quality': 80}),
+            ('pool JPEG q85, 1/2 scale', {'image_format': 'jpeg', 'scale': 0.5}),
+            ('pool PNG level 6, 1/2 scale', {'image_format': 'png', 'scale': 0.5}),
+        ]
+        try:
+            encoder.capture('warm_up', scale=0.1)[1].result()
+            for label, options in configurations:
+                encoder.png_level = 1 if 'level 1' in label else 6
+                callers, encodes = [], []
+                for run in range(args.runs):
+                    start = time.perf_counter()
+                    path, future = encoder.capture(f"{label.replace(' ', '_').replace(',', '')}_{run}", **options)
+                    callers.append((time.perf_counter() - start) * 1000)
+                    result = future.result()
+                    encodes.append(result['encode_ms'])
+                size = result['bytes'] / 1024
+                print(f"{label:<32} {statistics.median(callers):10.1f} {statistics.median(encodes):10.1f} "
+                      f"{size:9.0f}")
+        finally:
+            encoder.shutdown()
+
+
+if __name__ == "__main__":
+    main()
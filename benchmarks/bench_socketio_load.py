@@ -0,0 +1,319 @@
+"""
+Socket.IO Load Benchmark - Saturation curve of one server process under many concurrent browser-like clients
+
+Starts app.py in a child process with a fake agent (see bench_replay.py), or targets
+--url. For each client count it connects that many python-socketio clients, then for
+--duration seconds each one sends text_command at --rate per second and toggles
+start_listening/stop_listening at --listen-rate per second. Reported per step:
+connect time, ack and reply round-trip latency, listening toggle round trip, late
+and dropped replies, busy rejections and the server's resident memory.
+
+The clients use python-socketio's asyncio client, which needs aiohttp.
+
+Run: python benchmarks/bench_socketio_load.py --clients 25,50,100,200 --duration 20 --output load.json
+CI:  python benchmarks/bench_socketio_load.py --clients 10,50 --duration 10 --require-clients 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+import socketio
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_replay import QUESTIONS, summarize  # noqa: E402
+
+
+def serve(args) -> None:
+    """Runs app.py on --port with the fake agent and replay speech engine (child process mode)"""
+    os.environ.update({'WARMUP': '0', 'TRACE_FILE': '', 'LOG_FILE': '', 'LOG_LEVEL': 'WARNING',
+                       'TTS_OUTPUT': 'speaker', 'RESPONSE_CACHE_SIZE': '0', 'AGENT_SPARES': '0'})
+    import action_executors
+    from bench_replay import make_fake_agent, ReplaySpeechEngine, WavAudioSource
+    action_executors.Agent = make_fake_agent(args.first_token_ms / 1000, args.token_ms / 1000, args.tokens,
+                                             args.tool_calls, args.tool_ms / 1000)
+    import app as server_app
+    from lazy_component import LazyComponent
+    engine = ReplaySpeechEngine(WavAudioSource())
+    server_app.assistant_server._speech_engine = LazyComponent('speech_engine', lambda: engine)
+    server_app.socketio.run(server_app.app, host='127.0.0.1', port=args.port, allow_unsafe_werkzeug=True)
+
+
+class StepStats:
+    """Samples collected during one load step"""
+
+    def __init__(self):
+        self.connect_ms = []
+        self.connect_failures = 0
+        self.ack_ms = []
+        self.reply_ms = []
+        self.listen_ms = []
+        self.sent = 0
+        self.rejected = 0
+        self.errors = 0
+        self.late = 0
+        self.dropped = 0
+
+
+class LoadClient:
+    """One simulated browser tab"""
+
+    def __init__(self, url: str, transports: list, stats: StepStats, late_ms: float, reply_timeout: float):
+        self.url = url
+        self.transports = transports
+        self.stats = stats
+        self.late_ms = late_ms
+        self.reply_timeout = reply_timeout
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.pending = {}
+        self.arrived = {}
+        self.sio.on('assistant_message', self._on_reply)
+        self.sio.on('error', self._on_reply)
+
+    async def _on_reply(self, data):
+        request_id = (data or {}).get('request_id')
+        if not request_id:
+            return
+        future = self.pending.pop(request_id, None)
+        if future is None:
+            self.arrived[request_id] = time.perf_counter()
+        elif not future.done():
+            future.set_result(time.perf_counter())
+
+    async def connect(self) -> bool:
+        start = time.perf_counter()
+        try:
+            await self.sio.connect(self.url, transports=self.transports, wait_timeout=30)
+        except Exception:
+            self.stats.connect_failures += 1
+            return False
+        self.stats.connect_ms.append((time.perf_counter() - start) * 1000)
+        return True
+
+    async def disconnect(self) -> None:
+        try:
+            await self.sio.disconnect()
+        except Exception:
+            pass
+
+    async def text_command(self) -> None:
+        self.stats.sent += 1
+        start = time.perf_counter()
+        try:
+            ack = await self.sio.call('text_command', {'text': random.choice(QUESTIONS)}, timeout=self.reply_timeout)
+        except Exception:
+            self.stats.dropped += 1
+            return
+        self.stats.ack_ms.append((time.perf_counter() - start) * 1000)
+        if not (ack or {}).get('success'):
+            self.stats.rejected += 1
+            return
+        request_id = ack['request_id']
+        finished = self.arrived.pop(request_id, None)
+        if finished is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[request_id] = future
+            try:
+                finished = await asyncio.wait_for(future, self.reply_timeout)
+            except asyncio.TimeoutError:
+                self.pending.pop(request_id, None)
+                self.stats.dropped += 1
+                return
+        elapsed = (finished - start) * 1000
+        self.stats.reply_ms.append(elapsed)
+        if elapsed > self.late_ms:
+            self.stats.late += 1
+
+    async def toggle_listening(self) -> None:
+        for event in ('start_listening', 'stop_listening'):
+            start = time.perf_counter()
+            try:
+                await self.sio.call(event, timeout=self.reply_timeout)
+            except Exception:
+                self.stats.errors += 1
+                continue
+            self.stats.listen_ms.append((time.perf_counter() - start) * 1000)
+
+    async def run(self, duration: float, rate: float, listen_rate: float) -> None:
+        """Open loop: commands are sent at the configured rate whether or not replies have arrived"""
+        tasks = []
+        deadline = time.monotonic() + duration
+        next_command = time.monotonic() + random.expovariate(rate) if rate > 0 else float('inf')
+        next_toggle = time.monotonic() + random.expovariate(listen_rate) if listen_rate > 0 else float('inf')
+        while True:
+            due = min(next_command, next_toggle)
+            if due >= deadline:
+                break
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            if due == next_command:
+                tasks.append(asyncio.create_task(self.text_command()))
+                next_command += random.expovariate(rate)
+            else:
+                tasks.append(asyncio.create_task(self.toggle_listening()))
+                next_toggle += random.expovariate(listen_rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+async def server_memory(http_url: str) -> float:
+    """Resident memory of the server in MB, from /api/metrics (0 if unavailable)"""
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{http_url}/api/metrics", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                text = await response.text()
+    except Exception:
+        return 0.0
+    for line in text.splitlines():
+        if line.startswith('process_resident_memory_bytes '):
+            return float(line.split()[1]) / (1024 * 1024)
+    return 0.0
+
+
+async def run_step(args, clients: int) -> dict:
+    """Connects `clients` clients, drives load for the duration and summarizes"""
+    stats = StepStats()
+    transports = ['websocket'] if args.transport == 'websocket' else ['polling']
+    pool = [LoadClient(args.url, transports, stats, args.late_ms, args.reply_timeout) for _ in range(clients)]
+    connecting = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(client):
+        async with connecting:
+            return await client.connect()
+
+    connected = [client for client, ok in zip(pool, await asyncio.gather(*(connect(c) for c in pool))) if ok]
+    memory_idle = await server_memory(args.url)
+    start = time.perf_counter()
+    await asyncio.gather(*(client.run(args.duration, args.rate, args.listen_rate) for client in connected))
+    elapsed = time.perf_counter() - start
+    memory_loaded = await server_memory(args.url)
+    await asyncio.gather(*(client.disconnect() for client in connected))
+
+    answered = len(stats.reply_ms)
+    result = {
+        'clients': clients,
+        'connected': len(connected),
+        'connect_failures': stats.connect_failures,
+        'offered_per_sec': clients * args.rate,
+        'sent': stats.sent,
+        'answered': answered,
+        'answered_per_sec': answered / elapsed if elapsed > 0 else 0.0,
+        'rejected': stats.rejected,
+        'late': stats.late,
+        'dropped': stats.dropped,
+        'errors': stats.errors,
+        'connect_ms': summarize(stats.connect_ms),
+        'ack_ms': summarize(stats.ack_ms),
+        'reply_ms': summarize(stats.reply_ms),
+        'listen_toggle_ms': summarize(stats.listen_ms),
+        'server_rss_mb_idle': memory_idle,
+        'server_rss_mb_loaded': memory_loaded,
+    }
+    lost = stats.dropped + stats.rejected + stats.connect_failures
+    result['saturated'] = bool(
+        lost > 0.01 * max(1, stats.sent + clients)
+        or (answered and result['reply_ms']['p95'] > args.late_ms)
+    )
+    return result
+
+
+def start_server(args) -> subprocess.Popen:
+    """Starts this script in --serve mode and waits for /api/health"""
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port),
+               '--first-token-ms', str(args.first_token_ms), '--token-ms', str(args.token_ms),
+               '--tokens', str(args.tokens), '--tool-calls', str(args.tool_calls), '--tool-ms', str(args.tool_ms)]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    import urllib.request
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"{args.url}/api/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 60s")
+
+
+def print_curve(results: list, header: bool = True) -> None:
+    if header:
+        print(f"{'clients':>7} {'offered/s':>9} {'answered/s':>10} {'conn p95':>8} {'ack p95':>8} {'reply p50':>9} "
+              f"{'reply p95':>9} {'reply p99':>9} {'listen p95':>10} {'late':>5} {'drop':>5} {'busy':>5} "
+              f"{'rss MB':>7}  state")
+    for row in results:
+        def p(name, key):
+            return row[name].get(key, 0.0)
+        print(f"{row['clients']:7d} {row['offered_per_sec']:9.1f} {row['answered_per_sec']:10.1f} "
+              f"{p('connect_ms', 'p95'):8.1f} {p('ack_ms', 'p95'):8.1f} {p('reply_ms', 'p50'):9.1f} "
+              f"{p('reply_ms', 'p95'):9.1f} {p('reply_ms', 'p99'):9.1f} {p('listen_toggle_ms', 'p95'):10.1f} "
+              f"{row['late']:5d} {row['dropped']:5d} {row['rejected']:5d} {row['server_rss_mb_loaded']:7.1f}  "
+              f"{'SATURATED' if row['saturated'] else 'ok'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', default='25,50,100,200', help='Client counts, one load step each')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of load per step')
+    parser.add_argument('--rate', type=float, default=0.1, help='text_command per client per second')
+    parser.add_argument('--listen-rate', type=float, default=0.01,
+                        help='start/stop_listening toggles per client per second')
+    parser.add_argument('--transport', choices=('websocket', 'polling'), default='websocket')
+    parser.add_argument('--late-ms', type=float, default=5000, help='Replies slower than this count as late')
+    parser.add_argument('--reply-timeout', type=float, default=30, help='Seconds before a reply counts as dropped')
+    parser.add_argument('--connect-concurrency', type=int, default=50, help='Handshakes in flight at once')
+    parser.add_argument('--url', help='Existing server (default: start one with the fake agent)')
+    parser.add_argument('--port', type=int, default=5055, help='Port of the server started by this script')
+    parser.add_argument('--first-token-ms', type=float, default=300, help='Fake agent latency to first token')
+    parser.add_argument('--token-ms', type=float, default=15, help='Fake agent time between tokens')
+    parser.add_argument('--tokens', type=int, default=30, help='Words per fake answer')
+    parser.add_argument('--tool-calls', type=int, default=1, help='Tool calls per fake answer')
+    parser.add_argument('--tool-ms', type=float, default=50, help='Fake tool call latency')
+    parser.add_argument('--output', help='Write the curve as JSON')
+    parser.add_argument('--require-clients', type=int,
+                        help='Exit with status 1 if the server saturates at or below this many clients (CI)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return 0
+
+    process = None
+    if not args.url:
+        args.url = f"http://127.0.0.1:{args.port}"
+        process = start_server(args)
+    try:
+        results = []
+        for clients in [int(value) for value in args.clients.split(',') if value.strip()]:
+            results.append(asyncio.run(run_step(args, clients)))
+            # One row per step as soon as it finishes
+            print_curve(results[-1:], header=len(results) == 1)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    saturation = next((row['clients'] for row in results if row['saturated']), None)
+    print(f"\nSaturated at {saturation} clients" if saturation else "\nNot saturated at any step")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': {key: value for key, value in vars(args).items() if key != 'serve'},
+                       'saturated_at': saturation, 'steps': results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.require_clients and saturation is not None and saturation <= args.require_clients:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
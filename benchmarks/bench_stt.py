@@ -0,0 +1,128 @@
+"""
+Speech-to-Text Benchmark - Real-time factor and word error rate per backend on WAV fixtures
+
+Each fixture is a mono WAV file; an optional transcript with the same name and a .txt
+extension enables word error rate. Backends that fail to load are skipped.
+
+Run: python benchmarks/bench_stt.py --fixtures path/to/wavs --backends vosk,whisper,google
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+from stt_backends import audio_duration, create_backend
+from response_cache import normalize_question
+
+
+def load_fixtures(directory: str) -> list:
+    """
+    Loads WAV fixtures and their optional transcripts
+
+    Returns:
+        list: (name, AudioData, transcript or None) tuples
+    """
+    recognizer = sr.Recognizer()
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        with sr.AudioFile(path) as source:
+            audio = recognizer.record(source)
+        transcript_path = os.path.splitext(path)[0] + '.txt'
+        transcript = None
+        if os.path.exists(transcript_path):
+            with open(transcript_path, encoding='utf-8') as f:
+                transcript = f.read()
+        fixtures.append((os.path.basename(path), audio, transcript))
+    return fixtures
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """
+    Counts word-level edits between a transcript and a recognition result
+
+    Returns:
+        tuple: (edit distance, reference word count)
+    """
+    ref = normalize_question(reference).split()
+    hyp = normalize_question(hypothesis).split()
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1], len(ref)
+
+
+def run_backend(backend, fixtures: list) -> dict:
+    """
+    Transcribes every fixture once (after one warm-up call) and aggregates the results
+
+    Returns:
+        dict: Real-time factor, failures and word error rate
+    """
+    if fixtures:
+        try:
+            backend.transcribe(fixtures[0][1])
+        except Exception:
+            pass
+
+    rtfs = []
+    failures = 0
+    errors = words = 0
+    for _, audio, transcript in fixtures:
+        start = time.perf_counter()
+        try:
+            text = backend.transcribe(audio)
+        except sr.UnknownValueError:
+            text = ""
+        except Exception:
+            failures += 1
+            continue
+        rtfs.append((time.perf_counter() - start) / max(audio_duration(audio), 1e-9))
+        if transcript is not None:
+            edits, count = word_errors(transcript, text)
+            errors += edits
+            words += count
+    rtfs.sort()
+    return {
+        'rtf_mean': sum(rtfs) / len(rtfs) if rtfs else float('nan'),
+        'rtf_p95': rtfs[int(0.95 * (len(rtfs) - 1))] if rtfs else float('nan'),
+        'failures': failures,
+        'wer': errors / words if words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fixtures', required=True, help='Directory of WAV files (with optional .txt transcripts)')
+    parser.add_argument('--backends', default='vosk,whisper,google', help='Comma-separated backend names')
+    parser.add_argument('--vosk-model', default='model', help='Vosk model directory')
+    parser.add_argument('--whisper-model', default='base.en', help='Whisper model name or path')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    fixtures = load_fixtures(args.fixtures)
+    if not fixtures:
+        parser.error(f"No WAV files in {args.fixtures}")
+    total = sum(audio_duration(audio) for _, audio, _ in fixtures)
+    print(f"Fixtures: {len(fixtures)} files, {total:.1f}s of audio")
+    print(f"{'backend':<10} {'RTF mean':>9} {'RTF p95':>9} {'failures':>9} {'WER':>7}")
+
+    for name in args.backends.split(','):
+        backend = create_backend(name.strip(), sr.Recognizer(), vosk_model_path=args.vosk_model,
+                                 whisper_model=args.whisper_model)
+        if backend is None:
+            print(f"{name:<10} (not available)")
+            continue
+        result = run_backend(backend, fixtures)
+        wer = f"{result['wer']:.1%}" if result['wer'] is not None else "-"
+        print(f"{name:<10} {result['rtf_mean']:9.3f} {result['rtf_p95']:9.3f} {result['failures']:9d} {wer:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,63 @@ from models import Command, CommandIntent
 
 logger = logging.getLogger(__name__)
 
+# Politeness/wake-up words that may precede a direct command
+COMMAND_PREFIX = re.compile(r'^(?:(?:please|hey|ok|okay|buddy|ai buddy|can you|could you|would you|will you)[\s,]+)+')
+
+# A second action chained onto the first ("open chrome and play despacito") needs the agent
+COMPOUND = re.compile(r'\b(?:then|after that|and (?:then |also )?(?:open|launch|start|run|play|search|tell|set|take|close|show))\b')
+
+# App names do not contain conjunctions; "open word and excel" is two commands
+APP_CONJUNCTION = re.compile(r'\b(?:and|then)\b')
+
+# "play" that is not about music ("play a game with me"), unless music is also mentioned
+NOT_MUSIC = re.compile(r'^(?:a|an|with|along)\b|\b(?:game|games|chess|quiz|trick|tricks|with me|along)\b')
+MUSIC_HINT = re.compile(r'\b(?:music|song|songs|playlist|album|track|by|on youtube)\b')
+
+# App names that never go through the resolver
+BUILTIN_APPS = ('youtube', 'yt')
+
 
 class CommandProcessor:
     """Processes voice commands and extracts intent and parameters"""
     
-    def __init__(self):
+    def __init__(self, resolver=None):
+        """
+        Initializes the keyword patterns
+        
+        Args:
+            resolver: Optional AppResolver; when given, "open X" is only a confident
+                      command if X resolves to a known application
+        """
+        self.resolver = resolver
         # Keywords for different intents
         self.exit_keywords = ['bye', 'exit', 'quit', 'goodbye', 'stop']
         self.open_keywords = ['open', 'launch', 'start', 'run']
         self.music_keywords = ['play', 'music', 'song']
         
+        # Compile all keywords into one word-bounded pattern, built once, that classifies
+        # and extracts the parameter in a single match ("stop" no longer matches inside
+        # "nonstop"). The alternatives keep the original priority: an exit keyword anywhere
+        # wins, then the first open keyword followed by a name, then the first music keyword.
+        # A plain alternation of every keyword rejects ordinary questions in one scan first.
+        self._keyword_pattern = re.compile(
+            rf'\b(?:{self._alternation(self.exit_keywords + self.open_keywords + self.music_keywords)})\b'
+        )
+        self._command_pattern = re.compile(
+            rf'(?=.*?\b(?P<exit>{self._alternation(self.exit_keywords)})\b)'
+            rf'|.*?\b(?P<open>{self._alternation(self.open_keywords)})\b\s+(?P<app_name>.+)'
+            rf'|.*?\b(?P<music>{self._alternation(self.music_keywords)})\b\s+(?P<song_name>.+)',
+            re.DOTALL
+        )
+        self._app_suffix = re.compile(r'\s+(please|now|application|app)$')
+        self._song_suffix = re.compile(r'\s+(please|now|on youtube)$')
+        self._punctuation = re.compile(r'[^\w\s]')
+        
+    @staticmethod
+    def _alternation(keywords: list) -> str:
+        """Builds a regex alternation, longest keyword first"""
+        return '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    
     def process_command(self, text: str) -> Command:
         """
         Analyzes text and returns a Command object with intent and parameters
@@ -35,34 +82,38 @@ class CommandProcessor:
             )
         
         text_lower = text.lower().strip()
+        match = self._command_pattern.match(text_lower) if self._keyword_pattern.search(text_lower) else None
         
         # Check for exit command
-        if self._is_exit_command(text_lower):
+        if match and match.group('exit'):
             logger.info("Exit command detected")
             return Command(
                 intent=CommandIntent.EXIT,
                 parameters={},
-                raw_text=text
+                raw_text=text,
+                confidence=self._exit_confidence(text_lower)
             )
         
         # Check for open application command
-        app_name = self._extract_app_name(text_lower)
-        if app_name:
+        if match and match.group('open'):
+            app_name = self._app_suffix.sub('', match.group('app_name').strip())
             logger.info(f"Open app command detected: {app_name}")
             return Command(
                 intent=CommandIntent.OPEN_APP,
                 parameters={'app_name': app_name},
-                raw_text=text
+                raw_text=text,
+                confidence=self._open_confidence(text_lower, match.start('open'), app_name)
             )
         
         # Check for music playback command
-        song_name = self._extract_song_name(text_lower)
-        if song_name:
+        if match and match.group('music'):
+            song_name = self._song_suffix.sub('', match.group('song_name').strip())
             logger.info(f"Play music command detected: {song_name}")
             return Command(
                 intent=CommandIntent.PLAY_MUSIC,
                 parameters={'song_name': song_name},
-                raw_text=text
+                raw_text=text,
+                confidence=self._music_confidence(text_lower, match.start('music'), song_name)
             )
         
         # Default to question answering
@@ -73,50 +124,70 @@ class CommandProcessor:
             raw_text=text
         )
     
-    def _is_exit_command(self, text: str) -> bool:
-        """Check if text contains exit keywords"""
-        return any(keyword in text for keyword in self.exit_keywords)
-    
-    def _extract_app_name(self, text: str) -> str:
+    def _exit_confidence(self, text: str) -> float:
         """
-        Extract application name from open command
+        Scores an exit command: a bare "bye"/"quit" is certain, a longer sentence is not
         
         Args:
-            text: The voice input text
+            text: The lowercased voice input text
             
         Returns:
-            str: Application name if found, empty string otherwise
+            float: Confidence between 0 and 1
         """
-        for keyword in self.open_keywords:
-            if keyword in text:
-                # Find text after the keyword
-                pattern = rf'{keyword}\s+(.+)'
-                match = re.search(pattern, text)
-                if match:
-                    app_name = match.group(1).strip()
-                    # Remove common trailing words
-                    app_name = re.sub(r'\s+(please|now|application|app)$', '', app_name)
-                    return app_name
-        return ""
+        if text in self.exit_keywords:
+            return 1.0
+        words = COMMAND_PREFIX.sub('', self._punctuation.sub(' ', text).strip()).split()
+        if words and all(word in self.exit_keywords for word in words):
+            return 1.0
+        return 0.3
     
-    def _extract_song_name(self, text: str) -> str:
+    def _command_confidence(self, text: str, keyword_start: int, parameter: str) -> float:
         """
-        Extract song name from music command
+        Scores an open/play command by where its keyword appears
+        
+        "open chrome" or "can you play despacito" lead with the keyword and are direct
+        commands; "how do I start a business" only contains one and is really a question.
         
         Args:
-            text: The voice input text
+            text: The lowercased voice input text
+            keyword_start: Character offset of the matched keyword
+            parameter: The extracted app or song name
             
         Returns:
-            str: Song name if found, empty string otherwise
+            float: Confidence between 0 and 1
         """
-        for keyword in self.music_keywords:
-            if keyword in text:
-                # Find text after the keyword
-                pattern = rf'{keyword}\s+(.+)'
-                match = re.search(pattern, text)
-                if match:
-                    song_name = match.group(1).strip()
-                    # Remove common trailing words
-                    song_name = re.sub(r'\s+(please|now|on youtube)$', '', song_name)
-                    return song_name
-        return ""
+        leads = keyword_start == 0
+        if not leads:
+            prefix = COMMAND_PREFIX.match(text)
+            leads = prefix is not None and keyword_start == prefix.end()
+        confidence = 0.9 if leads else 0.4
+        if text.endswith('?'):
+            confidence -= 0.2
+        if len(parameter.split()) > 5:
+            confidence -= 0.2
+        return max(confidence, 0.0)
+    
+    def _open_confidence(self, text: str, keyword_start: int, app_name: str) -> float:
+        """
+        Scores an open command; only a name that resolves to a known application is certain
+        
+        "start over", "run a quick test" and "open the door" lead with an open keyword
+        but name no application, and "open chrome and play despacito" is two commands.
+        """
+        confidence = self._command_confidence(text, keyword_start, app_name)
+        if APP_CONJUNCTION.search(app_name):
+            return min(confidence, 0.3)
+        if self.resolver is not None and app_name not in BUILTIN_APPS:
+            match = self.resolver.resolve(app_name)
+            if match.score < self.resolver.threshold:
+                return min(confidence, 0.4)
+        return confidence
+    
+    def _music_confidence(self, text: str, keyword_start: int, song_name: str) -> float:
+        """Scores a play command; chained commands and games are left to the agent"""
+        confidence = self._command_confidence(text, keyword_start, song_name)
+        if COMPOUND.search(song_name):
+            return min(confidence, 0.3)
+        if NOT_MUSIC.search(song_name) and not MUSIC_HINT.search(text):
+            return min(confidence, 0.4)
+        return confidence
@@ -0,0 +1,125 @@
+"""
+Command Router - Sends clear-cut commands straight to their tools, everything else to the agent
+"""
+import logging
+import threading
+from command_processor import CommandProcessor
+from models import CommandIntent, RouteResult
+from action_executors import open_application, open_youtube, play_music_on_youtube
+from app_resolver import default_resolver
+
+logger = logging.getLogger(__name__)
+
+
+class CommandRouter:
+    """Runs CommandProcessor ahead of the LLM and short-circuits high-confidence intents"""
+
+    EXIT_RESPONSE = "Goodbye! Have a great day!"
+
+    def __init__(self, question_answerer, processor: CommandProcessor = None, threshold: float = 0.8):
+        """
+        Initializes the router
+
+        Args:
+            question_answerer: QuestionAnswerer used for questions and ambiguous input
+            processor: CommandProcessor used to classify input (default: one that checks app
+                       names against the shared app resolver)
+            threshold: Minimum command confidence for the fast path
+        """
+        self.question_answerer = question_answerer
+        self.processor = processor or CommandProcessor(resolver=default_resolver())
+        self.threshold = threshold
+        self.fast_path_count = 0
+        self.llm_path_count = 0
+        self.intent_counts = {}
+        self._lock = threading.Lock()
+
+    def route(self, text: str, on_token=None, question_answerer=None) -> RouteResult:
+        """
+        Answers the input, using a tool directly when the intent is unambiguous
+
+        Args:
+            text: The user's input/question/command
+            on_token: Streaming callback passed through to the agent on the LLM path
+            question_answerer: Answerer to use for this turn instead of the default one
+                               (e.g. the client's AgentSession)
+
+        Returns:
+            RouteResult: The response text, detected intent and which path produced it
+        """
+        command = self.processor.process_command(text)
+
+        if command.intent in (CommandIntent.OPEN_APP, CommandIntent.PLAY_MUSIC, CommandIntent.EXIT) \
+                and command.confidence >= self.threshold:
+            response = self._execute(command)
+            self._count(command.intent, fast_path=True)
+            logger.info(f"Fast path {command.intent.value} (confidence {command.confidence:.2f}): {response}")
+            return RouteResult(response=response, intent=command.intent, fast_path=True)
+
+        response = (question_answerer or self.question_answerer).answer_question(text, on_token=on_token)
+        self._count(command.intent, fast_path=False)
+        return RouteResult(response=str(response), intent=command.intent, fast_path=False)
+
+    def is_exit(self, text: str) -> bool:
+        """
+        Checks whether the input asks to end the conversation, as the fast path would answer it
+
+        Voice loops call this before route() so that every goodbye the router would
+        answer also stops listening.
+
+        Args:
+            text: The user's input
+
+        Returns:
+            bool: True for a confident exit command, e.g. "bye" or "okay goodbye"
+        """
+        command = self.processor.process_command(text)
+        return command.intent == CommandIntent.EXIT and command.confidence >= self.threshold
+
+    def stats(self) -> dict:
+        """
+        Returns how many turns took the fast path versus the LLM
+
+        Returns:
+            dict: Turn counters, per-intent breakdown and the configured threshold
+        """
+        with self._lock:
+            total = self.fast_path_count + self.llm_path_count
+            return {
+                'threshold': self.threshold,
+                'fast_path': self.fast_path_count,
+                'llm_path': self.llm_path_count,
+                'fast_path_ratio': self.fast_path_count / total if total else 0.0,
+                'by_intent': dict(self.intent_counts),
+            }
+
+    def _execute(self, command) -> str:
+        """Runs the tool for a fast-path command and returns a canned confirmation"""
+        if command.intent == CommandIntent.EXIT:
+            return self.EXIT_RESPONSE
+
+        if command.intent == CommandIntent.OPEN_APP:
+            app_name = command.parameters['app_name']
+            if app_name in ('youtube', 'yt'):
+                open_youtube()
+                return "Opening YouTube"
+            result = open_application(app_name)
+            if result.startswith("Successfully"):
+                return f"Opening {app_name.title()}"
+            return result
+
+        song_name = command.parameters['song_name']
+        result = play_music_on_youtube(song_name)
+        if result.startswith("Opening YouTube"):
+            return f"Playing {song_name} on YouTube"
+        return result
+
+    def _count(self, intent: CommandIntent, fast_path: bool) -> None:
+        """Updates the path counters"""
+        key = f"{intent.value}:{'fast' if fast_path else 'llm'}"
+        with self._lock:
+            if fast_path:
+                self.fast_path_count += 1
+            else:
+                self.llm_path_count += 1
+            self.intent_counts[key] = self.intent_counts.get(key, 0) + 1
@@ -0,0 +1,190 @@
+"""
+Conversation Memory - Keeps the Strands Agent's history bounded by turns and estimated tokens
+"""
+import json
+import logging
+import threading
+from collections import deque
+from strands.agent.conversation_manager import SlidingWindowConversationManager
+
+logger = logging.getLogger(__name__)
+
+# Marks the text block that carries the summary of dropped turns
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+
+def estimate_tokens(messages: list, system_prompt: str = "") -> int:
+    """
+    Roughly estimates the prompt size in tokens (about 4 characters per token)
+
+    Args:
+        messages: Strands message dicts
+        system_prompt: The agent's system prompt
+
+    Returns:
+        int: Estimated token count
+    """
+    characters = len(system_prompt or "")
+    for message in messages:
+        characters += len(json.dumps(message.get('content', []), default=str))
+    return characters // 4
+
+
+class BoundedMemoryManager(SlidingWindowConversationManager):
+    """
+    Caps conversation history by turn count and estimated tokens
+
+    A turn starts with a user text prompt and includes every tool call and result that
+    followed it. Whole turns are dropped from the front, so the latest turn (with its
+    tool results) is always kept intact. Dropped turns are folded into a short summary
+    attached to the first remaining prompt. The system prompt lives outside the message
+    list and is never touched. Context-overflow recovery is inherited from the sliding window.
+    """
+
+    def __init__(self, max_turns: int = 10, max_tokens: int = 4000, summary_chars: int = 800,
+                 history_size: int = 100):
+        """
+        Initializes the manager
+
+        Args:
+            max_turns: Maximum number of recent turns kept verbatim
+            max_tokens: Estimated token budget for the kept history (system prompt included)
+            summary_chars: Maximum length of the summary of dropped turns
+            history_size: Number of per-turn prompt size samples kept for stats
+        """
+        super().__init__(window_size=max(max_turns * 4, 2))
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary_chars = summary_chars
+        self.removed_message_count = getattr(self, 'removed_message_count', 0)
+        self._summary_lines = deque()
+        self._prompt_tokens = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def apply_management(self, agent, **kwargs) -> None:
+        """
+        Trims the agent's messages in place after each event loop cycle
+
+        Args:
+            agent: The agent whose messages will be managed
+        """
+        messages = agent.messages
+        system_prompt = getattr(agent, 'system_prompt', "") or ""
+
+        self._strip_summary(messages)
+        dropped = self._drop_turns(messages, len(self._split_turns(messages)) - self.max_turns)
+        self._attach_summary(messages)
+
+        # Keep dropping the oldest turn while over the token budget (the latest turn always stays)
+        while estimate_tokens(messages, system_prompt) > self.max_tokens and len(self._split_turns(messages)) > 1:
+            self._strip_summary(messages)
+            dropped += self._drop_turns(messages, 1)
+            self._attach_summary(messages)
+
+        if dropped:
+            logger.info(f"Conversation memory dropped {dropped} turn(s), {len(messages)} messages kept")
+        with self._lock:
+            self._prompt_tokens.append(estimate_tokens(messages, system_prompt))
+
+    def stats(self) -> dict:
+        """
+        Returns prompt size per turn so long uptimes can be checked for growth
+
+        Returns:
+            dict: Last, mean and max estimated prompt tokens plus removed message count
+        """
+        with self._lock:
+            samples = list(self._prompt_tokens)
+        return {
+            'prompt_tokens_last': samples[-1] if samples else 0,
+            'prompt_tokens_mean': sum(samples) / len(samples) if samples else 0.0,
+            'prompt_tokens_max': max(samples) if samples else 0,
+            'turns_recorded': len(samples),
+            'removed_messages': self.removed_message_count,
+            'summary_chars': sum(len(line) for line in self._summary_lines),
+        }
+
+    def restore_summary(self, messages: list) -> None:
+        """
+        Picks up the summary attached to a conversation loaded from elsewhere
+
+        Without this, the next trim would strip the summary block and attach an empty one.
+
+        Args:
+            messages: The loaded messages
+        """
+        lines = []
+        if messages and messages[0].get('role') == 'user':
+            for block in messages[0].get('content', []):
+                text = str(block.get('text', ''))
+                if text.startswith(SUMMARY_PREFIX):
+                    lines = [line for line in text[len(SUMMARY_PREFIX):].split("\n") if line]
+        with self._lock:
+            self._summary_lines = deque(lines)
+
+    @staticmethod
+    def _is_prompt(message: dict) -> bool:
+        """True for a user message carrying text (as opposed to tool results)"""
+        return message.get('role') == 'user' and any('text' in block for block in message.get('content', []))
+
+    def _split_turns(self, messages: list) -> list:
+        """Returns the index of the first message of every turn"""
+        starts = [index for index, message in enumerate(messages) if self._is_prompt(message)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        return starts
+
+    def _drop_turns(self, messages: list, count: int) -> int:
+        """
+        Removes the oldest turns in place, folding each into the summary
+
+        Returns:
+            int: Number of turns dropped
+        """
+        turns = self._split_turns(messages)
+        count = min(count, len(turns) - 1)
+        if count <= 0:
+            return 0
+        for start, end in zip(turns[:count], turns[1:count + 1]):
+            self._summarize_turn(messages[start:end])
+        cut = turns[count]
+        self.removed_message_count += cut
+        messages[:] = messages[cut:]
+        return count
+
+    def _summarize_turn(self, turn: list) -> None:
+        """Adds a one-line extractive summary of a dropped turn"""
+        question = ""
+        answer = ""
+        tools = []
+        for message in turn:
+            for block in message.get('content', []):
+                if 'text' in block and message.get('role') == 'user' and not question:
+                    question = block['text']
+                elif 'text' in block and message.get('role') == 'assistant':
+                    answer = block['text']
+                elif 'toolUse' in block:
+                    tools.append(block['toolUse'].get('name', 'tool'))
+        line = f"User: {' '.join(question.split())[:100]}"
+        if tools:
+            line += f" [used {', '.join(tools)}]"
+        if answer:
+            line += f" -> Assistant: {' '.join(answer.split())[:120]}"
+        self._summary_lines.append(line)
+        while sum(len(text) for text in self._summary_lines) > self.summary_chars and len(self._summary_lines) > 1:
+            self._summary_lines.popleft()
+
+    def _strip_summary(self, messages: list) -> None:
+        """Removes a previously attached summary block so it is not summarized again"""
+        if messages and messages[0].get('role') == 'user':
+            content = messages[0].get('content', [])
+            kept = [block for block in content if not str(block.get('text', '')).startswith(SUMMARY_PREFIX)]
+            if len(kept) != len(content):
+                messages[0] = {**messages[0], 'content': kept}
+
+    def _attach_summary(self, messages: list) -> None:
+        """Prepends the summary to the first kept prompt (keeps user/assistant alternation intact)"""
+        if not self._summary_lines or not messages or messages[0].get('role') != 'user':
+            return
+        summary = {'text': SUMMARY_PREFIX + "\n" + "\n".join(self._summary_lines)}
+        messages[0] = {**messages[0], 'content': [summary] + list(messages[0].get('content', []))}
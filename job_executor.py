@@ -0,0 +1,132 @@
+"""
+Job Executor - Runs agent requests on a bounded worker pool
+"""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+from models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class AgentJobExecutor:
+    """Accepts text commands, runs them on a thread pool and keeps their status"""
+
+    def __init__(self, handler: Callable[[Job], str], max_workers: int = 1,
+                 max_pending: int = 32, max_history: int = 256):
+        """
+        Initializes the worker pool
+
+        Args:
+            handler: Function that turns a job (its text and request id) into a response string
+            max_workers: Number of agent calls allowed to run at the same time
+            max_pending: Maximum number of queued or running jobs before new ones are rejected
+            max_history: Number of jobs (including finished ones) kept for status lookups
+        """
+        self.handler = handler
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='agent-job')
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+        logger.info(f"Agent job executor started with {max_workers} worker(s)")
+
+    def submit(self, text: str, on_complete: Optional[Callable[[Job], None]] = None,
+               on_queued: Optional[Callable[[Job], None]] = None, session_id: str = None) -> Optional[Job]:
+        """
+        Queues a text command for the agent
+
+        Args:
+            text: The user's input/question/command
+            on_complete: Called from the worker thread once the job has finished or failed
+            on_queued: Called on the caller's thread before the job is handed to the pool,
+                       so anything it emits is guaranteed to precede the completion
+            session_id: Client session the command belongs to
+
+        Returns:
+            Job: The queued job, or None if the executor is at capacity
+
+        Raises:
+            Exception: Whatever on_queued or the pool raised (e.g. RuntimeError after
+                       shutdown); the job's slot is given back first
+        """
+        with self._lock:
+            if self._active >= self.max_pending:
+                logger.warning(f"Rejecting job, {self._active} jobs already pending")
+                return None
+
+            job = Job(id=uuid.uuid4().hex, text=text, session_id=session_id)
+            self._jobs[job.id] = job
+            self._active += 1
+            self._trim_history()
+
+        try:
+            if on_queued:
+                on_queued(job)
+            self._executor.submit(self._run, job, on_complete)
+        except Exception:
+            # The job never reached the pool, so it must not keep holding a slot
+            with self._lock:
+                self._active -= 1
+                self._jobs.pop(job.id, None)
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Looks up a job by its request id
+
+        Args:
+            job_id: The request id returned by submit()
+
+        Returns:
+            Job: The job, or None if it is unknown or has been evicted
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pending_count(self) -> int:
+        """Returns the number of queued or running jobs"""
+        with self._lock:
+            return self._active
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops accepting work and optionally waits for running jobs"""
+        self._executor.shutdown(wait=wait)
+        logger.info("Agent job executor stopped")
+
+    def _run(self, job: Job, on_complete: Optional[Callable[[Job], None]]) -> None:
+        """Executes a single job on a worker thread"""
+        job.status = JobStatus.RUNNING
+        try:
+            job.result = str(self.handler(job))
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            logger.error(f"Agent job {job.id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                self._active -= 1
+
+        if on_complete:
+            try:
+                on_complete(job)
+            except Exception as e:
+                logger.error(f"Error in completion callback for job {job.id}: {e}", exc_info=True)
+
+    def _trim_history(self) -> None:
+        """Drops the oldest finished jobs once history exceeds its limit (lock must be held)"""
+        if len(self._jobs) <= self.max_history:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_history:
+                break
+            if self._jobs[job_id].status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                del self._jobs[job_id]
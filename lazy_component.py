@@ -0,0 +1,80 @@
+"""
+Lazy Component - Builds an expensive object on first use and reports its readiness
+"""
+import time
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LazyComponent:
+    """Thread-safe build-once wrapper; a failed build is retried on the next get()"""
+
+    def __init__(self, name: str, factory: Callable):
+        """
+        Initializes the wrapper without building anything
+
+        Args:
+            name: Component name used in logs and readiness reports
+            factory: Builds the component
+        """
+        self.name = name
+        self.factory = factory
+        self._value = None
+        self._ready = False
+        self._building = False
+        self._error = None
+        self._build_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        """True once the component has been built"""
+        return self._ready
+
+    def get(self):
+        """
+        Returns the component, building it first if needed
+
+        Returns:
+            The built component
+
+        Raises:
+            Exception: Whatever the factory raised
+        """
+        if self._ready:
+            return self._value
+        with self._lock:
+            if self._ready:
+                return self._value
+            self._building = True
+            start = time.perf_counter()
+            try:
+                self._value = self.factory()
+            except Exception as e:
+                self._error = str(e)
+                logger.error(f"Could not build {self.name}: {e}")
+                raise
+            finally:
+                self._building = False
+            self._build_seconds = time.perf_counter() - start
+            self._error = None
+            self._ready = True
+            logger.info(f"Built {self.name} in {self._build_seconds:.2f}s")
+            return self._value
+
+    def status(self) -> dict:
+        """
+        Returns the readiness report
+
+        Returns:
+            dict: Ready/building flags, last error and build time
+        """
+        return {
+            'ready': self._ready,
+            'building': self._building,
+            'error': self._error,
+            'build_seconds': round(self._build_seconds, 3) if self._build_seconds is not None else None,
+        }
@@ -0,0 +1,238 @@
+"""
+Log Pipeline - Logging off the request path: a queue in front of rotating file and console handlers
+"""
+import os
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parses LOG_SAMPLE, e.g. "ui_manager=0.1,speech_engine=0.5"
+
+    Args:
+        spec: Comma-separated logger=fraction pairs
+
+    Returns:
+        dict: Logger name -> fraction of INFO/DEBUG lines kept (malformed pairs are ignored)
+    """
+    rates = {}
+    for pair in (spec or '').split(','):
+        name, _, rate = pair.partition('=')
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return {name: rate for name, rate in rates.items() if name}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every N INFO/DEBUG records of chatty loggers
+
+    Sampling is by count rather than random, so a steady stream keeps an even
+    spread of lines. Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        """
+        Args:
+            rates: Logger name (children included) -> fraction of records kept, 0 drops them all
+        """
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.sampled_out = 0
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        with self._lock:
+            if rate <= 0:
+                keep = False
+            else:
+                seen = self._counters.get(record.name, 0)
+                self._counters[record.name] = seen + 1
+                keep = seen % max(1, round(1 / rate)) == 0
+            if not keep:
+                self.sampled_out += 1
+        return keep
+
+
+class TruncatingFilter(logging.Filter):
+    """Shortens huge messages (full agent responses, pasted text) before they are queued"""
+
+    def __init__(self, max_chars: int = 1000):
+        super().__init__()
+        self.max_chars = max_chars
+        self.truncated = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.max_chars <= 0:
+            return True
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            record.msg = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} more chars]"
+            record.args = None
+            self.truncated += 1
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Never waits on a full queue; a log line is not worth stalling a turn for"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formats in place instead of copying the record; nothing reads it after this handler
+        message = self.format(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Listener(QueueListener):
+    """Waits for room for its stop sentinel instead of failing when the queue is full"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class AsyncLogging:
+    """
+    Root logging through a bounded queue drained by a background listener thread
+
+    Callers only sample, truncate, format the message and enqueue it; the listener
+    does the file and console I/O. The file rotates by size, or by time when
+    rotate_when is set (e.g. 'midnight'), keeping backup_count old files.
+    """
+
+    def __init__(self, path: Optional[str] = 'voice_assistant.log', level: int = logging.INFO,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, rotate_when: str = None,
+                 sample_rates: Dict[str, float] = None, max_message_chars: int = 1000,
+                 console: bool = True, queue_size: int = 10000):
+        """
+        Builds the pipeline (install() starts it)
+
+        Args:
+            path: Log file (None logs to the console only)
+            level: Root log level
+            max_bytes: File size at which it is rotated (size rotation)
+            backup_count: Rotated files kept
+            rotate_when: TimedRotatingFileHandler interval instead of size rotation, e.g. 'midnight'
+            sample_rates: Logger name -> fraction of INFO/DEBUG lines kept
+            max_message_chars: Longer messages are cut (0 keeps everything)
+            console: Also write to stderr
+            queue_size: Records waiting for the listener before new ones are dropped
+        """
+        self.level = level
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = []
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if rotate_when:
+                handlers.append(TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count,
+                                                         encoding='utf-8'))
+            else:
+                handlers.append(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                    encoding='utf-8'))
+        if console:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        self.handlers = handlers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sampling = SamplingFilter(sample_rates or {})
+        self.truncating = TruncatingFilter(max_message_chars)
+        self.queue_handler = _NonBlockingQueueHandler(self.queue)
+        self.queue_handler.addFilter(self.sampling)
+        self.queue_handler.addFilter(self.truncating)
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self._installed = None
+
+    def install(self, logger: logging.Logger = None) -> 'AsyncLogging':
+        """
+        Replaces the logger's handlers (default: root) with the queue and starts the listener
+
+        Returns:
+            AsyncLogging: self
+        """
+        target = logger or logging.getLogger()
+        for handler in list(target.handlers):
+            target.removeHandler(handler)
+        target.setLevel(self.level)
+        target.addHandler(self.queue_handler)
+        self.listener.start()
+        self._installed = target
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        """Writes out everything queued and stops the listener"""
+        if self._installed is None:
+            return
+        self._installed.removeHandler(self.queue_handler)
+        self._installed = None
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self) -> dict:
+        """
+        Returns pipeline counters
+
+        Returns:
+            dict: Queue depth and records dropped, sampled out and truncated
+        """
+        return {
+            'queue_depth': self.queue.qsize(),
+            'dropped': self.queue_handler.dropped,
+            'sampled_out': self.sampling.sampled_out,
+            'truncated': self.truncating.truncated,
+            'sample_rates': dict(self.sampling.rates),
+        }
+
+
+def configure_logging(path: Optional[str] = 'voice_assistant.log', **options) -> AsyncLogging:
+    """
+    Sends all logging through an AsyncLogging pipeline on the root logger
+
+    Args:
+        path: Log file (None logs to the console only)
+        **options: AsyncLogging options (level, max_bytes, backup_count, rotate_when, ...)
+
+    Returns:
+        AsyncLogging: The installed pipeline, for stats() and stop()
+    """
+    return AsyncLogging(path, **options).install()
@@ -6,21 +6,23 @@ import tkinter as tk
 import threading
 import queue
 from speech_engine import SpeechEngine
+from speech_pipeline import SpeechPipeline
+from speech_cache import SpeechCache, DEFAULT_PHRASES
 from action_executors import QuestionAnswerer
+from command_router import CommandRouter
 from ui_manager import UIManager
+from log_pipeline import configure_logging
+from app_index import default_index
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('voice_assistant.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (file and console writes happen on a background thread; the file rotates).
+# Screenshot encoder processes re-import this script as __mp_main__ and leave logging alone.
+if __name__ != '__mp_main__':
+    configure_logging('voice_assistant.log')
 
 logger = logging.getLogger(__name__)
 
+GREETING = "Hello! I'm your voice assistant. How can I help you?"
+
 
 class VoiceAssistant:
     """Main application controller for the Voice Assistant"""
@@ -29,9 +31,17 @@ class VoiceAssistant:
         """Initializes all components"""
         logger.info("Initializing Voice Assistant...")
         
+        # Index installed applications in the background so "open ..." never walks the disk
+        default_index().start()
+        
         # Initialize components
-        self.speech_engine = SpeechEngine()
+        self.speech_engine = SpeechEngine(speech_cache=SpeechCache())
+        self.speech_pipeline = SpeechPipeline(
+            self.speech_engine,
+            on_listening=lambda listening: self.ui_queue.put(('status', listening))
+        )
         self.question_answerer = QuestionAnswerer()  # Now handles everything with tools
+        self.router = CommandRouter(self.question_answerer)  # Direct tool calls for clear-cut commands
         
         # Initialize UI
         self.root = tk.Tk()
@@ -66,48 +76,45 @@ class VoiceAssistant:
     def _delayed_start(self) -> None:
         """Delayed start after UI is visible"""
         # Add welcome message
-        self.ui_manager.add_assistant_message("Hello! I'm your voice assistant. How can I help you?")
-        
-        # Speak welcome message
-        threading.Thread(target=lambda: self.speech_engine.speak("Hello! I'm your voice assistant. How can I help you?"), daemon=True).start()
+        self.ui_manager.add_assistant_message(GREETING)
         
-        # Start voice processing in separate thread
+        # Start voice processing (which also speaks the welcome message) in separate thread
         self.voice_thread = threading.Thread(target=self.process_voice_input, daemon=True)
         self.voice_thread.start()
     
     def process_voice_input(self) -> None:
         """Main loop for processing voice commands"""
-        while self.running:
+        # Open the microphone once; it is recalibrated between listens
+        self.speech_engine.open_microphone()
+        
+        # pyttsx3 is only driven from this thread: greet right away, then fill the speech
+        # cache while capture already runs (phrases wait in the pipeline until it is done)
+        self.speech_engine.speak(GREETING)
+        
+        # Capture keeps running while earlier phrases are recognized and answered
+        self.speech_pipeline.start()
+        self.speech_engine.prerender(DEFAULT_PHRASES)
+        
+        for text in self.speech_pipeline.results():
+            if not self.running:
+                break
             try:
-                # Update UI to show listening status
-                self.ui_queue.put(('status', True))
-                
-                # Listen for voice input
-                text = self.speech_engine.listen()
-                
-                # Update UI to show ready status
-                self.ui_queue.put(('status', False))
-                
-                # Skip if no text recognized
-                if not text:
-                    continue
-                
                 # Check for exit command
-                if text.lower().strip() in ['bye', 'goodbye', 'exit', 'quit', 'stop']:
+                if self.router.is_exit(text):
                     self.ui_queue.put(('user_message', text))
-                    response = "Goodbye! Have a great day!"
+                    response = CommandRouter.EXIT_RESPONSE
                     self.ui_queue.put(('assistant_message', response))
                     self.speech_engine.speak(response)
                     import time
                     time.sleep(1)
                     self.ui_queue.put(('shutdown', None))
-                    continue
+                    break
                 
                 # Add user message to UI
                 self.ui_queue.put(('user_message', text))
                 
-                # Send everything to the agent (it has all the tools)
-                response = self.question_answerer.answer_question(text)
+                # Clear-cut commands go straight to their tool, everything else to the agent
+                response = self.router.route(text).response
                 
                 # Add response to UI and speak it
                 self.ui_queue.put(('assistant_message', response))
@@ -115,7 +122,6 @@ class VoiceAssistant:
                 
             except Exception as e:
                 logger.error(f"Error in voice processing loop: {e}")
-                self.ui_queue.put(('status', False))
                 error_msg = "I encountered an error. Please try again."
                 self.ui_queue.put(('assistant_message', error_msg))
                 self.speech_engine.speak(error_msg)
@@ -153,10 +159,12 @@ class VoiceAssistant:
         """Cleans up resources and exits"""
         logger.info("Shutting down Voice Assistant...")
         self.running = False
+        self.speech_pipeline.stop()
         
         # Wait for voice thread to finish
         if self.voice_thread and self.voice_thread.is_alive():
             self.voice_thread.join(timeout=2)
+        self.speech_engine.close_microphone()
         
         # Close UI
         self.ui_manager.close()
@@ -0,0 +1,308 @@
+"""
+Metrics - Latency histograms, counters and gauges rendered in the Prometheus text format
+"""
+import os
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional, Tuple
+
+# Seconds; covers a cached reply (~ms) up to a slow agent call with tools
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Shared label handling; one child value per label combination"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        try:
+            key = tuple(labels[name] for name in self.labelnames)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return key
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = dict(self._children)
+        for key, value in sorted(children.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.extend(self._render_child(key, value))
+        return lines
+
+    def _render_child(self, key: Tuple, value) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (errors, retries, ...)"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Adds to the counter
+
+        Args:
+            amount: Non-negative increment
+            **labels: One value per label name
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Returns the current count for a label combination"""
+        with self._lock:
+            return self._children.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down; with a callback it is read only when scraped"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], float]] = None, registry=None):
+        """
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names
+            callback: Returns the value at scrape time (only without labels)
+            registry: Registry to add the gauge to (default: the module registry)
+        """
+        self.callback = callback
+        super().__init__(name, documentation, labelnames, registry)
+
+    def set(self, value: float, **labels) -> None:
+        """Sets the gauge"""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Adds to the gauge"""
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        """Subtracts from the gauge"""
+        self.inc(-amount, **labels)
+
+    def render(self) -> list:
+        if self.callback is None:
+            return super().render()
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of durations; observe() is a bisect plus two additions under a lock"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS, registry=None):
+        """
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names
+            buckets: Upper bounds in seconds (+Inf is added)
+            registry: Registry to add the histogram to (default: the module registry)
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Records one sample
+
+        Args:
+            value: The observed duration in seconds
+            **labels: One value per label name
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                # Per-bucket counts (not cumulative), then sum and count
+                child = self._children[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][index] += 1
+            child[1] += value
+            child[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        """Returns the number of samples for a label combination"""
+        with self._lock:
+            child = self._children.get(self._key(labels))
+            return child[2] if child else 0
+
+    def render(self) -> list:
+        with self._lock:
+            children = {key: (list(child[0]), child[1], child[2]) for key, child in self._children.items()}
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(children.items(), key=lambda item: tuple(map(str, item[0]))):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        """Adds a metric; a metric with the same name is replaced (e.g. a rebuilt server's gauges)"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        Renders every metric
+
+        Returns:
+            str: Prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def resident_memory_bytes() -> float:
+    """
+    Returns this process's resident memory
+
+    Returns:
+        float: Current RSS on Linux, peak RSS elsewhere on Unix, 0 where neither is available
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError, OSError):
+        return 0
+
+# Stages of a turn: capture, calibration, stt_<backend>, agent, tts
+STAGE_SECONDS = Histogram('voice_stage_duration_seconds', 'Latency of each stage of a voice turn', ['stage'])
+STAGE_ERRORS = Counter('voice_stage_errors_total', 'Failed stage executions', ['stage'])
+STAGE_RETRIES = Counter('voice_stage_retries_total', 'Retried attempts within a stage', ['stage'])
+TOOL_SECONDS = Histogram('voice_tool_duration_seconds', 'Latency of each agent tool call', ['tool'])
+TOOL_ERRORS = Counter('voice_tool_errors_total', 'Agent tool calls that failed', ['tool'])
+
+
+@contextmanager
+def stage(name: str, ignore: Tuple = ()):
+    """
+    Times a stage and counts it as an error if it raises
+
+    Args:
+        name: Stage label
+        ignore: Exceptions that are expected outcomes (not timed, not errors), e.g. capture timeouts
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except ignore:
+        raise
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        raise
+    STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def timed_tool(failed: Callable[[object], bool] = None):
+    """
+    Decorator timing an agent tool; put it below @tool so the tool schema is unchanged
+
+    Args:
+        failed: Tells from the return value whether the call failed (tools report errors as text)
+    """
+    def decorator(function):
+        name = function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            except Exception:
+                TOOL_ERRORS.inc(tool=name)
+                raise
+            finally:
+                TOOL_SECONDS.observe(time.perf_counter() - start, tool=name)
+            if failed is not None and failed(result):
+                TOOL_ERRORS.inc(tool=name)
+            return result
+        return wrapper
+    return decorator
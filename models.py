@@ -1,9 +1,10 @@
 """
 Data models for the Voice Assistant
 """
-from enum import Enum
-from dataclasses import dataclass
+from enum import Enum, IntEnum
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Optional
 
 
 class CommandIntent(Enum):
@@ -21,6 +22,15 @@ class Command:
     intent: CommandIntent
     parameters: dict
     raw_text: str
+    confidence: float = 1.0
+
+
+@dataclass
+class RouteResult:
+    """Represents how a command was answered by the router"""
+    response: str
+    intent: CommandIntent
+    fast_path: bool
 
 
 class MessageType(Enum):
@@ -35,3 +45,53 @@ class Message:
     type: MessageType
     content: str
     timestamp: datetime
+
+
+class JobStatus(Enum):
+    """Enumeration of agent job states"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """Represents a text command queued for the agent"""
+    id: str
+    text: str
+    session_id: Optional[str] = None
+    status: JobStatus = JobStatus.PENDING
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        """Returns a JSON-serializable view of the job"""
+        return {
+            'request_id': self.id,
+            'text': self.text,
+            'status': self.status.value,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class SpeechPriority(IntEnum):
+    """Enumeration of TTS priorities (lower values are spoken first)"""
+    SYSTEM = 0
+    RESPONSE = 1
+
+
+@dataclass
+class AppMatch:
+    """Represents the application a spoken name resolved to"""
+    query: str
+    name: Optional[str]
+    score: float
+    command: Optional[list] = None
+    executable: Optional[str] = None
+    suggestions: list = field(default_factory=list)
@@ -6,6 +6,7 @@ import VoiceButton from './components/VoiceButton';
 import ConversationHistory from './components/ConversationHistory';
 import HUDAnimation from './components/HUDAnimation';
 import TextInput from './components/TextInput';
+import SpeechPlayer from './speechPlayer';
 
 const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
 
@@ -15,6 +16,7 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [connected, setConnected] = useState(false);
   const socketRef = useRef(null);
+  const playerRef = useRef(new SpeechPlayer());
 
   useEffect(() => {
     // Connect to WebSocket
@@ -54,15 +56,46 @@ function App() {
       }]);
     });
 
+    socketRef.current.on('assistant_message_delta', (data) => {
+      setMessages(prev => {
+        const last = prev[prev.length - 1];
+        if (last && last.streaming && last.requestId === data.request_id) {
+          return [...prev.slice(0, -1), { ...last, text: last.text + data.text }];
+        }
+        return [...prev, {
+          type: 'assistant',
+          text: data.text,
+          requestId: data.request_id,
+          streaming: true,
+          timestamp: new Date()
+        }];
+      });
+    });
+
     socketRef.current.on('assistant_message', (data) => {
-      setMessages(prev => [...prev, {
-        type: 'assistant',
-        text: data.text,
-        timestamp: new Date()
-      }]);
+      setMessages(prev => {
+        const message = {
+          type: 'assistant',
+          text: data.text,
+          requestId: data.request_id,
+          timestamp: new Date()
+        };
+        // Replace the streamed draft of this turn with the final text
+        const draft = prev.findIndex(m => m.streaming && m.requestId === data.request_id);
+        if (draft !== -1) {
+          return [...prev.slice(0, draft), message, ...prev.slice(draft + 1)];
+        }
+        return [...prev, message];
+      });
       setLoading(false);
     });
 
+    // Speech streamed by the server (TTS_OUTPUT=client)
+    socketRef.current.on('tts_audio_start', (data) => playerRef.current.start(data));
+    socketRef.current.on('tts_audio_chunk', (data) => playerRef.current.chunk(data));
+    socketRef.current.on('tts_audio_end', (data) => playerRef.current.end(data));
+    socketRef.current.on('tts_audio_stop', (data) => playerRef.current.stop(data));
+
     socketRef.current.on('error', (data) => {
       setMessages(prev => [...prev, {
         type: 'error',
@@ -85,6 +118,7 @@ function App() {
       return;
     }
     try {
+      playerRef.current.resume();
       socketRef.current.emit('start_listening');
       setLoading(true);
     } catch (error) {
@@ -106,6 +140,7 @@ function App() {
     if (!text.trim() || !connected) return;
 
     try {
+      playerRef.current.resume();
       setLoading(true);
       socketRef.current.emit('text_command', { text });
     } catch (error) {
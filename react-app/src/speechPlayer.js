@@ -0,0 +1,111 @@
+// Plays speech audio streamed by the server (tts_audio_* events) with the Web Audio API.
+// Each binary chunk is scheduled right after the previous one, so playback starts with
+// the first chunk instead of waiting for the whole answer.
+
+function decodeMulaw(bytes) {
+  const samples = new Float32Array(bytes.length);
+  for (let i = 0; i < bytes.length; i++) {
+    const u = ~bytes[i] & 0xff;
+    let magnitude = (((u & 0x0f) << 3) + 0x84) << ((u >> 4) & 0x07);
+    magnitude -= 0x84;
+    samples[i] = ((u & 0x80) ? -magnitude : magnitude) / 32768;
+  }
+  return samples;
+}
+
+function decodePcm16(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const samples = new Float32Array(Math.floor(bytes.byteLength / 2));
+  for (let i = 0; i < samples.length; i++) {
+    samples[i] = view.getInt16(i * 2, true) / 32768;
+  }
+  return samples;
+}
+
+export default class SpeechPlayer {
+  constructor() {
+    this.context = null;
+    this.nextTime = 0;
+    this.utterances = {};
+  }
+
+  // Browsers only allow audio after a user gesture; call this from click handlers
+  resume() {
+    if (!this.context) {
+      const AudioContext = window.AudioContext || window.webkitAudioContext;
+      this.context = new AudioContext();
+    }
+    if (this.context.state === 'suspended') {
+      this.context.resume();
+    }
+  }
+
+  start(meta) {
+    this.resume();
+    this.utterances[meta.utterance_id] = { ...meta, sources: [] };
+  }
+
+  chunk({ utterance_id, data }) {
+    const utterance = this.utterances[utterance_id];
+    if (!utterance || !this.context) {
+      return;
+    }
+    const bytes = new Uint8Array(data);
+    const interleaved = utterance.encoding === 'mulaw' ? decodeMulaw(bytes) : decodePcm16(bytes);
+    const channels = utterance.channels || 1;
+    const frames = Math.floor(interleaved.length / channels);
+    if (frames === 0) {
+      return;
+    }
+    const buffer = this.context.createBuffer(channels, frames, utterance.sample_rate);
+    for (let channel = 0; channel < channels; channel++) {
+      const output = buffer.getChannelData(channel);
+      for (let i = 0; i < frames; i++) {
+        output[i] = interleaved[i * channels + channel];
+      }
+    }
+    const source = this.context.createBufferSource();
+    source.buffer = buffer;
+    source.connect(this.context.destination);
+    this.nextTime = Math.max(this.nextTime, this.context.currentTime);
+    source.start(this.nextTime);
+    this.nextTime += buffer.duration;
+    utterance.sources.push(source);
+    source.onended = () => {
+      utterance.sources = utterance.sources.filter(s => s !== source);
+      if (utterance.ended && utterance.sources.length === 0) {
+        delete this.utterances[utterance_id];
+      }
+    };
+  }
+
+  end({ utterance_id }) {
+    const utterance = this.utterances[utterance_id];
+    if (utterance) {
+      utterance.ended = true;
+      if (utterance.sources.length === 0) {
+        delete this.utterances[utterance_id];
+      }
+    }
+  }
+
+  // Barge-in: drop everything scheduled for this utterance
+  stop({ utterance_id }) {
+    const utterance = this.utterances[utterance_id];
+    if (!utterance) {
+      return;
+    }
+    utterance.sources.forEach(source => {
+      try {
+        source.stop();
+      } catch (e) {
+        // Already finished
+      }
+    });
+    delete this.utterances[utterance_id];
+    const playing = Object.values(this.utterances).some(u => u.sources.length > 0);
+    if (!playing && this.context) {
+      this.nextTime = this.context.currentTime;
+    }
+  }
+}
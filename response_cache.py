@@ -0,0 +1,159 @@
+"""
+Response Cache - TTL-bounded LRU cache for agent answers
+"""
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Tools whose effect (or answer) must happen every time the question is asked
+UNCACHEABLE_TOOLS = {'open_application', 'open_youtube', 'take_screenshot', 'play_music_on_youtube', 'current_time'}
+
+# Questions mentioning these are time-sensitive or side-effecting
+VOLATILE_PATTERN = re.compile(
+    r'\b(time|date|day|today|tonight|tomorrow|yesterday|now|weather|news|latest|current|'
+    r'open|launch|start|run|play|screenshot|screen)\b'
+)
+
+# Questions that refer back to earlier turns ("how old is he", "what about her", "tell me more")
+# only make sense in their own conversation; any other question stands on its own
+FOLLOW_UP_PATTERN = re.compile(
+    r'\b(he|she|him|her|his|hers|they|them|their|it|its|that|those|this|these|'
+    r'again|last|previous|earlier|repeat|else|more)\b|^(and|but|so|also|what about|how about)\b'
+)
+
+
+def normalize_question(text: str) -> str:
+    """
+    Folds case, punctuation and whitespace so equivalent questions share a key
+
+    Args:
+        text: The raw question
+
+    Returns:
+        str: Normalized cache key
+    """
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    return ' '.join(text.split())
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with a per-entry time-to-live"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        """
+        Initializes an empty cache
+
+        Args:
+            max_entries: Maximum number of cached answers before the least recently used is evicted
+            ttl_seconds: How long an answer may be served after it was stored
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypasses = 0
+
+    def is_cacheable(self, question: str) -> bool:
+        """
+        Checks whether a question may be answered from (or stored in) the cache
+
+        Args:
+            question: The raw question
+
+        Returns:
+            bool: False for time-sensitive, side-effecting or follow-up questions
+        """
+        key = normalize_question(question)
+        return bool(key) and not VOLATILE_PATTERN.search(key) and not FOLLOW_UP_PATTERN.search(key)
+
+    def get(self, question: str) -> Optional[str]:
+        """
+        Looks up a cached answer
+
+        Args:
+            question: The raw question
+
+        Returns:
+            str: The cached answer, or None on a miss
+        """
+        if not self.is_cacheable(question):
+            with self._lock:
+                self.bypasses += 1
+            return None
+
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            answer, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return answer
+
+    def put(self, question: str, answer: str, tools_used=()) -> bool:
+        """
+        Stores an answer unless the question or the tools it triggered make it uncacheable
+
+        Args:
+            question: The raw question
+            answer: The agent's answer text
+            tools_used: Names of the tools the agent called while answering
+
+        Returns:
+            bool: True if the answer was stored
+        """
+        if not self.is_cacheable(question) or UNCACHEABLE_TOOLS.intersection(tools_used):
+            return False
+
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (answer, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        """Drops all cached answers (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters for sizing
+
+        Returns:
+            dict: Hits, misses, evictions, expirations, bypasses, size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'bypasses': self.bypasses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
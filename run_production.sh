@@ -1,6 +1,14 @@
 #!/bin/bash
 
 # Production run script with proper WebSocket support
+#
+# WORKERS=1 runs a single server on $PORT. WORKERS=N runs N single-worker servers on
+# $PORT .. $PORT+N-1: Socket.IO long-polling needs sticky sessions, which gunicorn's own
+# balancing across -w workers cannot provide, so put a sticky load balancer in front
+# (see deploy/nginx.conf). Several servers need SOCKETIO_MESSAGE_QUEUE and
+# SESSION_STORE_URL (e.g. redis://redis:6379/0) so broadcasts and sessions are shared.
+# Each of the N servers logs to its own file (voice_assistant-<port>.log), since they
+# would otherwise all rotate the same file.
 
 PORT=${PORT:-5000}
 WORKERS=${WORKERS:-1}
@@ -11,11 +19,32 @@ echo "Port: $PORT"
 echo "Workers: $WORKERS"
 echo "Timeout: $TIMEOUT"
 
-gunicorn \
-  --worker-class geventwebsocket.gunicorn.workers.GeventWebSocketWorker \
-  -w "$WORKERS" \
-  -b 0.0.0.0:"$PORT" \
-  --timeout "$TIMEOUT" \
-  --access-logfile - \
-  --error-logfile - \
-  wsgi:app
+if [ "$WORKERS" -gt 1 ] && { [ -z "$SOCKETIO_MESSAGE_QUEUE" ] || [ -z "$SESSION_STORE_URL" ]; }; then
+  echo "WORKERS=$WORKERS needs SOCKETIO_MESSAGE_QUEUE and SESSION_STORE_URL (e.g. redis://localhost:6379/0)" >&2
+  exit 1
+fi
+
+run_server() {
+  exec gunicorn \
+    --worker-class geventwebsocket.gunicorn.workers.GeventWebSocketWorker \
+    -w 1 \
+    -b 0.0.0.0:"$1" \
+    --timeout "$TIMEOUT" \
+    --access-logfile - \
+    --error-logfile - \
+    wsgi:app
+}
+
+if [ "$WORKERS" -le 1 ]; then
+  run_server "$PORT"
+fi
+
+pids=()
+LOG_FILE=${LOG_FILE-voice_assistant.log}
+for ((i = 0; i < WORKERS; i++)); do
+  echo "Server $((i + 1)) on port $((PORT + i))"
+  LOG_FILE=${LOG_FILE:+${LOG_FILE%.log}-$((PORT + i)).log} run_server $((PORT + i)) &
+  pids+=($!)
+done
+trap 'kill "${pids[@]}" 2>/dev/null' INT TERM
+wait
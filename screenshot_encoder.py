@@ -0,0 +1,252 @@
+"""
+Screenshot Encoder - Grabs the screen on the caller's thread and encodes the image in a process pool
+"""
+import os
+import time
+import logging
+import datetime
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Accepted format names -> Pillow format and file extension
+FORMATS = {
+    'png': ('PNG', '.png'),
+    'jpeg': ('JPEG', '.jpg'),
+    'jpg': ('JPEG', '.jpg'),
+    'webp': ('WEBP', '.webp'),
+}
+
+
+def parse_region(spec: str) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Parses a capture region, e.g. "0,0,1920,1080"
+
+    Returns:
+        tuple: (left, top, right, bottom), or None if the spec is empty or malformed
+    """
+    try:
+        left, top, right, bottom = (int(part) for part in (spec or '').split(','))
+    except ValueError:
+        return None
+    return (left, top, right, bottom) if right > left and bottom > top else None
+
+
+def grab_screen(region: Tuple[int, int, int, int] = None, all_screens: bool = True):
+    """Captures the screen with Pillow's ImageGrab (the default image source)"""
+    from PIL import ImageGrab
+    return ImageGrab.grab(bbox=region, all_screens=all_screens and region is None)
+
+
+def encode_screenshot(image, path: str, image_format: str = 'png', quality: int = 85, png_level: int = 6,
+                      scale: float = 1.0) -> dict:
+    """
+    Downscales, encodes and writes one screenshot (runs in a pool worker)
+
+    The file is written under a temporary name and renamed into place, so a reader
+    never sees a half-written image.
+
+    Args:
+        image: PIL image as grabbed
+        path: Destination file
+        image_format: 'png', 'jpeg' or 'webp'
+        quality: JPEG/WebP quality (1-100)
+        png_level: PNG zlib level (0 fastest - 9 smallest)
+        scale: Size factor applied before encoding (1.0 keeps full resolution)
+
+    Returns:
+        dict: Path, size in bytes, dimensions and encode time
+    """
+    from PIL import Image
+    start = time.perf_counter()
+    pillow_format = FORMATS[image_format][0]
+    if scale < 1.0:
+        factor = round(1 / scale)
+        if abs(factor * scale - 1) < 1e-6:
+            # Integer factors (1/2, 1/3, ...) use box reduction, much faster than resampling
+            image = image.reduce(factor)
+        else:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.BILINEAR)
+    if pillow_format == 'PNG':
+        options = {'compress_level': png_level}
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': quality}
+        if pillow_format == 'WEBP':
+            options['method'] = 0
+    temporary = f"{path}.part"
+    image.save(temporary, format=pillow_format, **options)
+    os.replace(temporary, path)
+    return {
+        'path': path,
+        'bytes': os.path.getsize(path),
+        'width': image.width,
+        'height': image.height,
+        'encode_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+class ScreenshotEncoder:
+    """
+    Takes screenshots without making the caller wait for the encoder
+
+    capture() grabs the frame and returns at once; downscaling, encoding and writing
+    the file happen in a process pool so a full-resolution PNG of several 4K monitors
+    does not hold up the agent's reply. The pool is started on first use with the
+    'spawn' start method (safe next to the server's threads) and falls back to a
+    thread pool where processes cannot be started.
+    """
+
+    def __init__(self, grab: Callable = None, directory: str = None, image_format: str = 'png', quality: int = 85,
+                 png_level: int = 6, scale: float = 1.0, region: Tuple[int, int, int, int] = None,
+                 all_screens: bool = True, max_workers: int = 1, use_processes: bool = True):
+        """
+        Initializes the encoder (no pool is started until the first capture)
+
+        Args:
+            grab: Image source called as grab(region, all_screens) (default: Pillow ImageGrab)
+            directory: Folder screenshots are saved in (default: ~/Pictures/VoiceAssistant)
+            image_format: Default format: 'png', 'jpeg' or 'webp'
+            quality: JPEG/WebP quality
+            png_level: PNG compression level (0-9)
+            scale: Default downscale factor (e.g. 0.5 halves both dimensions)
+            region: Default (left, top, right, bottom) to capture instead of the whole screen
+            all_screens: Capture every monitor (False: the primary monitor only)
+            max_workers: Encoder processes
+            use_processes: Encode in a process pool (False: a thread pool)
+        """
+        self.grab = grab or grab_screen
+        self.directory = directory or os.path.join(os.path.expanduser("~"), "Pictures", "VoiceAssistant")
+        self.image_format = image_format if image_format in FORMATS else 'png'
+        self.quality = quality
+        self.png_level = png_level
+        self.scale = scale
+        self.region = region
+        self.all_screens = all_screens
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self.captured = 0
+        self.encoded = 0
+        self.failed = 0
+        self.last_grab_ms = 0.0
+        self.last_encode_ms = 0.0
+
+    def _pool(self):
+        """Starts the worker pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    try:
+                        self._executor = ProcessPoolExecutor(self.max_workers,
+                                                             mp_context=multiprocessing.get_context('spawn'))
+                    except (OSError, NotImplementedError, ImportError) as e:
+                        logger.warning(f"Process pool unavailable ({e}), encoding screenshots on a thread")
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='screenshot')
+            return self._executor
+
+    def capture(self, filename: str = None, region: Tuple[int, int, int, int] = None, all_screens: bool = None,
+                image_format: str = None, quality: int = None, scale: float = None) -> Tuple[str, Future]:
+        """
+        Grabs the screen now and queues the image for encoding
+
+        Args:
+            filename: File name without folder (default: screenshot_YYYYMMDD_HHMMSS)
+            region: (left, top, right, bottom) to capture (default: the configured region)
+            all_screens: Capture every monitor (default: the configured setting)
+            image_format: 'png', 'jpeg' or 'webp' (default: the configured format)
+            quality: JPEG/WebP quality override
+            scale: Downscale factor override
+
+        Returns:
+            tuple: (path the file will be written to, Future resolving to encode_screenshot()'s result)
+        """
+        image_format = (image_format or self.image_format).lower()
+        if image_format not in FORMATS:
+            image_format = self.image_format
+        extension = FORMATS[image_format][1]
+        if not filename or not filename.strip():
+            filename = f"screenshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Keep a name the user gave, but replace a mismatched extension with the format's own
+        stem, current = os.path.splitext(os.path.basename(filename.strip()))
+        if current.lower() not in ('.png', '.jpg', '.jpeg', '.webp'):
+            stem = stem + current
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, stem + extension)
+
+        start = time.perf_counter()
+        image = self.grab(region or self.region, self.all_screens if all_screens is None else all_screens)
+        self.last_grab_ms = (time.perf_counter() - start) * 1000
+        self.captured += 1
+
+        future = self._pool().submit(encode_screenshot, image, path, image_format,
+                                     self.quality if quality is None else quality, self.png_level,
+                                     self.scale if scale is None else scale)
+        future.add_done_callback(self._encoded)
+        return path, future
+
+    def _encoded(self, future: Future) -> None:
+        """Records the outcome of a finished encode"""
+        try:
+            result = future.result()
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Screenshot encoding failed: {e}")
+            return
+        self.encoded += 1
+        self.last_encode_ms = result['encode_ms']
+        logger.info(f"Screenshot written to {result['path']} ({result['bytes']} bytes, "
+                    f"{result['width']}x{result['height']}, {result['encode_ms']:.0f} ms)")
+
+    def stats(self) -> dict:
+        """
+        Returns encoder counters
+
+        Returns:
+            dict: Screenshots captured, encoded and failed, and the latest grab and encode times
+        """
+        return {
+            'captured': self.captured,
+            'encoded': self.encoded,
+            'failed': self.failed,
+            'pending': self.captured - self.encoded - self.failed,
+            'last_grab_ms': self.last_grab_ms,
+            'last_encode_ms': self.last_encode_ms,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Finishes queued encodes (if wait) and stops the pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_default_encoder = None
+_default_lock = threading.Lock()
+
+
+def default_encoder() -> ScreenshotEncoder:
+    """The process-wide encoder used by the take_screenshot tool, configured from SCREENSHOT_* variables"""
+    global _default_encoder
+    with _default_lock:
+        if _default_encoder is None:
+            _default_encoder = ScreenshotEncoder(
+                directory=os.environ.get('SCREENSHOT_DIR') or None,
+                image_format=os.environ.get('SCREENSHOT_FORMAT', 'png').lower(),
+                quality=int(os.environ.get('SCREENSHOT_QUALITY', '85')),
+                png_level=int(os.environ.get('SCREENSHOT_PNG_LEVEL', '6')),
+                scale=float(os.environ.get('SCREENSHOT_SCALE', '1.0')),
+                region=parse_region(os.environ.get('SCREENSHOT_REGION', '')),
+                all_screens=os.environ.get('SCREENSHOT_ALL_SCREENS', '1') == '1',
+                max_workers=int(os.environ.get('SCREENSHOT_WORKERS', '1')),
+                use_processes=os.environ.get('SCREENSHOT_POOL', 'process') == 'process'
+            )
+        return _default_encoder
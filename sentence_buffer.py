@@ -0,0 +1,66 @@
+"""
+Sentence Buffer - Groups streamed LLM tokens into complete sentences for speech
+"""
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! ? (optionally followed by closing quotes/brackets) plus whitespace,
+# or at a line break. "3.45" and "e.g.x" do not match because no whitespace follows the dot.
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
+
+
+class SentenceBuffer:
+    """Accumulates text deltas and releases each sentence once it is complete"""
+
+    def __init__(self, min_length: int = 12):
+        """
+        Initializes an empty buffer
+
+        Args:
+            min_length: Sentences shorter than this are held back and joined with the next one,
+                        so fragments like "Sure." are not spoken as separate utterances
+        """
+        self.min_length = min_length
+        self.received = False
+        self._buffer = ""
+
+    def feed(self, delta: str) -> list:
+        """
+        Adds a streamed text delta
+
+        Args:
+            delta: The next chunk of generated text
+
+        Returns:
+            list: Sentences completed by this delta (possibly empty)
+        """
+        if not delta:
+            return []
+
+        self.received = True
+        self._buffer += delta
+
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if len(sentence) < self.min_length:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> str:
+        """
+        Returns whatever text is left once the stream has ended
+
+        Returns:
+            str: The trailing (possibly unterminated) sentence, or empty string
+        """
+        tail = self._buffer.strip()
+        self._buffer = ""
+        return tail
@@ -0,0 +1,307 @@
+"""
+Session Pool - One Strands Agent conversation per client, with bounded concurrency
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionEntry:
+    """Pool bookkeeping for one client's QuestionAnswerer"""
+
+    def __init__(self, answerer):
+        self.answerer = answerer
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        # Version of the shared conversation this Agent holds (0 = nothing loaded)
+        self.version = 0
+
+
+class AgentSession:
+    """Handle for one client's conversation; the Agent is only taken from the pool on first use"""
+
+    def __init__(self, pool, session_id: str):
+        self.pool = pool
+        self.session_id = session_id
+
+    def answer_question(self, question: str, on_token=None) -> str:
+        """
+        Answers with this session's own Agent, waiting for a free concurrency slot
+
+        Args:
+            question: The user's input/question/command
+            on_token: Optional callback receiving each text delta
+
+        Returns:
+            str: The response from the agent
+        """
+        return self.pool.answer_question(self.session_id, question, on_token=on_token)
+
+
+class AgentSessionPool:
+    """Keeps a QuestionAnswerer per session id with LRU/idle eviction and pre-warmed spares"""
+
+    def __init__(self, factory: Callable, max_sessions: int = 64, max_concurrent: int = 4,
+                 idle_timeout: float = 900, spare_count: int = 1, maintenance_interval: float = 5,
+                 store=None):
+        """
+        Initializes the pool and starts the background maintenance thread
+
+        Args:
+            factory: Builds a new QuestionAnswerer (and therefore a new Agent)
+            max_sessions: Maximum number of live sessions before the least recently used idle one is evicted
+            max_concurrent: Maximum number of agent calls running at the same time across all sessions
+            idle_timeout: Seconds without a turn after which a session is evicted
+            spare_count: Number of pre-built QuestionAnswerers kept ready for new sessions
+            maintenance_interval: Seconds between eviction/refill passes
+            store: Optional SessionStore shared with other workers; conversations are loaded
+                   from it before a turn when another worker has moved them on, and saved after
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.spare_count = spare_count
+        self.maintenance_interval = maintenance_interval
+        self.store = store
+        self._sessions = OrderedDict()
+        self._spares = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._max_concurrent = max_concurrent
+        self._active_calls = 0
+        self._wake = threading.Event()
+        self._stopped = False
+        self.created = 0
+        self.spare_hits = 0
+        self.evictions = 0
+        self.reloads = 0
+
+        self._thread = threading.Thread(target=self._maintain, daemon=True, name='agent-session-pool')
+        self._thread.start()
+        logger.info(f"Agent session pool started (max {max_sessions} sessions, {max_concurrent} concurrent)")
+
+    def session(self, session_id: str) -> AgentSession:
+        """
+        Returns a handle for a session without creating its Agent yet
+
+        Args:
+            session_id: Socket.IO sid or API session token
+
+        Returns:
+            AgentSession: Object exposing answer_question for this session
+        """
+        return AgentSession(self, session_id)
+
+    def answer_question(self, session_id: str, question: str, on_token=None) -> str:
+        """
+        Runs one turn on the session's Agent
+
+        Turns of the same session are serialized; turns of different sessions run in
+        parallel up to max_concurrent.
+
+        Args:
+            session_id: Socket.IO sid or API session token
+            question: The user's input/question/command
+            on_token: Optional callback receiving each text delta
+
+        Returns:
+            str: The response from the agent
+        """
+        entry = self._checkout(session_id)
+        try:
+            waited_from = time.time()
+            with entry.lock, self._slots:
+                # Time spent behind the session's previous turn or other sessions' calls
+                tracer.record('agent_wait', waited_from, time.time())
+                with self._lock:
+                    self._active_calls += 1
+                try:
+                    if self.store is not None:
+                        self._load_shared(session_id, entry)
+                    response = entry.answerer.answer_question(question, on_token=on_token)
+                    if self.store is not None:
+                        self._save_shared(session_id, entry)
+                    return response
+                finally:
+                    with self._lock:
+                        self._active_calls -= 1
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    @property
+    def active_calls(self) -> int:
+        """Agent calls running right now"""
+        return self._active_calls
+
+    def warm_up(self) -> int:
+        """
+        Builds the spare QuestionAnswerers now instead of on the first maintenance pass
+
+        Returns:
+            int: Number of spares built
+        """
+        built = 0
+        while not self._stopped:
+            with self._lock:
+                if len(self._spares) >= self.spare_count:
+                    break
+            answerer = self._build()
+            with self._lock:
+                self._spares.append(answerer)
+            built += 1
+        return built
+
+    def close_session(self, session_id: str) -> None:
+        """
+        Drops a session (e.g. when its client disconnects) unless a turn is still running
+
+        Args:
+            session_id: Socket.IO sid or API session token
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry.in_use > 0:
+                return
+            if entry is not None:
+                del self._sessions[session_id]
+                logger.info(f"Closed agent session {session_id}")
+        if self.store is not None:
+            try:
+                self.store.delete_session(session_id)
+            except Exception as e:
+                logger.error(f"Error deleting shared session {session_id}: {e}")
+
+    def stats(self) -> dict:
+        """
+        Returns pool counters
+
+        Returns:
+            dict: Live sessions, spares, running calls, lifetime counters and prompt sizes
+        """
+        with self._lock:
+            answerers = [entry.answerer for entry in self._sessions.values()]
+            prompt_tokens = [answerer.memory_stats()['prompt_tokens_last']
+                             for answerer in answerers if hasattr(answerer, 'memory_stats')]
+            return {
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'spares': len(self._spares),
+                'active_calls': self._active_calls,
+                'max_concurrent': self._max_concurrent,
+                'created': self.created,
+                'spare_hits': self.spare_hits,
+                'evictions': self.evictions,
+                'shared': self.store is not None,
+                'reloads': self.reloads,
+                'prompt_tokens_mean': sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else 0.0,
+                'prompt_tokens_max': max(prompt_tokens) if prompt_tokens else 0,
+            }
+
+    def shutdown(self) -> None:
+        """Stops the maintenance thread"""
+        self._stopped = True
+        self._wake.set()
+        self._thread.join(timeout=2)
+
+    def _checkout(self, session_id: str) -> _SessionEntry:
+        """Finds or creates the session entry and marks it in use"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                entry.in_use += 1
+                return entry
+            answerer = self._spares.pop() if self._spares else None
+            if answerer is not None:
+                self.spare_hits += 1
+
+        if answerer is None:
+            answerer = self._build()
+
+        with self._lock:
+            # Another thread may have created the same session while we were building
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = _SessionEntry(answerer)
+                self._sessions[session_id] = entry
+            elif len(self._spares) < self.spare_count:
+                self._spares.append(answerer)
+            self._sessions.move_to_end(session_id)
+            entry.in_use += 1
+            self._evict_lru()
+
+        logger.info(f"Opened agent session {session_id}")
+        self._wake.set()
+        return entry
+
+    def _load_shared(self, session_id: str, entry: _SessionEntry) -> None:
+        """Replaces the local conversation if another worker has saved a newer one (entry lock held)"""
+        try:
+            stored = self.store.load_session(session_id)
+        except Exception as e:
+            logger.error(f"Error loading shared session {session_id}: {e}")
+            return
+        if stored is None or stored['version'] == entry.version:
+            return
+        entry.answerer.load_history(stored['messages'])
+        entry.version = stored['version']
+        with self._lock:
+            self.reloads += 1
+        logger.info(f"Loaded agent session {session_id} at version {entry.version} from the shared store")
+
+    def _save_shared(self, session_id: str, entry: _SessionEntry) -> None:
+        """Publishes the conversation after a turn so any worker can continue it (entry lock held)"""
+        try:
+            entry.version = self.store.save_session(session_id, entry.answerer.history())
+        except Exception as e:
+            logger.error(f"Error saving shared session {session_id}: {e}")
+
+    def _build(self):
+        """Creates a new QuestionAnswerer"""
+        answerer = self.factory()
+        with self._lock:
+            self.created += 1
+        return answerer
+
+    def _evict_lru(self) -> None:
+        """Drops least recently used idle sessions while over capacity (lock must be held)"""
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if self._sessions[session_id].in_use == 0:
+                del self._sessions[session_id]
+                self.evictions += 1
+                logger.info(f"Evicted least recently used agent session {session_id}")
+
+    def _evict_idle(self) -> None:
+        """Drops sessions that have been idle longer than idle_timeout"""
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            for session_id in list(self._sessions):
+                entry = self._sessions[session_id]
+                if entry.in_use == 0 and entry.last_used < cutoff:
+                    del self._sessions[session_id]
+                    self.evictions += 1
+                    logger.info(f"Evicted idle agent session {session_id}")
+
+    def _maintain(self) -> None:
+        """Background loop that evicts idle sessions and keeps spares warm"""
+        # Nothing is built during construction; warm_up() or the first pass does it
+        self._wake.wait(timeout=self.maintenance_interval)
+        self._wake.clear()
+        while not self._stopped:
+            try:
+                self._evict_idle()
+                self.warm_up()
+            except Exception as e:
+                logger.error(f"Error maintaining agent session pool: {e}", exc_info=True)
+            self._wake.wait(timeout=self.maintenance_interval)
+            self._wake.clear()
@@ -0,0 +1,241 @@
+"""
+Session Store - Per-session state shared by every worker process (conversations, jobs, clients)
+"""
+import json
+import time
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    """JSON fallback for bytes inside Agent messages (e.g. screenshot tool results)"""
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(bytes(value)).decode('ascii')}
+    return str(value)
+
+
+def _decode_value(value: dict):
+    """Reverses _encode_value while JSON is parsed"""
+    if len(value) == 1 and '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
+
+
+def dumps(value) -> str:
+    """Serializes session state to JSON, keeping bytes intact"""
+    return json.dumps(value, default=_encode_value)
+
+
+def loads(data):
+    """Parses what dumps() produced"""
+    return json.loads(data, object_hook=_decode_value)
+
+
+class SessionStore:
+    """
+    Interface of the shared store
+
+    Conversations carry a version that is bumped on every save, so a worker can tell
+    whether another worker has answered for the session since it last did.
+    """
+
+    def load_session(self, session_id: str) -> Optional[dict]:
+        """
+        Reads a session's conversation
+
+        Args:
+            session_id: Socket.IO sid or API session token
+
+        Returns:
+            dict: {'version': int, 'messages': list}, or None if nothing is stored
+        """
+        raise NotImplementedError
+
+    def save_session(self, session_id: str, messages: list) -> int:
+        """
+        Stores a session's conversation after a turn
+
+        Args:
+            session_id: Socket.IO sid or API session token
+            messages: The Agent's messages
+
+        Returns:
+            int: The new version
+        """
+        raise NotImplementedError
+
+    def delete_session(self, session_id: str) -> None:
+        """Forgets a session's conversation"""
+        raise NotImplementedError
+
+    def put_job(self, job: dict) -> None:
+        """Stores a job's status (Job.to_dict()) so any worker can answer /api/jobs/<id>"""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Returns a stored job status, or None"""
+        raise NotImplementedError
+
+    def add_client(self, sid: str) -> None:
+        """Records a connected Socket.IO client"""
+        raise NotImplementedError
+
+    def remove_client(self, sid: str) -> None:
+        """Forgets a disconnected Socket.IO client"""
+        raise NotImplementedError
+
+    def has_client(self, sid: str) -> bool:
+        """True if the client is connected to any worker"""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store (single worker, tests); values are serialized like in Redis"""
+
+    def __init__(self, ttl_seconds: float = 86400, max_jobs: int = 1024):
+        """
+        Initializes an empty store
+
+        Args:
+            ttl_seconds: Seconds after its last save that a conversation is forgotten
+            max_jobs: Number of job statuses kept
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._sessions = {}
+        self._jobs = OrderedDict()
+        self._clients = set()
+        self._lock = threading.Lock()
+
+    def load_session(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            if stored is None:
+                return None
+            version, data, expires_at = stored
+            if expires_at <= time.monotonic():
+                del self._sessions[session_id]
+                return None
+        return {'version': version, 'messages': loads(data)}
+
+    def save_session(self, session_id: str, messages: list) -> int:
+        data = dumps(messages)
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            version = (stored[0] if stored else 0) + 1
+            self._sessions[session_id] = (version, data, time.monotonic() + self.ttl_seconds)
+            return version
+
+    def delete_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def put_job(self, job: dict) -> None:
+        with self._lock:
+            self._jobs[job['request_id']] = dumps(job)
+            self._jobs.move_to_end(job['request_id'])
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            data = self._jobs.get(job_id)
+        return loads(data) if data is not None else None
+
+    def add_client(self, sid: str) -> None:
+        with self._lock:
+            self._clients.add(sid)
+
+    def remove_client(self, sid: str) -> None:
+        with self._lock:
+            self._clients.discard(sid)
+
+    def has_client(self, sid: str) -> bool:
+        with self._lock:
+            return sid in self._clients
+
+
+class RedisSessionStore(SessionStore):
+    """Redis-backed store shared by all workers and hosts of a deployment"""
+
+    def __init__(self, url: str, prefix: str = 'voice-assistant', ttl_seconds: float = 86400,
+                 job_ttl_seconds: float = 3600):
+        """
+        Connects to Redis
+
+        Args:
+            url: redis://host:port/db
+            prefix: Key prefix, so several deployments can share one Redis
+            ttl_seconds: Seconds after its last save that a conversation expires
+            job_ttl_seconds: Seconds a job status is kept
+        """
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl_seconds = int(ttl_seconds)
+        self.job_ttl_seconds = int(job_ttl_seconds)
+
+    def _key(self, kind: str, name: str = None) -> str:
+        return f"{self.prefix}:{kind}:{name}" if name is not None else f"{self.prefix}:{kind}"
+
+    def load_session(self, session_id: str) -> Optional[dict]:
+        version, data = self.redis.hmget(self._key('session', session_id), 'version', 'messages')
+        if version is None or data is None:
+            return None
+        return {'version': int(version), 'messages': loads(data)}
+
+    def save_session(self, session_id: str, messages: list) -> int:
+        key = self._key('session', session_id)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(key, 'version', 1)
+        pipe.hset(key, 'messages', dumps(messages))
+        pipe.expire(key, self.ttl_seconds)
+        return int(pipe.execute()[0])
+
+    def delete_session(self, session_id: str) -> None:
+        self.redis.delete(self._key('session', session_id))
+
+    def put_job(self, job: dict) -> None:
+        self.redis.set(self._key('job', job['request_id']), dumps(job), ex=self.job_ttl_seconds)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        data = self.redis.get(self._key('job', job_id))
+        return loads(data) if data is not None else None
+
+    def add_client(self, sid: str) -> None:
+        self.redis.sadd(self._key('clients'), sid)
+
+    def remove_client(self, sid: str) -> None:
+        self.redis.srem(self._key('clients'), sid)
+
+    def has_client(self, sid: str) -> bool:
+        return bool(self.redis.sismember(self._key('clients'), sid))
+
+
+def create_session_store(url: str = None, **options) -> SessionStore:
+    """
+    Builds the store for a URL
+
+    Args:
+        url: redis://... for a shared store; empty or 'memory' for this process only
+        **options: Passed to the store (ttl_seconds, ...)
+
+    Returns:
+        SessionStore: The store (falls back to memory if Redis cannot be used)
+    """
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            store = RedisSessionStore(url, **options)
+            logger.info(f"Session state is shared through {url.split('@')[-1]}")
+            return store
+        except ImportError:
+            logger.error("SESSION_STORE_URL needs the redis package (pip install redis); "
+                         "keeping session state in this process")
+    elif url and url != 'memory':
+        logger.error(f"Unsupported session store URL {url}, keeping session state in this process")
+    return MemorySessionStore(ttl_seconds=options.get('ttl_seconds', 86400))
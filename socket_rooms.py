@@ -0,0 +1,85 @@
+"""
+Socket Rooms - Where each Socket.IO event goes, and how many clients it reached
+"""
+import threading
+from collections import defaultdict
+from typing import Optional
+
+# Clients that started the server microphone hear the voice conversation
+VOICE_ROOM = 'voice'
+# Opt-in room that receives a copy of every session's conversation (dashboards, demos)
+OBSERVER_ROOM = 'observers'
+
+
+def session_rooms(session_id: Optional[str]) -> list:
+    """
+    Rooms a session's conversation events are sent to
+
+    Every Socket.IO client is in a room named after its sid; API clients with an
+    X-Session-Id token are reached through sockets that connected with the same token.
+
+    Args:
+        session_id: Socket.IO sid or API session token (None for the voice conversation)
+
+    Returns:
+        list: The session's room and the observer room
+    """
+    return [session_id or VOICE_ROOM, OBSERVER_ROOM]
+
+
+class FanoutCounter:
+    """Counts emits and the clients each one reached, per event name"""
+
+    def __init__(self):
+        self._emits = defaultdict(int)
+        self._recipients = defaultdict(int)
+        self._max = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, event: str, recipients: int) -> None:
+        """
+        Records one emit
+
+        Args:
+            event: Socket.IO event name
+            recipients: Number of clients the emit was delivered to
+        """
+        with self._lock:
+            self._emits[event] += 1
+            self._recipients[event] += recipients
+            self._max[event] = max(self._max[event], recipients)
+
+    @staticmethod
+    def count(manager, rooms, namespace: str = '/') -> int:
+        """
+        Counts the clients of this process an emit to rooms reaches
+
+        Args:
+            manager: The Socket.IO client manager
+            rooms: A room, a list of rooms, or None for every client
+            namespace: Socket.IO namespace
+
+        Returns:
+            int: Distinct recipients (clients of other workers are not visible here)
+        """
+        if isinstance(rooms, (list, tuple)) and not rooms:
+            return 0
+        return sum(1 for _ in manager.get_participants(namespace, rooms))
+
+    def stats(self) -> dict:
+        """
+        Returns per-event counters
+
+        Returns:
+            dict: Emits, total and mean/max recipients per event
+        """
+        with self._lock:
+            return {
+                event: {
+                    'emits': emits,
+                    'recipients': self._recipients[event],
+                    'fanout_mean': self._recipients[event] / emits,
+                    'fanout_max': self._max[event],
+                }
+                for event, emits in sorted(self._emits.items())
+            }
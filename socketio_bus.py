@@ -0,0 +1,57 @@
+"""
+Socket.IO Bus - Message queue settings so broadcasts reach clients connected to any worker
+"""
+import queue
+import logging
+import threading
+import socketio
+
+logger = logging.getLogger(__name__)
+
+
+class LocalPubSubManager(socketio.PubSubManager):
+    """
+    In-process stand-in for a Redis message queue
+
+    Every manager on the same channel receives every message, serialized the same way
+    as over Redis, so several Socket.IO servers in one process (tests, benchmarks)
+    behave like workers sharing a broker.
+    """
+
+    name = 'local'
+    _channels = {}
+    _channels_lock = threading.Lock()
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        with self._channels_lock:
+            subscribers = list(self._channels.get(self.channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def _listen(self):
+        subscriber = queue.Queue()
+        with self._channels_lock:
+            self._channels.setdefault(self.channel, []).append(subscriber)
+        while True:
+            yield subscriber.get()
+
+
+def socketio_options(url: str = None, channel: str = 'voice-assistant') -> dict:
+    """
+    Builds the SocketIO(...) keyword arguments for a message queue URL
+
+    Args:
+        url: redis://host:port/db (or any Kombu URL), 'local' for the in-process
+             stand-in, or empty for a single worker without a queue
+        channel: Pub/sub channel shared by all workers of one deployment
+
+    Returns:
+        dict: message_queue/channel or client_manager options (empty without a URL)
+    """
+    if not url:
+        return {}
+    logger.info(f"Socket.IO broadcasts go through message queue {url.split('@')[-1]}")
+    if url == 'local' or url.startswith('local://'):
+        return {'client_manager': LocalPubSubManager(channel=channel)}
+    return {'message_queue': url, 'channel': channel}
@@ -0,0 +1,258 @@
+"""
+Speech Cache - Content-addressed cache of synthesized speech audio on disk
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Phrases the assistant says often enough to render before the first request
+DEFAULT_PHRASES = [
+    "Hello! I'm your voice assistant. How can I help you?",
+    "Goodbye! Have a great day!",
+    "I encountered an error. Please try again.",
+    "I'm sorry, I couldn't process that. Please try again.",
+    "Opening YouTube",
+]
+
+
+def speech_key(text: str, voice: str, rate) -> str:
+    """
+    Returns the content address of a phrase rendered with a given voice and rate
+
+    Args:
+        text: Phrase to speak (whitespace is folded)
+        voice: TTS voice id
+        rate: TTS speaking rate
+
+    Returns:
+        str: Hex digest used as the file name
+    """
+    content = "\0".join([" ".join(text.split()), str(voice), str(rate)])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def audio_player_available() -> bool:
+    """True if play_audio_file() has a way to play sound on this platform"""
+    return sys.platform.startswith('win') or any(shutil.which(player) for player in ('afplay', 'paplay', 'aplay'))
+
+
+def play_audio_file(path: str, cancel: threading.Event = None) -> bool:
+    """
+    Plays an audio file and waits for it to finish
+
+    Args:
+        path: Audio file to play
+        cancel: Optional event that stops playback early when set
+
+    Returns:
+        bool: False if no audio player is available or playback failed
+    """
+    cancel = cancel or threading.Event()
+    try:
+        if sys.platform.startswith('win'):
+            import wave
+            import winsound
+            with wave.open(path, 'rb') as f:
+                duration = f.getnframes() / float(f.getframerate())
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            if cancel.wait(timeout=duration):
+                winsound.PlaySound(None, 0)
+            return True
+        for player in (['afplay'], ['paplay'], ['aplay', '-q']):
+            if shutil.which(player[0]):
+                process = subprocess.Popen(player + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                while process.poll() is None:
+                    if cancel.wait(timeout=0.05):
+                        process.terminate()
+                        process.wait()
+                        return True
+                return process.returncode == 0
+    except Exception as e:
+        logger.error(f"Error playing cached speech: {e}")
+    return False
+
+
+class SpeechCache:
+    """LRU cache of rendered phrases, bounded by total size on disk"""
+
+    def __init__(self, directory: str = ".tts_cache", max_bytes: int = 50 * 1024 * 1024,
+                 max_text_chars: int = 200):
+        """
+        Initializes the cache, adopting files already rendered by earlier runs
+
+        Args:
+            directory: Where audio files are stored
+            max_bytes: Disk quota; least recently used files are deleted beyond it
+            max_text_chars: Longer texts (typically one-off answers) are not cached
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_text_chars = max_text_chars
+        self._entries = OrderedDict()
+        self._render_seconds = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            # Skip partial renders left by a crash (their stem contains a dot)
+            if name.endswith('.wav') and '.' not in name[:-4] and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+        logger.info(f"Speech cache: {len(self._entries)} phrases ({self.total_bytes // 1024} KB) in {directory}")
+
+    def is_cacheable(self, text: str) -> bool:
+        """True for non-empty phrases short enough to be worth caching"""
+        return 0 < len(text.strip()) <= self.max_text_chars
+
+    def path_for(self, key: str) -> str:
+        """Returns the audio file path for a key"""
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, text: str, voice: str, rate) -> Optional[str]:
+        """
+        Looks up a rendered phrase
+
+        Args:
+            text: Phrase to speak
+            voice: TTS voice id
+            rate: TTS speaking rate
+
+        Returns:
+            str: Path of the audio file, or None on a miss
+        """
+        key = speech_key(text, voice, rate)
+        path = self.path_for(key)
+        with self._lock:
+            if key not in self._entries or not os.path.exists(path):
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.seconds_saved += self._render_seconds.get(key, self._mean_render_seconds())
+        try:
+            os.utime(path)  # Keeps recency across restarts
+        except OSError:
+            pass
+        return path
+
+    def render(self, text: str, voice: str, rate, renderer: Callable[[str, str], None]) -> Optional[str]:
+        """
+        Renders a phrase into the cache
+
+        Args:
+            text: Phrase to speak
+            voice: TTS voice id
+            rate: TTS speaking rate
+            renderer: Writes the audio for a text to the given path
+
+        Returns:
+            str: Path of the audio file, or None if rendering failed
+        """
+        key = speech_key(text, voice, rate)
+        path = self.path_for(key)
+        partial = os.path.join(self.directory, f"{key}.partial-{threading.get_ident()}.wav")
+        start = time.perf_counter()
+        try:
+            renderer(text, partial)
+            if not os.path.exists(partial) or os.path.getsize(partial) == 0:
+                raise RuntimeError("renderer produced no audio")
+            os.replace(partial, path)
+        except Exception as e:
+            logger.error(f"Error rendering speech to cache: {e}")
+            if os.path.exists(partial):
+                os.remove(partial)
+            return None
+        elapsed = time.perf_counter() - start
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = size
+            self.total_bytes += size
+            self._render_seconds[key] = elapsed
+            self.renders += 1
+            self._evict()
+        return path
+
+    def prerender(self, phrases: list, voice: str, rate, renderer: Callable[[str, str], None]) -> int:
+        """
+        Renders phrases that are not cached yet
+
+        Returns:
+            int: Number of phrases rendered
+        """
+        rendered = 0
+        for phrase in phrases:
+            key = speech_key(phrase, voice, rate)
+            with self._lock:
+                cached = key in self._entries and os.path.exists(self.path_for(key))
+            if not cached and self.is_cacheable(phrase) and self.render(phrase, voice, rate, renderer):
+                rendered += 1
+        logger.info(f"Pre-rendered {rendered} of {len(phrases)} phrases")
+        return rendered
+
+    def stats(self) -> dict:
+        """
+        Returns cache counters
+
+        Returns:
+            dict: Hits, misses, hit rate, disk usage and estimated synthesis time saved
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'phrases': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'renders': self.renders,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'seconds_saved': round(self.seconds_saved, 3),
+            }
+
+    def _mean_render_seconds(self) -> float:
+        """Average render time, used for files rendered by an earlier run (lock must be held)"""
+        samples = self._render_seconds.values()
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def _forget(self, key: str) -> None:
+        """Drops a key from the index (lock must be held)"""
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self) -> None:
+        """Deletes least recently used files while over quota (lock must be held)"""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self._render_seconds.pop(key, None)
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
@@ -4,22 +4,122 @@ Speech Engine - Handles voice input and audio output
 import speech_recognition as sr
 import pyttsx3
 import logging
+import os
+import threading
+import tempfile
+import time
+from stt_backends import build_recognizer
+from speech_cache import SpeechCache, audio_player_available, play_audio_file
+from metrics import stage
 
 logger = logging.getLogger(__name__)
 
+# Room echo keeps reaching the microphone briefly after playback ends
+ECHO_TAIL_SECONDS = 0.3
+
 
 class SpeechEngine:
     """Handles speech recognition and text-to-speech"""
     
-    def __init__(self):
+    def __init__(self, calibration_interval: float = 30, stt_backend: str = "google",
+                 stt_fallback: str = "google", stt_options: dict = None, speech_cache: SpeechCache = None):
+        """
+        Initializes the recognizer and TTS engine
+        
+        Args:
+            calibration_interval: Minimum seconds between ambient-noise recalibrations
+                                  while a persistent microphone is open
+            stt_backend: Speech-to-text backend ('google', 'vosk' or 'whisper')
+            stt_fallback: Backend used when the first one fails ('none' to disable)
+            stt_options: Backend options (vosk_model_path, whisper_model, ...)
+            speech_cache: Optional cache of rendered phrases played instead of re-synthesizing
+        """
         self.recognizer = sr.Recognizer()
+        self.stt = build_recognizer(stt_backend, stt_fallback, self.recognizer, **(stt_options or {}))
         self.tts_engine = pyttsx3.init()
+        self.speech_cache = speech_cache
+        # Set by stop_speaking(); checked on every spoken word and during cached playback
+        self._stop_speech = threading.Event()
+        self._rendering = False
+        self.tts_engine.connect('started-word', self._on_word)
+        # Cached audio can only replace say() if something can play the files
+        self._play_cached = speech_cache is not None and audio_player_available()
+        if speech_cache is not None and not self._play_cached:
+            logger.warning("No audio player found, cached speech is only used for streaming to clients")
         self._is_listening = False
+        # Local playback state, so capture can ignore the assistant's own voice
+        self._speaking = threading.Event()
+        self._speech_ended_at = 0.0
         
         # Configure recognizer for better performance
         self.recognizer.energy_threshold = 4000
         self.recognizer.dynamic_energy_threshold = True
         
+        # Persistent microphone state (see open_microphone)
+        self.calibration_interval = calibration_interval
+        self._microphone = None
+        self._source = None
+        self._mic_lock = threading.Lock()
+        self._calibrated_at = 0.0
+        # True after a listen timed out, i.e. the room was quiet at the end of it
+        self._quiet = False
+        
+    def open_microphone(self) -> bool:
+        """
+        Opens the microphone once and keeps the stream open for all later listen() calls
+        
+        The ambient-noise calibration runs once here instead of before every phrase.
+        After that, the recognizer's dynamic energy threshold keeps adapting while it
+        waits for speech, and capture() recalibrates between listens once
+        calibration_interval has passed, right after a listen timed out in silence
+        (so nobody is cut off mid-phrase).
+        
+        Returns:
+            bool: True if the microphone is open, False if it could not be opened
+        """
+        with self._mic_lock:
+            if self._source is not None:
+                return True
+            try:
+                self._microphone = sr.Microphone()
+                self._source = self._microphone.__enter__()
+                with stage('calibration'):
+                    self.recognizer.adjust_for_ambient_noise(self._source, duration=0.5)
+                self._calibrated_at = time.monotonic()
+                self._quiet = False
+                logger.info(f"Microphone opened, energy threshold {self.recognizer.energy_threshold:.0f}")
+            except Exception as e:
+                logger.error(f"Could not open microphone: {e}")
+                self._microphone = None
+                self._source = None
+                return False
+        return True
+    
+    def close_microphone(self) -> None:
+        """Closes the persistent microphone stream"""
+        with self._mic_lock:
+            if self._microphone is not None:
+                try:
+                    self._microphone.__exit__(None, None, None)
+                except Exception as e:
+                    logger.error(f"Error closing microphone: {e}")
+                logger.info("Microphone closed")
+            self._microphone = None
+            self._source = None
+    
+    def _recalibrate(self) -> None:
+        """Recalibrates the persistent stream if it is due (caller holds _mic_lock)"""
+        if not self._quiet or time.monotonic() - self._calibrated_at < self.calibration_interval:
+            return
+        try:
+            with stage('calibration'):
+                self.recognizer.adjust_for_ambient_noise(self._source, duration=0.25)
+            logger.debug(f"Recalibrated energy threshold to {self.recognizer.energy_threshold:.0f}")
+        except Exception as e:
+            logger.error(f"Calibration failed: {e}")
+        self._calibrated_at = time.monotonic()
+        self._quiet = False
+        
     def listen(self) -> str:
         """
         Captures voice input and converts to text using Google Speech Recognition
@@ -28,70 +128,217 @@ class SpeechEngine:
             str: Recognized text from voice input, or empty string if recognition fails
         """
         self._is_listening = True
-        max_retries = 3
-        retry_count = 0
         
+        # Don't record the assistant's own voice; wait for it to finish talking
+        while self._speaking.is_set():
+            time.sleep(0.05)
+        started = time.time()
         try:
-            with sr.Microphone() as source:
-                logger.info("Listening...")
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                
-                # Listen for audio
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                
-                logger.info("Processing speech...")
-                
-                # Retry logic for network errors
-                while retry_count < max_retries:
-                    try:
-                        # Use Google Speech Recognition (free)
-                        text = self.recognizer.recognize_google(audio)
-                        logger.info(f"Recognized: {text}")
-                        self._is_listening = False
-                        return text
-                    except sr.RequestError as e:
-                        retry_count += 1
-                        if retry_count < max_retries:
-                            logger.warning(f"Network error (attempt {retry_count}/{max_retries}): {e}")
-                            import time
-                            time.sleep(2 ** retry_count)  # Exponential backoff
-                        else:
-                            logger.error(f"Failed after {max_retries} attempts: {e}")
-                            self._is_listening = False
-                            return ""
-                
+            audio = self.capture()
         except sr.WaitTimeoutError:
             logger.warning("Listening timeout - no speech detected")
             self._is_listening = False
             return ""
+        except Exception as e:
+            logger.error(f"Error in speech recognition: {e}")
+            self._is_listening = False
+            return ""
+        
+        if self.spoke_since(started):
+            logger.info("Discarded phrase captured while speaking")
+            self._is_listening = False
+            return ""
+        text = self.recognize(audio)
+        self._is_listening = False
+        return text
+    
+    def capture(self) -> sr.AudioData:
+        """
+        Records one phrase, from the persistent stream if it is open
+        
+        Returns:
+            sr.AudioData: The captured phrase
             
+        Raises:
+            sr.WaitTimeoutError: If nobody spoke within the timeout
+        """
+        # Timeouts are the normal idle outcome, not errors
+        with self._mic_lock:
+            if self._source is not None:
+                self._recalibrate()
+                logger.info("Listening...")
+                try:
+                    with stage('capture', ignore=(sr.WaitTimeoutError,)):
+                        audio = self.recognizer.listen(self._source, timeout=5, phrase_time_limit=10)
+                except sr.WaitTimeoutError:
+                    self._quiet = True
+                    raise
+                self._quiet = False
+                return audio
+        
+        # No persistent stream: open the device and calibrate for this phrase only
+        with sr.Microphone() as source:
+            logger.info("Listening...")
+            with stage('calibration'):
+                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+            with stage('capture', ignore=(sr.WaitTimeoutError,)):
+                return self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
+    
+    def recognize(self, audio: sr.AudioData) -> str:
+        """
+        Converts a captured phrase to text with the configured backend(s)
+        
+        Args:
+            audio: The captured phrase
+            
+        Returns:
+            str: Recognized text, or empty string if recognition fails
+        """
+        try:
+            logger.info("Processing speech...")
+            text = self.stt.transcribe(audio)
+            logger.info(f"Recognized: {text}")
+            return text
+                
         except sr.UnknownValueError:
             logger.warning("Could not understand audio")
-            self._is_listening = False
             return ""
             
         except Exception as e:
             logger.error(f"Error in speech recognition: {e}")
-            self._is_listening = False
             return ""
+    
+    def recognition_stats(self) -> dict:
+        """
+        Returns real-time factor and failure counts per speech-to-text backend
         
-        self._is_listening = False
-        return ""
+        Returns:
+            dict: Fallback count and per-backend stats
+        """
+        return self.stt.stats()
     
     def speak(self, text: str) -> None:
         """
         Converts text to speech using pyttsx3
         
+        Nothing is spoken while a stop requested by stop_speaking() is pending; callers
+        that cut speech off call reset_stop() when they start the next utterance.
+        
         Args:
             text: The text to speak
         """
+        if self._stop_speech.is_set():
+            logger.info(f"Speech stopped before it started: {text[:50]}")
+            return
+        self._speaking.set()
         try:
             logger.info(f"Speaking: {text}")
+            if self._play_cached and self.speech_cache.is_cacheable(text):
+                voice, rate = self._voice_settings()
+                path = self.speech_cache.get(text, voice, rate) \
+                    or self.speech_cache.render(text, voice, rate, self._render_to_file)
+                if self._stop_speech.is_set() or (path and play_audio_file(path, cancel=self._stop_speech)):
+                    return
             self.tts_engine.say(text)
             self.tts_engine.runAndWait()
         except Exception as e:
             logger.error(f"Error in text-to-speech: {e}")
+        finally:
+            self._speech_ended_at = time.time()
+            self._speaking.clear()
+    
+    def is_speaking(self) -> bool:
+        """
+        Returns True while speak() is playing through the local speaker
+        
+        Returns:
+            bool: True during playback
+        """
+        return self._speaking.is_set()
+    
+    def spoke_since(self, timestamp: float) -> bool:
+        """
+        Checks whether local playback (or its echo) overlapped the time since timestamp
+        
+        Args:
+            timestamp: Epoch seconds, e.g. when a capture started
+            
+        Returns:
+            bool: True if a phrase captured since then may contain the assistant's voice
+        """
+        return self._speaking.is_set() or self._speech_ended_at + ECHO_TAIL_SECONDS > timestamp
+    
+    def synthesize(self, text: str) -> tuple:
+        """
+        Renders text to a WAV file instead of playing it (for streaming to clients)
+        
+        Cacheable phrases come from (or go into) the speech cache; anything else is
+        rendered to a temporary file the caller deletes after use.
+        
+        Args:
+            text: The text to synthesize
+            
+        Returns:
+            tuple: (path or None on failure, True if the file is temporary)
+        """
+        try:
+            if self.speech_cache is not None and self.speech_cache.is_cacheable(text):
+                voice, rate = self._voice_settings()
+                path = self.speech_cache.get(text, voice, rate) \
+                    or self.speech_cache.render(text, voice, rate, self._render_to_file)
+                if path:
+                    return path, False
+            handle, path = tempfile.mkstemp(suffix='.wav', prefix='tts-')
+            os.close(handle)
+            self._render_to_file(text, path)
+            return path, True
+        except Exception as e:
+            logger.error(f"Error synthesizing speech: {e}")
+            return None, False
+    
+    def stop_speaking(self) -> None:
+        """Cuts off the utterance currently being spoken (safe to call from any thread)"""
+        self._stop_speech.set()
+    
+    def reset_stop(self) -> None:
+        """Clears a pending stop, so the next speak() plays (call when an utterance is dequeued)"""
+        self._stop_speech.clear()
+    
+    def _on_word(self, name, location, length) -> None:
+        """pyttsx3 word callback; stopping from inside the callback keeps the driver on its own thread"""
+        # Never cut a file render short, it would be cached truncated
+        if self._stop_speech.is_set() and not self._rendering:
+            self.tts_engine.stop()
+    
+    def prerender(self, phrases: list) -> int:
+        """
+        Renders phrases into the speech cache ahead of their first use
+        
+        Must run on the thread that calls speak(), since pyttsx3 is not thread-safe.
+        
+        Args:
+            phrases: Texts to render
+            
+        Returns:
+            int: Number of phrases rendered
+        """
+        if self.speech_cache is None:
+            return 0
+        voice, rate = self._voice_settings()
+        return self.speech_cache.prerender(phrases, voice, rate, self._render_to_file)
+    
+    def _voice_settings(self) -> tuple:
+        """Returns the current TTS voice and rate (part of the speech cache key)"""
+        return self.tts_engine.getProperty('voice'), self.tts_engine.getProperty('rate')
+    
+    def _render_to_file(self, text: str, path: str) -> None:
+        """Synthesizes text into an audio file without playing it"""
+        self._rendering = True
+        try:
+            self.tts_engine.save_to_file(text, path)
+            self.tts_engine.runAndWait()
+        finally:
+            self._rendering = False
     
     def is_listening(self) -> bool:
         """
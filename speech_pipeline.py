@@ -0,0 +1,222 @@
+"""
+Speech Pipeline - Overlaps microphone capture with speech recognition
+"""
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Iterator, Optional, Tuple
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+
+class SpeechPipeline:
+    """
+    Captures phrases on one thread while a pool of workers recognizes earlier ones
+
+    Captured phrases go into a bounded ring buffer (the oldest is dropped when the
+    recognizers fall behind). Results are re-ordered by capture sequence so they come
+    out in the order they were spoken, no matter which worker finishes first.
+
+    Capture pauses while the engine is speaking, and a phrase whose capture overlapped
+    playback is discarded, so the assistant never answers (or barges in on) itself.
+    """
+
+    def __init__(self, speech_engine, buffer_size: int = 8, recognizers: int = 2,
+                 on_listening: Optional[Callable[[bool], None]] = None):
+        """
+        Initializes the pipeline (call start() to begin capturing)
+
+        Args:
+            speech_engine: SpeechEngine providing capture() and recognize()
+            buffer_size: Maximum number of captured phrases waiting for recognition
+            recognizers: Number of recognition worker threads
+            on_listening: Optional callback told when a capture starts (True) and ends (False)
+        """
+        self.speech_engine = speech_engine
+        self.buffer_size = buffer_size
+        self.recognizers = recognizers
+        self.on_listening = on_listening
+        self._audio = queue.Queue(maxsize=buffer_size)
+        self._results = queue.Queue()
+        self._pending = {}
+        self._next_seq = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads = []
+        self.captured = 0
+        self.recognized = 0
+        self.dropped = 0
+        self.echo_dropped = 0
+
+    @property
+    def is_running(self) -> bool:
+        """Returns True while the capture thread is active"""
+        return self._running
+
+    def start(self) -> None:
+        """Starts the capture thread and the recognition workers"""
+        if self._running:
+            return
+        self._running = True
+        self._threads = [threading.Thread(target=self._capture_loop, daemon=True, name='speech-capture')]
+        self._threads += [threading.Thread(target=self._recognize_loop, daemon=True, name=f'speech-recognizer-{index}')
+                          for index in range(self.recognizers)]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Speech pipeline started ({self.recognizers} recognizers, buffer {self.buffer_size})")
+
+    def stop(self, timeout: float = 2) -> None:
+        """
+        Stops capturing and wakes up anyone iterating results()
+
+        Args:
+            timeout: Seconds to wait for each thread (a capture in progress ends on its own timeout)
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._results.put(None)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=timeout)
+        logger.info("Speech pipeline stopped")
+
+    def results(self) -> Iterator[str]:
+        """
+        Yields recognized text in the order it was spoken until the pipeline stops
+
+        Returns:
+            Iterator[str]: Non-empty recognized phrases
+        """
+        for text, _ in self.timed_results():
+            yield text
+
+    def timed_results(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Like results(), with when each phrase was captured and recognized
+
+        Returns:
+            Iterator[tuple]: (text, timings) where timings holds epoch seconds
+                             capture_start/capture_end/stt_start/stt_end
+        """
+        while self._running or not self._results.empty():
+            try:
+                result = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if result is None:
+                continue
+            yield result
+
+    def stats(self) -> dict:
+        """
+        Returns pipeline counters
+
+        Returns:
+            dict: Captured, recognized and dropped phrases plus current buffer depth
+        """
+        with self._lock:
+            return {
+                'running': self._running,
+                'captured': self.captured,
+                'recognized': self.recognized,
+                'dropped': self.dropped,
+                'echo_dropped': self.echo_dropped,
+                'buffered': self._audio.qsize(),
+                'reordering': len(self._pending),
+            }
+
+    def _capture_loop(self) -> None:
+        """Records phrases back to back and hands them to the recognizers"""
+        sequence = 0
+        while self._running:
+            if self._is_speaking():
+                time.sleep(0.05)
+                continue
+            self._notify_listening(True)
+            capture_start = time.time()
+            try:
+                audio = self.speech_engine.capture()
+            except sr.WaitTimeoutError:
+                continue
+            except Exception as e:
+                logger.error(f"Error capturing speech: {e}")
+                continue
+            finally:
+                self._notify_listening(False)
+
+            if self._spoke_since(capture_start):
+                logger.info("Discarded phrase captured while the assistant was speaking")
+                with self._lock:
+                    self.echo_dropped += 1
+                continue
+
+            with self._lock:
+                self.captured += 1
+            self._enqueue(sequence, audio, {'capture_start': capture_start, 'capture_end': time.time()})
+            sequence += 1
+
+    def _enqueue(self, sequence: int, audio, timings: dict = None) -> None:
+        """Adds a phrase to the ring buffer, dropping the oldest one when it is full"""
+        while True:
+            try:
+                self._audio.put_nowait((sequence, audio, timings or {}))
+                return
+            except queue.Full:
+                try:
+                    oldest, _, _ = self._audio.get_nowait()
+                except queue.Empty:
+                    continue
+                logger.warning(f"Speech buffer full, dropped phrase {oldest}")
+                with self._lock:
+                    self.dropped += 1
+                # Fill the gap so later results are not held back waiting for it
+                self._deliver(oldest, "")
+
+    def _recognize_loop(self) -> None:
+        """Turns captured phrases into text"""
+        while self._running or not self._audio.empty():
+            try:
+                sequence, audio, timings = self._audio.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            text = ""
+            timings['stt_start'] = time.time()
+            try:
+                text = self.speech_engine.recognize(audio)
+            except Exception as e:
+                logger.error(f"Error recognizing speech: {e}")
+            timings['stt_end'] = time.time()
+            self._deliver(sequence, text, timings)
+
+    def _deliver(self, sequence: int, text: str, timings: dict = None) -> None:
+        """Releases results in capture order"""
+        with self._lock:
+            self._pending[sequence] = (text, timings or {})
+            while self._next_seq in self._pending:
+                ready, ready_timings = self._pending.pop(self._next_seq)
+                self._next_seq += 1
+                if ready:
+                    self.recognized += 1
+                    self._results.put((ready, ready_timings))
+
+    def _is_speaking(self) -> bool:
+        """True while the engine plays speech locally (engines without playback never do)"""
+        is_speaking = getattr(self.speech_engine, 'is_speaking', None)
+        return bool(is_speaking and is_speaking())
+
+    def _spoke_since(self, timestamp: float) -> bool:
+        """True if local playback overlapped a capture that started at timestamp"""
+        spoke_since = getattr(self.speech_engine, 'spoke_since', None)
+        return bool(spoke_since and spoke_since(timestamp))
+
+    def _notify_listening(self, listening: bool) -> None:
+        """Reports capture state to the optional callback"""
+        if self.on_listening is None:
+            return
+        try:
+            self.on_listening(listening)
+        except Exception as e:
+            logger.error(f"Error in listening callback: {e}")
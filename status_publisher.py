@@ -0,0 +1,140 @@
+"""
+Status Publisher - Emits server state only when it really changes, debouncing quick flips
+"""
+import time
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class StatusPublisher:
+    """
+    Holds the latest status and publishes it after it has been stable for a short window
+
+    The voice loop flips listening off and straight back on around every capture
+    timeout. Each update restarts the debounce window; when it expires, the state is
+    published only if it differs from what clients last saw, so such flaps cost nothing.
+    Continuous flapping is still published at least every max_delay_seconds.
+    """
+
+    def __init__(self, publish: Callable[[dict], None], debounce_seconds: float = 0.3,
+                 max_delay_seconds: float = 2.0, initial: dict = None):
+        """
+        Initializes the publisher
+
+        Args:
+            publish: Sends the full state to clients
+            debounce_seconds: Quiet time required before a change is published (0 publishes at once)
+            max_delay_seconds: Longest a change can be held back while the state keeps flapping
+            initial: State before any update (already known to clients)
+        """
+        self.publish = publish
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._state = dict(initial or {})
+        self._published = dict(self._state)
+        self._deadline = None
+        self._first_change = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.updates = 0
+        self.published = 0
+
+    def update(self, **fields) -> None:
+        """
+        Merges fields into the state and schedules publishing
+
+        Args:
+            **fields: Status fields, e.g. listening=True
+        """
+        with self._condition:
+            self.updates += 1
+            self._state.update(fields)
+            if self.debounce_seconds <= 0:
+                state = self._take_changed()
+            else:
+                now = time.monotonic()
+                self._deadline = now + self.debounce_seconds
+                if self._first_change is None:
+                    self._first_change = now
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True, name='status-publisher')
+                    self._thread.start()
+                self._condition.notify()
+                return
+        if state is not None:
+            self._send(state)
+
+    def snapshot(self) -> dict:
+        """Returns the latest state, including changes still inside the debounce window"""
+        with self._condition:
+            return dict(self._state)
+
+    def flush(self) -> None:
+        """Publishes a pending change now"""
+        with self._condition:
+            self._deadline = None
+            self._first_change = None
+            state = self._take_changed()
+        if state is not None:
+            self._send(state)
+
+    def stop(self) -> None:
+        """Publishes what is pending and stops the background thread"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.flush()
+
+    def stats(self) -> dict:
+        """
+        Returns publisher counters
+
+        Returns:
+            dict: Updates received, states published and updates that produced no emit
+        """
+        with self._condition:
+            return {
+                'updates': self.updates,
+                'published': self.published,
+                'suppressed': self.updates - self.published,
+                'debounce_seconds': self.debounce_seconds,
+            }
+
+    def _take_changed(self):
+        """Marks the state as published if it differs from the last one (lock must be held)"""
+        if self._state == self._published:
+            return None
+        self._published = dict(self._state)
+        self.published += 1
+        return dict(self._state)
+
+    def _send(self, state: dict) -> None:
+        """Calls publish outside the lock, logging failures"""
+        try:
+            self.publish(state)
+        except Exception as e:
+            logger.error(f"Error publishing status: {e}")
+
+    def _run(self) -> None:
+        """Publishes once the state has been quiet for the debounce window"""
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                if self._deadline is None:
+                    self._condition.wait()
+                    continue
+                due = min(self._deadline, self._first_change + self.max_delay_seconds)
+                remaining = due - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+                self._deadline = None
+                self._first_change = None
+                state = self._take_changed()
+            if state is not None:
+                self._send(state)
@@ -0,0 +1,313 @@
+"""
+Speech-to-Text Backends - Interchangeable recognizers (cloud and local CPU) with real-time factor tracking
+"""
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import List, Optional
+import speech_recognition as sr
+from metrics import STAGE_SECONDS, STAGE_ERRORS, STAGE_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Sample format the local engines expect
+LOCAL_SAMPLE_RATE = 16000
+LOCAL_SAMPLE_WIDTH = 2
+
+
+def audio_duration(audio: sr.AudioData) -> float:
+    """
+    Returns the length of captured audio in seconds
+
+    Args:
+        audio: Captured phrase
+
+    Returns:
+        float: Duration in seconds
+    """
+    return len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+
+
+class STTBackend:
+    """
+    Base class for recognizers
+
+    Subclasses implement _transcribe(). They raise sr.UnknownValueError when nothing
+    intelligible was heard and sr.RequestError when the engine itself failed, the same
+    contract as SpeechRecognition's recognize_* methods.
+    """
+
+    name = "base"
+
+    def __init__(self, history_size: int = 100):
+        """
+        Initializes the timing counters
+
+        Args:
+            history_size: Number of real-time factor samples kept for stats
+        """
+        self.calls = 0
+        self.failures = 0
+        self._rtf = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        """
+        Converts a captured phrase to text and records the real-time factor
+
+        Args:
+            audio: Captured phrase
+
+        Returns:
+            str: Recognized text
+        """
+        start = time.perf_counter()
+        try:
+            return self._transcribe(audio)
+        except sr.UnknownValueError:
+            raise
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            STAGE_ERRORS.inc(stage=f"stt_{self.name}")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.observe(elapsed, stage=f"stt_{self.name}")
+            duration = audio_duration(audio)
+            with self._lock:
+                self.calls += 1
+                if duration > 0:
+                    self._rtf.append(elapsed / duration)
+
+    def _transcribe(self, audio: sr.AudioData) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """
+        Returns call counters and real-time factor (processing time / audio length)
+
+        Returns:
+            dict: Calls, failures and mean/p95/last real-time factor
+        """
+        with self._lock:
+            samples = sorted(self._rtf)
+            last = self._rtf[-1] if self._rtf else 0.0
+            return {
+                'backend': self.name,
+                'calls': self.calls,
+                'failures': self.failures,
+                'rtf_mean': sum(samples) / len(samples) if samples else 0.0,
+                'rtf_p95': samples[int(0.95 * (len(samples) - 1))] if samples else 0.0,
+                'rtf_last': last,
+            }
+
+
+class GoogleBackend(STTBackend):
+    """Free Google Web Speech API (network, retried with exponential backoff)"""
+
+    name = "google"
+
+    def __init__(self, recognizer: sr.Recognizer, max_retries: int = 3, language: str = "en-US"):
+        """
+        Args:
+            recognizer: SpeechRecognition recognizer
+            max_retries: Attempts on network errors
+            language: Recognition language
+        """
+        super().__init__()
+        self.recognizer = recognizer
+        self.max_retries = max_retries
+        self.language = language
+
+    def _transcribe(self, audio: sr.AudioData) -> str:
+        retry_count = 0
+        while True:
+            try:
+                return self.recognizer.recognize_google(audio, language=self.language)
+            except sr.RequestError as e:
+                retry_count += 1
+                if retry_count >= self.max_retries:
+                    logger.error(f"Failed after {self.max_retries} attempts: {e}")
+                    raise
+                logger.warning(f"Network error (attempt {retry_count}/{self.max_retries}): {e}")
+                STAGE_RETRIES.inc(stage=f"stt_{self.name}")
+                time.sleep(2 ** retry_count)  # Exponential backoff
+
+
+class VoskBackend(STTBackend):
+    """Offline Kaldi recognizer (pip install vosk, then download a model directory)"""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str = "model"):
+        """
+        Args:
+            model_path: Directory of an unpacked Vosk model (e.g. vosk-model-small-en-us-0.15)
+        """
+        super().__init__()
+        from vosk import Model, KaldiRecognizer, SetLogLevel
+
+        SetLogLevel(-1)
+        self._recognizer_class = KaldiRecognizer
+        self.model = Model(model_path)
+        logger.info(f"Loaded Vosk model from {model_path}")
+
+    def _transcribe(self, audio: sr.AudioData) -> str:
+        recognizer = self._recognizer_class(self.model, LOCAL_SAMPLE_RATE)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=LOCAL_SAMPLE_RATE,
+                                                     convert_width=LOCAL_SAMPLE_WIDTH))
+        text = json.loads(recognizer.FinalResult()).get('text', '').strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class WhisperBackend(STTBackend):
+    """Offline Whisper on CPU via CTranslate2 (pip install faster-whisper)"""
+
+    name = "whisper"
+
+    def __init__(self, model_size: str = "base.en", compute_type: str = "int8", threads: int = 0,
+                 language: str = "en"):
+        """
+        Args:
+            model_size: Whisper model name or local path (tiny.en / base.en keep latency low)
+            compute_type: CTranslate2 quantization (int8 is the fastest on CPU)
+            threads: CPU threads for inference (0 uses the library default)
+            language: Spoken language, skips auto-detection
+        """
+        super().__init__()
+        import numpy
+        from faster_whisper import WhisperModel
+
+        self._numpy = numpy
+        self.language = language
+        self.model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+        logger.info(f"Loaded Whisper model {model_size} ({compute_type}, CPU)")
+
+    def _transcribe(self, audio: sr.AudioData) -> str:
+        raw = audio.get_raw_data(convert_rate=LOCAL_SAMPLE_RATE, convert_width=LOCAL_SAMPLE_WIDTH)
+        samples = self._numpy.frombuffer(raw, dtype=self._numpy.int16).astype(self._numpy.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language=self.language, beam_size=1,
+                                            vad_filter=True, condition_on_previous_text=False)
+        text = " ".join(segment.text.strip() for segment in segments).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class FallbackRecognizer:
+    """Tries backends in order; the next one is used only when the previous one failed"""
+
+    def __init__(self, backends: List[STTBackend]):
+        """
+        Args:
+            backends: Recognizers in order of preference (e.g. local first, cloud last)
+        """
+        self.backends = backends
+        self.fallbacks = 0
+
+    @property
+    def name(self) -> str:
+        return "+".join(backend.name for backend in self.backends)
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        """
+        Converts a captured phrase to text
+
+        Nothing intelligible (sr.UnknownValueError) is final; any other error moves on
+        to the next backend.
+
+        Args:
+            audio: Captured phrase
+
+        Returns:
+            str: Recognized text
+
+        Raises:
+            sr.UnknownValueError: If speech was not understood
+            sr.RequestError: If every backend failed
+        """
+        last_error = None
+        for index, backend in enumerate(self.backends):
+            if index:
+                self.fallbacks += 1
+                logger.warning(f"Falling back to {backend.name} speech recognition")
+            try:
+                return backend.transcribe(audio)
+            except sr.UnknownValueError:
+                raise
+            except Exception as e:
+                logger.error(f"{backend.name} speech recognition failed: {e}")
+                last_error = e
+        raise sr.RequestError(f"All speech recognition backends failed: {last_error}")
+
+    def stats(self) -> dict:
+        """
+        Returns per-backend counters
+
+        Returns:
+            dict: Fallback count and each backend's stats
+        """
+        return {
+            'fallbacks': self.fallbacks,
+            'backends': [backend.stats() for backend in self.backends],
+        }
+
+
+def create_backend(name: str, recognizer: sr.Recognizer, **options) -> Optional[STTBackend]:
+    """
+    Builds a backend by name, or returns None if its package or model is missing
+
+    Args:
+        name: 'google', 'vosk' or 'whisper'
+        recognizer: SpeechRecognition recognizer (used by the cloud backend)
+        **options: vosk_model_path, whisper_model, whisper_compute_type, whisper_threads
+
+    Returns:
+        STTBackend: The backend, or None if it could not be loaded
+    """
+    name = (name or "").lower()
+    try:
+        if name == "google":
+            return GoogleBackend(recognizer)
+        if name == "vosk":
+            return VoskBackend(options.get('vosk_model_path') or "model")
+        if name == "whisper":
+            return WhisperBackend(options.get('whisper_model') or "base.en",
+                                  compute_type=options.get('whisper_compute_type') or "int8",
+                                  threads=int(options.get('whisper_threads') or 0))
+    except Exception as e:
+        logger.error(f"Could not load {name} speech recognition backend: {e}")
+        return None
+    logger.error(f"Unknown speech recognition backend: {name}")
+    return None
+
+
+def build_recognizer(primary: str, fallback: str, recognizer: sr.Recognizer, **options) -> FallbackRecognizer:
+    """
+    Builds the recognizer chain from config, defaulting to Google if nothing else loads
+
+    Args:
+        primary: Preferred backend name
+        fallback: Backend used when the primary fails ('none' to disable)
+        recognizer: SpeechRecognition recognizer
+        **options: Backend options (see create_backend)
+
+    Returns:
+        FallbackRecognizer: Chain of loaded backends
+    """
+    backends = []
+    for name in (primary, fallback):
+        if not name or name.lower() == "none" or any(backend.name == name.lower() for backend in backends):
+            continue
+        backend = create_backend(name, recognizer, **options)
+        if backend is not None:
+            backends.append(backend)
+    if not backends:
+        backends.append(GoogleBackend(recognizer))
+    logger.info(f"Speech recognition backends: {', '.join(backend.name for backend in backends)}")
+    return FallbackRecognizer(backends)
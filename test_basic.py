@@ -1,9 +1,43 @@
 """
 Basic functionality tests for Voice Assistant
 """
-from models import Command, CommandIntent, Message, MessageType
+from models import Command, CommandIntent, Message, MessageType, JobStatus, SpeechPriority
 from command_processor import CommandProcessor
+from job_executor import AgentJobExecutor
+from sentence_buffer import SentenceBuffer
+from response_cache import ResponseCache, normalize_question
+from action_executors import QuestionAnswerer
+from command_router import CommandRouter
+from session_pool import AgentSessionPool
+from conversation_memory import BoundedMemoryManager, SUMMARY_PREFIX
+from speech_pipeline import SpeechPipeline
+from tts_scheduler import TTSScheduler
+from lazy_component import LazyComponent
+from session_store import MemorySessionStore
+from socketio_bus import LocalPubSubManager
+from status_publisher import StatusPublisher
+from metrics import Registry, Counter, Gauge, Histogram
+from socket_rooms import FanoutCounter, session_rooms, VOICE_ROOM, OBSERVER_ROOM
+import socketio
+import uuid
+from audio_streamer import AudioStreamer, encode_mulaw, decode_mulaw
+from array import array
+from speech_cache import SpeechCache, speech_key
+from stt_backends import STTBackend, FallbackRecognizer, build_recognizer, audio_duration
+import speech_recognition as sr
 from datetime import datetime
+from tracing import Tracer, current_trace_id
+from log_pipeline import AsyncLogging, parse_sample_rates
+import logging
+from app_index import AppIndex
+from app_resolver import AppResolver
+from screenshot_encoder import ScreenshotEncoder, parse_region
+from trace_report import load_spans, group_traces, critical_path, stage_percentiles
+import threading
+import time
+import os
+import tempfile
+import wave
 
 def test_models():
     """Test data models"""
@@ -57,12 +91,1021 @@ def test_command_processor():
     assert cmd.intent == CommandIntent.ANSWER_QUESTION
     print("✓ Question command recognized")
     
+    # Test confidence scoring
+    assert processor.process_command("can you open chrome please").confidence >= 0.8
+    assert processor.process_command("how do I start a business").confidence < 0.8
+    assert processor.process_command("stop the music").confidence < 0.8
+    print("✓ Direct commands scored above embedded keywords")
+    
+    # Keywords only match whole words
+    assert processor.process_command("what is a nonstop flight").intent == CommandIntent.ANSWER_QUESTION
+    assert processor.process_command("how do I restart my router").intent == CommandIntent.ANSWER_QUESTION
+    cmd = processor.process_command("launch spotify app now")
+    assert cmd.intent == CommandIntent.OPEN_APP and cmd.parameters['app_name'] == 'spotify app'
+    cmd = processor.process_command("play lofi beats on youtube")
+    assert cmd.parameters['song_name'] == 'lofi beats'
+    print("✓ Keywords matched on word boundaries")
+    
+    # Only names of known applications, single commands and actual music take the fast path
+    processor = CommandProcessor(resolver=AppResolver())
+    for text in ("start over", "run a quick test for me", "open the door please", "play a game with me",
+                 "open chrome and play despacito", "play despacito then open chrome"):
+        assert processor.process_command(text).confidence < 0.8, text
+    for text in ("open chrome", "launch spotify app now", "open visual code", "open youtube",
+                 "play some relaxing music", "play simon and garfunkel"):
+        assert processor.process_command(text).confidence >= 0.8, text
+    print("✓ Unknown apps, compound commands and games are left to the agent")
+    
     print("✓ Command processor working correctly")
 
+def test_job_executor():
+    """Test background agent jobs"""
+    print("\nTesting agent job executor...")
+    
+    release = threading.Event()
+    done = threading.Event()
+    completed = []
+    
+    def slow_handler(job):
+        release.wait(timeout=5)
+        return f"answer to {job.text}"
+    
+    def on_complete(job):
+        completed.append(job)
+        done.set()
+    
+    executor = AgentJobExecutor(handler=slow_handler, max_workers=1, max_pending=1)
+    queued = []
+    job = executor.submit("who are you", on_complete=on_complete, on_queued=queued.append)
+    
+    # Submit returns before the agent finishes
+    assert job is not None
+    assert queued == [job]
+    assert executor.get(job.id).status in (JobStatus.PENDING, JobStatus.RUNNING)
+    print("✓ Job accepted without waiting for the agent")
+    
+    # Capacity is bounded
+    assert executor.submit("second question") is None
+    print("✓ Executor rejects work beyond max_pending")
+    
+    release.set()
+    assert done.wait(timeout=5)
+    assert completed[0].id == job.id
+    assert job.status == JobStatus.COMPLETED
+    assert job.to_dict()['result'] == "answer to who are you"
+    assert executor.pending_count() == 0
+    print("✓ Job result delivered with its request id")
+    
+    failing = AgentJobExecutor(handler=lambda job: 1 / 0)
+    done.clear()
+    failed = failing.submit("boom", on_complete=lambda job: done.set())
+    assert done.wait(timeout=5)
+    assert failed.status == JobStatus.FAILED and failed.error
+    print("✓ Failed jobs report their error")
+    
+    # A job that never reaches the pool gives its slot back
+    def broken_callback(job):
+        raise ValueError("emit failed")
+    try:
+        executor.submit("third question", on_queued=broken_callback)
+        assert False, "on_queued errors propagate"
+    except ValueError:
+        pass
+    executor.shutdown()
+    try:
+        executor.submit("after shutdown")
+        assert False, "submitting after shutdown fails"
+    except RuntimeError:
+        pass
+    assert executor.pending_count() == 0
+    print("✓ Failed submits release their slot")
+    
+    failing.shutdown()
+    print("✓ Agent job executor working correctly")
+
+def test_sentence_buffer():
+    """Test grouping streamed tokens into sentences"""
+    print("\nTesting sentence buffer...")
+    
+    buffer = SentenceBuffer()
+    spoken = []
+    for delta in ["It's 3", ".45 PM", " IST. Anything", " else I can", " help with? ", "Sure", " thing"]:
+        spoken.extend(buffer.feed(delta))
+    
+    # Decimal points do not end a sentence
+    assert spoken == ["It's 3.45 PM IST.", "Anything else I can help with?"]
+    assert buffer.flush() == "Sure thing"
+    assert buffer.received
+    print("✓ Sentences released as soon as they complete")
+    
+    # Short fragments are joined with the following sentence
+    buffer = SentenceBuffer(min_length=12)
+    assert buffer.feed("Sure. ") == []
+    assert buffer.feed("Opening Chrome now. ") == ["Sure. Opening Chrome now."]
+    print("✓ Short fragments coalesced")
+    
+    print("✓ Sentence buffer working correctly")
+
+def test_response_cache():
+    """Test the TTL-bounded LRU response cache"""
+    print("\nTesting response cache...")
+    
+    assert normalize_question("  Who ARE you?? ") == normalize_question("who are you")
+    
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    assert cache.get("Who are you?") is None
+    assert cache.put("Who are you?", "I'm AI Buddy")
+    assert cache.get("who are you") == "I'm AI Buddy"
+    print("✓ Equivalent questions share a cache entry")
+    
+    # Side-effecting tools and time-sensitive questions are never cached
+    assert not cache.put("open chrome", "Opening Chrome")
+    assert not cache.put("what time is it", "It's 3:45 PM IST")
+    assert not cache.put("show me something fun", "Screenshot saved", tools_used={'take_screenshot'})
+    assert cache.get("open chrome") is None
+    print("✓ Uncacheable questions bypass the cache")
+    
+    # LRU eviction keeps the recently used entry
+    cache.put("what can you do", "Lots")
+    cache.get("who are you")
+    cache.put("capital of france", "Paris")
+    assert cache.get("what can you do") is None
+    assert cache.get("who are you") == "I'm AI Buddy"
+    
+    # Expired entries are dropped
+    short_lived = ResponseCache(ttl_seconds=0.01)
+    short_lived.put("who are you", "I'm AI Buddy")
+    time.sleep(0.02)
+    assert short_lived.get("who are you") is None
+    
+    stats = cache.stats()
+    assert stats['hits'] == 3 and stats['evictions'] == 1 and stats['size'] == 2
+    assert short_lived.stats()['expirations'] == 1
+    print("✓ LRU eviction, TTL expiry and counters")
+    
+    # Follow-ups depend on their own conversation and are never shared
+    assert not cache.put("how old is he", "42") and not cache.put("what about her", "39")
+    
+    class FakeAgent:
+        def __init__(self):
+            self.messages = []
+            self.calls = 0
+        
+        def __call__(self, question, **kwargs):
+            self.calls += 1
+            self.messages.append({'role': 'user', 'content': [{'text': question}]})
+            self.messages.append({'role': 'assistant', 'content': [{'text': f"answer {self.calls}"}]})
+            return f"answer {self.calls}"
+    
+    shared = ResponseCache()
+    first, second = QuestionAnswerer(cache=shared), QuestionAnswerer(cache=shared)
+    first.agent, second.agent = FakeAgent(), FakeAgent()
+    assert str(first.answer_question("who wrote hamlet")) == "answer 1"
+    assert second.answer_question("who wrote hamlet") == "answer 1" and second.agent.calls == 0
+    assert [m['content'][0]['text'] for m in second.agent.messages] == ["who wrote hamlet", "answer 1"]
+    # Standalone questions are shared at any turn; follow-ups go to the session's own Agent
+    assert str(second.answer_question("who is the author of macbeth")) == "answer 1"
+    assert str(first.answer_question("who is the author of macbeth")) == "answer 1"
+    assert first.agent.calls == 1 and len(first.agent.messages) == 4
+    assert str(first.answer_question("when did he write it")) == "answer 2" and first.agent.calls == 2
+    assert not shared.is_cacheable("tell me more") and not shared.is_cacheable("what about paris")
+    assert shared.is_cacheable("is there life on mars") and shared.is_cacheable("tell me about photosynthesis")
+    print("✓ Later turns hit the cache for standalone questions, and hits join the session's history")
+    
+    print("✓ Response cache working correctly")
+
+def test_command_router():
+    """Test the fast-path router ahead of the agent"""
+    print("\nTesting command router...")
+    
+    class FakeAnswerer:
+        def __init__(self):
+            self.questions = []
+        
+        def answer_question(self, question, on_token=None):
+            self.questions.append(question)
+            return "agent answer"
+    
+    answerer = FakeAnswerer()
+    router = CommandRouter(answerer, threshold=0.8)
+    
+    result = router.route("goodbye")
+    assert result.fast_path and result.intent == CommandIntent.EXIT
+    assert answerer.questions == []
+    # Voice loops stop on every goodbye the fast path would answer
+    assert router.is_exit("okay bye") and router.is_exit("goodbye")
+    assert not router.is_exit("don't quit your day job") and not router.is_exit("open chrome")
+    print("✓ High-confidence intent skips the LLM")
+    
+    result = router.route("how do I start a business")
+    assert not result.fast_path and result.response == "agent answer"
+    result = router.route("what is the capital of France")
+    assert not result.fast_path
+    assert not router.route("start over").fast_path
+    assert answerer.questions == ["how do I start a business", "what is the capital of France", "start over"]
+    print("✓ Questions and ambiguous input fall through to the agent")
+    
+    stats = router.stats()
+    assert stats['fast_path'] == 1 and stats['llm_path'] == 3
+    assert stats['by_intent']['exit:fast'] == 1
+    print("✓ Command router working correctly")
+
+def test_session_pool():
+    """Test per-client agent sessions"""
+    print("\nTesting agent session pool...")
+    
+    class FakeAnswerer:
+        def __init__(self):
+            self.history = []
+        
+        def answer_question(self, question, on_token=None):
+            self.history.append(question)
+            return f"turn {len(self.history)}"
+    
+    pool = AgentSessionPool(factory=FakeAnswerer, max_sessions=2, max_concurrent=2,
+                            idle_timeout=60, spare_count=1, maintenance_interval=0.05)
+    
+    # Sessions are independent conversations
+    assert pool.session('a').answer_question("hi") == "turn 1"
+    assert pool.session('a').answer_question("again") == "turn 2"
+    assert pool.session('b').answer_question("hi") == "turn 1"
+    print("✓ Each session keeps its own conversation")
+    
+    # Least recently used session is evicted over capacity
+    pool.session('c').answer_question("hi")
+    stats = pool.stats()
+    assert stats['sessions'] == 2 and stats['evictions'] == 1
+    assert pool.session('a').answer_question("back") == "turn 1"
+    print("✓ LRU eviction over max_sessions")
+    
+    # New sessions reuse pre-warmed spares
+    deadline = time.time() + 2
+    while pool.stats()['spares'] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    pool.session('d').answer_question("hi")
+    assert pool.stats()['spare_hits'] >= 1
+    print("✓ Spare agents handed to new sessions")
+    
+    pool.close_session('d')
+    assert 'd' not in pool._sessions
+    pool.shutdown()
+    print("✓ Agent session pool working correctly")
+
+def test_conversation_memory():
+    """Test bounded conversation history"""
+    print("\nTesting conversation memory...")
+    
+    class FakeAgent:
+        system_prompt = "You are AI Buddy."
+        
+        def __init__(self):
+            self.messages = []
+    
+    def add_turn(agent, number, tool=False):
+        agent.messages.append({'role': 'user', 'content': [{'text': f"question {number}"}]})
+        if tool:
+            agent.messages.append({'role': 'assistant', 'content': [{'toolUse': {'name': 'current_time', 'toolUseId': str(number), 'input': {}}}]})
+            agent.messages.append({'role': 'user', 'content': [{'toolResult': {'toolUseId': str(number), 'content': [{'text': 'x' * 50}]}}]})
+        agent.messages.append({'role': 'assistant', 'content': [{'text': f"answer {number}"}]})
+    
+    manager = BoundedMemoryManager(max_turns=3, max_tokens=10000)
+    agent = FakeAgent()
+    for number in range(20):
+        add_turn(agent, number, tool=(number == 19))
+        manager.apply_management(agent)
+    
+    # Only the last 3 turns are kept; the newest turn keeps its tool call and result
+    prompts = [m for m in agent.messages if m['role'] == 'user' and any('text' in b for b in m['content'])]
+    assert len(prompts) == 3
+    assert any('toolResult' in block for m in agent.messages for block in m['content'])
+    assert agent.messages[0]['content'][0]['text'].startswith(SUMMARY_PREFIX)
+    assert "question 16" in agent.messages[0]['content'][0]['text']
+    print("✓ History capped by turns with older turns summarized")
+    
+    # Prompt size stays flat instead of growing with uptime
+    stats = manager.stats()
+    assert stats['turns_recorded'] == 20
+    assert stats['prompt_tokens_last'] <= stats['prompt_tokens_max'] < 400
+    
+    # Token budget also trims
+    small = BoundedMemoryManager(max_turns=50, max_tokens=120, summary_chars=100)
+    agent = FakeAgent()
+    for number in range(20):
+        add_turn(agent, number)
+        small.apply_management(agent)
+    assert small.stats()['prompt_tokens_last'] <= 120
+    print("✓ History capped by estimated tokens")
+    
+    print("✓ Conversation memory working correctly")
+
+def test_speech_pipeline():
+    """Test overlapped capture and recognition"""
+    print("\nTesting speech pipeline...")
+    
+    class FakeEngine:
+        def __init__(self, phrases):
+            self.phrases = list(phrases)
+        
+        def capture(self):
+            if not self.phrases:
+                time.sleep(0.01)
+                raise sr.WaitTimeoutError("no speech")
+            return self.phrases.pop(0)
+        
+        def recognize(self, audio):
+            # Earlier phrases take longer, so workers finish out of order
+            delay, text = audio
+            time.sleep(delay)
+            return text
+    
+    engine = FakeEngine([(0.15, "first"), (0.1, ""), (0.05, "second"), (0.0, "third")])
+    pipeline = SpeechPipeline(engine, buffer_size=8, recognizers=4)
+    pipeline.start()
+    results = []
+    for text in pipeline.results():
+        results.append(text)
+        if len(results) == 3:
+            pipeline.stop()
+    assert results == ["first", "second", "third"]
+    assert pipeline.stats()['captured'] == 4 and pipeline.stats()['recognized'] == 3
+    print("✓ Results come out in spoken order, empty phrases skipped")
+    
+    # With no recognizer keeping up, the ring buffer drops the oldest phrases
+    engine = FakeEngine([(0, "a"), (0, "b"), (0, "c")])
+    pipeline = SpeechPipeline(engine, buffer_size=1, recognizers=0)
+    pipeline.start()
+    deadline = time.time() + 2
+    while pipeline.stats()['captured'] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    pipeline.stop()
+    assert pipeline.stats()['dropped'] == 2 and pipeline.stats()['buffered'] == 1
+    print("✓ Oldest phrases dropped when the buffer is full")
+    
+    # Phrases recorded while the assistant talks are its own echo
+    class SpeakingEngine(FakeEngine):
+        speaking_until = time.time() + 0.2
+        
+        def is_speaking(self):
+            return False
+        
+        def spoke_since(self, timestamp):
+            return timestamp < self.speaking_until
+    
+    engine = SpeakingEngine([(0, "echo"), (0, "echo")])
+    pipeline = SpeechPipeline(engine, buffer_size=8, recognizers=1)
+    pipeline.start()
+    time.sleep(0.25)
+    engine.phrases.append((0, "user"))
+    results = []
+    for text in pipeline.results():
+        results.append(text)
+        pipeline.stop()
+    assert results == ["user"] and pipeline.stats()['echo_dropped'] == 2
+    print("✓ Phrases captured during playback are discarded")
+    
+    print("✓ Speech pipeline working correctly")
+
+def test_stt_backends():
+    """Test speech-to-text backend fallback and real-time factor"""
+    print("\nTesting speech-to-text backends...")
+    
+    # One second of silence as a WAV fixture
+    path = os.path.join(tempfile.mkdtemp(), 'fixture.wav')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b'\x00\x00' * 16000)
+    with sr.AudioFile(path) as source:
+        audio = sr.Recognizer().record(source)
+    assert abs(audio_duration(audio) - 1.0) < 0.01
+    
+    class BrokenBackend(STTBackend):
+        name = "broken"
+        def _transcribe(self, audio):
+            raise sr.RequestError("engine down")
+    
+    class EchoBackend(STTBackend):
+        name = "echo"
+        def _transcribe(self, audio):
+            time.sleep(0.01)
+            return "hello"
+    
+    class DeafBackend(STTBackend):
+        name = "deaf"
+        def _transcribe(self, audio):
+            raise sr.UnknownValueError()
+    
+    chain = FallbackRecognizer([BrokenBackend(), EchoBackend()])
+    assert chain.transcribe(audio) == "hello"
+    stats = chain.stats()
+    assert stats['fallbacks'] == 1
+    assert stats['backends'][0]['failures'] == 1
+    assert 0.0 < stats['backends'][1]['rtf_mean'] < 1.0
+    print("✓ Falls back to the next backend and records real-time factor")
+    
+    # Unintelligible speech is final, not retried on another backend
+    chain = FallbackRecognizer([DeafBackend(), EchoBackend()])
+    try:
+        chain.transcribe(audio)
+        assert False, "expected UnknownValueError"
+    except sr.UnknownValueError:
+        pass
+    assert chain.stats()['backends'][1]['calls'] == 0
+    print("✓ Unintelligible audio does not fall through")
+    
+    # Unknown backends are skipped, leaving the cloud fallback
+    chain = build_recognizer('nonexistent', 'google', sr.Recognizer())
+    assert chain.name == "google"
+    print("✓ Speech-to-text backends working correctly")
+
+def test_speech_cache():
+    """Test the synthesized speech cache"""
+    print("\nTesting speech cache...")
+    
+    directory = tempfile.mkdtemp()
+    rendered = []
+    
+    def renderer(text, path):
+        rendered.append(text)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+    
+    # Key covers text, voice and rate
+    assert speech_key("Hello  there", "v1", 200) == speech_key("Hello there", "v1", 200)
+    assert speech_key("Hello there", "v1", 200) != speech_key("Hello there", "v2", 200)
+    assert speech_key("Hello there", "v1", 200) != speech_key("Hello there", "v1", 150)
+    print("✓ Content address from text + voice + rate")
+    
+    cache = SpeechCache(directory, max_bytes=250, max_text_chars=50)
+    assert cache.prerender(["Goodbye!", "Opening Chrome"], "v1", 200, renderer) == 2
+    assert cache.get("Goodbye!", "v1", 200) is not None
+    assert cache.get("Goodbye!", "v2", 200) is None
+    assert not cache.is_cacheable("x" * 51)
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+    assert stats['seconds_saved'] >= 0
+    print("✓ Pre-rendered phrases served from cache")
+    
+    # Third phrase exceeds the quota; least recently used ("Opening Chrome") is deleted
+    cache.render("Playing music", "v1", 200, renderer)
+    assert cache.get("Opening Chrome", "v1", 200) is None
+    assert cache.get("Goodbye!", "v1", 200) is not None
+    assert cache.stats()['evictions'] == 1 and cache.stats()['bytes'] <= 250
+    print("✓ LRU disk quota enforced")
+    
+    # A new process adopts what is already on disk
+    reopened = SpeechCache(directory, max_bytes=250)
+    assert reopened.prerender(["Goodbye!", "Playing music"], "v1", 200, renderer) == 0
+    assert rendered == ["Goodbye!", "Opening Chrome", "Playing music"]
+    print("✓ Speech cache working correctly")
+
+def test_tts_scheduler():
+    """Test the prioritized speech queue"""
+    print("\nTesting TTS scheduler...")
+    
+    stops = []
+    scheduler = TTSScheduler(max_depth=3, stop_speaking=lambda: stops.append(True))
+    
+    # System speech first, then responses in arrival order; duplicates coalesced
+    scheduler.put("first answer", group="a")
+    scheduler.put("second answer", group="a")
+    assert not scheduler.put("First  answer", group="a")
+    scheduler.put("Goodbye!", priority=SpeechPriority.SYSTEM)
+    assert scheduler.get(timeout=0) == "Goodbye!"
+    scheduler.task_done()
+    assert scheduler.get(timeout=0) == "first answer"
+    scheduler.task_done()
+    assert scheduler.stats()['coalesced'] == 1 and scheduler.stats()['spoken'] == 2
+    print("✓ Priority order and coalescing")
+    
+    # Bounded depth drops the oldest response
+    scheduler.put("third answer", group="a")
+    scheduler.put("fourth answer", group="a")
+    scheduler.put("fifth answer", group="a")
+    assert scheduler.depth() == 3 and scheduler.stats()['dropped'] == 1
+    assert scheduler.get(timeout=0) == "third answer"
+    print("✓ Oldest response dropped beyond max depth")
+    
+    # A newer answer cuts off the one playing and discards the rest of the old one
+    scheduler.put("System notice", priority=SpeechPriority.SYSTEM)
+    assert scheduler.barge_in(keep_group="b") == 2
+    assert stops == [True]
+    scheduler.task_done()
+    scheduler.put("new answer", group="b")
+    assert scheduler.get(timeout=0) == "System notice"
+    assert scheduler.get(timeout=0) == "new answer"
+    assert scheduler.get(timeout=0) is None
+    stats = scheduler.stats()
+    assert stats['interrupted'] == 1 and stats['cancelled'] == 2
+    
+    # wake() releases a waiting speaker without an utterance
+    threading.Timer(0.05, scheduler.wake).start()
+    started = time.time()
+    assert scheduler.get_utterance(timeout=5) is None and time.time() - started < 2
+    
+    # A barge-in between dequeuing and speaking is not lost
+    scheduler.put("late answer", group="c")
+    utterance = scheduler.get_utterance(timeout=0)
+    assert scheduler.is_current(utterance)
+    scheduler.barge_in(keep_group="d")
+    assert not scheduler.is_current(utterance) and len(stops) == 2
+    scheduler.task_done()
+    print("✓ TTS scheduler working correctly")
+
+def test_audio_streamer():
+    """Test streaming synthesized speech to clients"""
+    print("\nTesting audio streamer...")
+    
+    # mu-law halves the size and stays close to the original samples
+    samples = [0, 100, -100, 1000, -1000, 12000, -32768, 32767]
+    pcm = array('h', samples).tobytes()
+    encoded = encode_mulaw(pcm)
+    assert len(encoded) == len(samples)
+    for original, decoded in zip(samples, decode_mulaw(encoded)):
+        assert abs(original - decoded) <= max(16, abs(original) // 16)
+    print("✓ mu-law round trip")
+    
+    def synthesize(text):
+        # 0.5 s of 16 kHz mono audio in a temporary file
+        handle, path = tempfile.mkstemp(suffix='.wav')
+        os.close(handle)
+        with wave.open(path, 'wb') as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(b'\x10\x00' * 8000)
+        return path, True
+    
+    events = []
+    streamer = AudioStreamer(synthesize, lambda event, payload, target: events.append((event, payload, target)),
+                             encoding='mulaw', chunk_ms=100)
+    assert streamer.stream("Hello there.", target='sid-1', group='req-1')
+    names = [event for event, _, _ in events]
+    assert names == ['tts_audio_start'] + ['tts_audio_chunk'] * 5 + ['tts_audio_end']
+    assert all(target == 'sid-1' for _, _, target in events)
+    assert events[0][1]['sample_rate'] == 16000 and events[0][1]['encoding'] == 'mulaw'
+    assert isinstance(events[1][1]['data'], bytes) and len(events[1][1]['data']) == 1600
+    print("✓ Utterance sent as start, binary chunks, end")
+    
+    # A newer answer for another client leaves this one alone; barge-in for this client stops it
+    assert streamer.stop(keep_group='req-2', target='sid-2') == 0
+    assert streamer.stop(keep_group='req-2', target='sid-1') == 1
+    assert events[-1][0] == 'tts_audio_stop' and events[-1][2] == 'sid-1'
+    assert streamer.stats()['utterances'] == 1 and streamer.stats()['bytes_sent'] == 8000
+    print("✓ Audio streamer working correctly")
+
+def test_lazy_component():
+    """Test build-on-first-use components"""
+    print("\nTesting lazy components...")
+    
+    attempts = []
+    
+    def factory():
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise OSError("no audio device")
+        return "engine"
+    
+    component = LazyComponent('speech_engine', factory)
+    assert not component.ready and attempts == []
+    print("✓ Nothing built until first use")
+    
+    try:
+        component.get()
+        assert False, "expected OSError"
+    except OSError:
+        pass
+    assert component.status()['error'] == "no audio device" and not component.ready
+    
+    # Failed builds are retried; successful ones happen once, even with concurrent callers
+    threads = [threading.Thread(target=component.get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert component.get() == "engine" and len(attempts) == 2
+    status = component.status()
+    assert status['ready'] and status['error'] is None and status['build_seconds'] >= 0
+    print("✓ Lazy components working correctly")
+
+def test_scale_out():
+    """Test state shared between worker processes"""
+    print("\nTesting scale-out state...")
+    
+    class FakeAnswerer:
+        def __init__(self):
+            self.messages = []
+        
+        def answer_question(self, question, on_token=None):
+            self.messages.append({'role': 'user', 'content': [{'text': question}]})
+            return f"turn {len(self.messages)}"
+        
+        def history(self):
+            return list(self.messages)
+        
+        def load_history(self, messages):
+            self.messages = list(messages)
+    
+    # Two pools stand in for two workers sharing one store
+    store = MemorySessionStore()
+    worker_a = AgentSessionPool(factory=FakeAnswerer, spare_count=0, store=store)
+    worker_b = AgentSessionPool(factory=FakeAnswerer, spare_count=0, store=store)
+    assert worker_a.answer_question('s', "hi") == "turn 1"
+    assert worker_a.answer_question('s', "again") == "turn 2"
+    assert worker_b.answer_question('s', "third") == "turn 3"
+    assert worker_a.answer_question('s', "fourth") == "turn 4"
+    assert worker_a.stats()['reloads'] == 1 and worker_b.stats()['reloads'] == 1
+    assert store.load_session('s')['version'] == 4
+    worker_b.close_session('s')
+    assert store.load_session('s') is None
+    worker_a.shutdown()
+    worker_b.shutdown()
+    print("✓ Conversations continue on whichever worker gets the turn")
+    
+    # Bytes (e.g. images in tool results) survive serialization
+    store.save_session('img', [{'role': 'user', 'content': [{'image': {'source': {'bytes': b'\x89PNG'}}}]}])
+    assert store.load_session('img')['messages'][0]['content'][0]['image']['source']['bytes'] == b'\x89PNG'
+    store.put_job({'request_id': 'job1', 'status': 'completed', 'result': 'ok'})
+    assert store.get_job('job1')['result'] == 'ok' and store.get_job('missing') is None
+    store.add_client('sid1')
+    assert store.has_client('sid1')
+    store.remove_client('sid1')
+    assert not store.has_client('sid1')
+    print("✓ Job status and connected clients shared")
+    
+    # Broadcasts from one Socket.IO server reach the others through the message queue
+    channel = uuid.uuid4().hex
+    servers = [socketio.Server(client_manager=LocalPubSubManager(channel=channel), async_mode='threading')
+               for _ in range(2)]
+    received = []
+    servers[1].manager._handle_emit = received.append
+    for server in servers:
+        server.manager_initialized = True
+        server.manager.initialize()
+    time.sleep(0.05)
+    servers[0].emit('status', {'listening': True})
+    servers[0].emit('tts_audio_chunk', {'data': b'\x00\x01'}, to='sid1')
+    deadline = time.time() + 2
+    while len(received) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert [message['event'] for message in received] == ['status', 'tts_audio_chunk']
+    assert received[1]['room'] == 'sid1' and received[1]['binary']
+    print("✓ Scale-out state working correctly")
+
+def test_socket_rooms():
+    """Test session-scoped event routing"""
+    print("\nTesting socket rooms...")
+    
+    assert session_rooms('sid1') == ['sid1', OBSERVER_ROOM]
+    assert session_rooms(None) == [VOICE_ROOM, OBSERVER_ROOM]
+    print("✓ Events go to their session and observers only")
+    
+    # Recipients are counted once even when they are in several target rooms
+    manager = socketio.Manager()
+    manager.set_server(socketio.Server(async_mode='threading'))
+    manager.initialize()
+    sids = [manager.connect(f'eio{index}', '/') for index in range(3)]
+    manager.enter_room(sids[0], '/', OBSERVER_ROOM)
+    assert FanoutCounter.count(manager, session_rooms(sids[0])) == 1
+    assert FanoutCounter.count(manager, session_rooms(sids[1])) == 2
+    assert FanoutCounter.count(manager, None) == 3
+    assert FanoutCounter.count(manager, []) == 0
+    
+    fanout = FanoutCounter()
+    fanout.record('assistant_message', 2)
+    fanout.record('assistant_message', 1)
+    fanout.record('status', 0)
+    stats = fanout.stats()
+    assert stats['assistant_message'] == {'emits': 2, 'recipients': 3, 'fanout_mean': 1.5, 'fanout_max': 2}
+    assert stats['status']['fanout_max'] == 0
+    print("✓ Socket rooms working correctly")
+
+def test_status_publisher():
+    """Test debounced status events"""
+    print("\nTesting status publisher...")
+    
+    published = []
+    status = StatusPublisher(published.append, debounce_seconds=0.05, initial={'listening': False})
+    
+    def settle():
+        time.sleep(0.2)
+    
+    status.update(listening=True)
+    assert status.snapshot() == {'listening': True} and published == []
+    settle()
+    assert published == [{'listening': True}]
+    print("✓ Changes are published once they settle")
+    
+    # Capture timeouts flip listening off and straight back on: nothing to publish
+    for _ in range(50):
+        status.update(listening=False)
+        status.update(listening=True)
+    settle()
+    assert published == [{'listening': True}]
+    assert status.stats()['suppressed'] == 100
+    print("✓ Flapping within the window produces no events")
+    
+    status.update(listening=False)
+    status.stop()
+    assert published[-1] == {'listening': False} and len(published) == 2
+    
+    immediate = []
+    status = StatusPublisher(immediate.append, debounce_seconds=0)
+    status.update(listening=True)
+    status.update(listening=True)
+    assert immediate == [{'listening': True}]
+    print("✓ Status publisher working correctly")
+
+def test_metrics():
+    """Test Prometheus metrics rendering"""
+    print("\nTesting metrics...")
+    
+    registry = Registry()
+    latency = Histogram('voice_stage_duration_seconds', 'Stage latency', ['stage'], buckets=(0.1, 1.0),
+                        registry=registry)
+    errors = Counter('voice_stage_errors_total', 'Stage errors', ['stage'], registry=registry)
+    depth = []
+    Gauge('voice_tts_queue_depth', 'Queued utterances', callback=lambda: len(depth), registry=registry)
+    
+    latency.observe(0.05, stage='stt_google')
+    latency.observe(0.5, stage='stt_google')
+    latency.observe(3, stage='stt_google')
+    with latency.time(stage='agent'):
+        pass
+    errors.inc(stage='agent')
+    depth.extend([1, 2])
+    assert latency.count(stage='stt_google') == 3 and errors.value(stage='agent') == 1
+    
+    text = registry.render()
+    assert '# TYPE voice_stage_duration_seconds histogram' in text
+    assert 'voice_stage_duration_seconds_bucket{stage="stt_google",le="0.1"} 1' in text
+    assert 'voice_stage_duration_seconds_bucket{stage="stt_google",le="1.0"} 2' in text
+    assert 'voice_stage_duration_seconds_bucket{stage="stt_google",le="+Inf"} 3' in text
+    assert 'voice_stage_duration_seconds_count{stage="stt_google"} 3' in text
+    assert 'voice_stage_errors_total{stage="agent"} 1' in text
+    assert 'voice_tts_queue_depth 2' in text
+    print("✓ Histograms are cumulative per label set")
+    
+    try:
+        errors.inc(tool='x')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✓ Metrics working correctly")
+
+def test_tracing():
+    """Test per-turn trace spans and the trace report"""
+    print("\nTesting tracing...")
+    
+    tracer = Tracer()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'traces.jsonl')
+        tracer.configure(path, max_bytes=1024 * 1024, backup_count=1)
+        
+        with tracer.span('warm-up'):
+            pass  # outside a turn: nothing is written
+        now = time.time()
+        tracer.record('stt', now - 0.3, now - 0.1, trace_id='turn-1')
+        with tracer.span('turn', trace_id='turn-1'):
+            assert current_trace_id() == 'turn-1'
+            with tracer.span('agent') as span:
+                span['cache_hit'] = False
+                with tracer.span('tool:get_time'):
+                    time.sleep(0.01)
+                tracer.event('first_token')
+        try:
+            with tracer.span('turn', trace_id='turn-2'):
+                raise RuntimeError("agent down")
+        except RuntimeError:
+            pass
+        assert current_trace_id() is None
+        tracer.configure(None)
+        
+        traces = group_traces(load_spans(path))
+        assert sorted(traces) == ['turn-1', 'turn-2']
+        spans = {span['name']: span for span in traces['turn-1']}
+        assert spans['agent']['parent_id'] == spans['turn']['span_id']
+        assert spans['tool:get_time']['parent_id'] == spans['agent']['span_id']
+        assert spans['agent']['cache_hit'] is False
+        assert traces['turn-2'][0]['status'] == 'error'
+        print("✓ Spans share the turn's id and nest under their parent")
+        
+        path_names = [span['name'] for _, span in critical_path(traces['turn-1'])]
+        assert path_names == ['stt', 'turn', 'agent', 'tool:get_time']
+        stats = stage_percentiles(traces)
+        assert stats['tool:get_time']['count'] == 1 and stats['tool:get_time']['p50'] >= 10
+        assert '@first_token' in stats
+        print("✓ Trace report finds the critical path and per-stage percentiles")
+
+def test_log_pipeline():
+    """Test queued, sampled and truncated logging"""
+    print("\nTesting log pipeline...")
+    
+    assert parse_sample_rates("ui_manager=0.1, speech_engine=2,bad") == {'ui_manager': 0.1, 'speech_engine': 1.0}
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'app.log')
+        pipeline = AsyncLogging(path, max_bytes=2000, backup_count=2, sample_rates={'test_log.chatty': 0.25},
+                                max_message_chars=50, console=False)
+        target = logging.getLogger('test_log')
+        target.propagate = False
+        pipeline.install(target)
+        chatty = logging.getLogger('test_log.chatty')
+        for i in range(8):
+            chatty.info(f"line {i}")
+        chatty.warning("never sampled")
+        logging.getLogger('test_log.agent').info("Agent response: " + "x" * 500)
+        for i in range(40):
+            target.info(f"filler {i}")
+        pipeline.stop()
+        
+        stats = pipeline.stats()
+        assert stats['sampled_out'] == 6 and stats['truncated'] == 1 and stats['dropped'] == 0
+        assert os.path.exists(path + '.1') and not os.path.exists(path + '.3')
+        lines = []
+        for name in (path + '.2', path + '.1', path):
+            if os.path.exists(name):
+                with open(name) as handle:
+                    lines.extend(handle.read().splitlines())
+        assert [line.split(' - ')[-1] for line in lines[:3]] == ['line 0', 'line 4', 'never sampled']
+        assert lines[3].endswith('... [466 more chars]')
+        print("✓ Chatty loggers are sampled, long lines truncated, the file rotates")
+    
+    print("✓ Log pipeline working correctly")
+
+def test_app_index():
+    """Test the persistent, incrementally refreshed application index"""
+    print("\nTesting app index...")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        bin_dir = os.path.join(directory, 'bin')
+        apps_dir = os.path.join(directory, 'applications')
+        programs = os.path.join(directory, 'Programs')
+        for folder in (bin_dir, apps_dir, os.path.join(programs, 'Vendor', 'Tool')):
+            os.makedirs(folder)
+        for name in ('firefox', 'uninstall-helper'):
+            with open(os.path.join(bin_dir, name), 'w') as handle:
+                handle.write('#!/bin/sh\n')
+            os.chmod(os.path.join(bin_dir, name), 0o755)
+        with open(os.path.join(apps_dir, 'org.gnome.Calculator.desktop'), 'w') as handle:
+            handle.write("[Desktop Entry]\nName=Calculator\nExec=gnome-calculator %U\n"
+                         "[Desktop Action new]\nName=New\nExec=ignored\n")
+        with open(os.path.join(programs, 'Vendor', 'Tool', 'Tool.exe'), 'w') as handle:
+            handle.write('')
+        roots = [(apps_dir, 'desktop', 1), (bin_dir, 'path', 0), (programs, 'exe', 3)]
+        cache = os.path.join(directory, 'index.json')
+        
+        index = AppIndex(cache, roots=roots)
+        index.start()
+        assert index.ready.wait(5)
+        index._thread.join(5)
+        assert index.lookup('Calculator') == ['gnome-calculator']
+        assert index.lookup('calculator') == index.lookup('CALCULATOR')
+        assert index.lookup('firefox') == [os.path.join(bin_dir, 'firefox')]
+        assert index.lookup('tool') == [os.path.join(programs, 'Vendor', 'Tool', 'Tool.exe')]
+        assert index.lookup('uninstall helper') is None and index.lookup('missing') is None
+        print("✓ PATH executables, .desktop entries and nested .exe files are indexed")
+        
+        # A new process serves lookups from disk and only rescans the directory that changed
+        reloaded = AppIndex(cache, roots=roots)
+        assert reloaded.load() and reloaded.lookup('firefox') == index.lookup('firefox')
+        assert reloaded.refresh()['scanned'] == 0
+        with open(os.path.join(bin_dir, 'spotify'), 'w') as handle:
+            handle.write('')
+        os.chmod(os.path.join(bin_dir, 'spotify'), 0o755)
+        os.utime(bin_dir, (1, 1))
+        result = reloaded.refresh()
+        assert result['scanned'] == 1 and result['skipped'] == 4
+        assert reloaded.lookup('spotify') == [os.path.join(bin_dir, 'spotify')]
+        print("✓ Saved index reloads and refreshes only changed directories")
+    
+    print("✓ App index working correctly")
+
+def test_app_resolver():
+    """Test fuzzy application names through the trigram resolver"""
+    print("\nTesting app resolver...")
+    
+    resolver = AppResolver(threshold=0.5)
+    match = resolver.resolve("Spotify app")
+    assert match.name == 'spotify' and match.score == 1.0 and match.executable == 'spotify.exe'
+    match = resolver.resolve("visual code")
+    assert match.name == 'visual studio code' and match.executable == 'code.exe' and match.score >= 0.5
+    assert resolver.resolve("ms word").executable == 'winword.exe'
+    assert resolver.resolve("notpad").name == 'notepad'
+    match = resolver.resolve("xylophone studio")
+    assert match.score < 0.5 and resolver.stats()['clarifications'] == 1
+    print("✓ Misheard and decorated names resolve to the right alias; poor matches ask to clarify")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        index = AppIndex(None, roots=[(directory, 'path', 0)])
+        resolver = AppResolver(index=index)
+        assert resolver.resolve("obsidian").score < 0.5
+        path = os.path.join(directory, 'obsidian')
+        with open(path, 'w') as handle:
+            handle.write('')
+        os.chmod(path, 0o755)
+        index.refresh()
+        match = resolver.resolve("obsidan")
+        assert match.name == 'obsidian' and match.command == [path]
+        print("✓ Resolver picks up applications discovered by the index")
+    
+    # Without an indexed command the resolved name is launched, not the name as heard
+    import action_executors
+    launched = []
+    popen = action_executors.subprocess.Popen
+    launcher = action_executors.AppLauncher(resolver=AppResolver())
+    try:
+        action_executors.subprocess.Popen = launched.append
+        for system in ("Darwin", "Linux"):
+            launcher.system = system
+            assert launcher.launch_application("visual code") == (True, "Opening visual code")
+    finally:
+        action_executors.subprocess.Popen = popen
+    assert launched == [["open", "-a", "visual studio code"], ["code"]]
+    print("✓ Launcher falls back to the resolved application")
+    
+    print("✓ App resolver working correctly")
+
+def test_screenshot_encoder():
+    """Test off-thread screenshot encoding with an injected image source"""
+    print("\nTesting screenshot encoder...")
+    from PIL import Image
+    
+    grabs = []
+    def grab(region, all_screens):
+        grabs.append((region, all_screens))
+        return Image.linear_gradient('L').resize((640, 480)).convert('RGB')
+    
+    assert parse_region("0, 0, 1920, 1080") == (0, 0, 1920, 1080)
+    assert parse_region("10,10,5,5") is None and parse_region("") is None
+    
+    with tempfile.TemporaryDirectory() as directory:
+        encoder = ScreenshotEncoder(grab=grab, directory=directory, region=(0, 0, 640, 480))
+        try:
+            path, future = encoder.capture("my_photo")
+            assert path == os.path.join(directory, 'my_photo.png') and encoder.stats()['captured'] == 1
+            result = future.result(timeout=30)
+            assert result['path'] == path and (result['width'], result['height']) == (640, 480)
+            with Image.open(path) as image:
+                assert image.format == 'PNG' and image.size == (640, 480)
+            print("✓ Frame is grabbed on the caller, encoded in a worker process")
+            
+            path, future = encoder.capture("vacation.png", image_format='jpeg', scale=0.5, all_screens=False,
+                                           region=(0, 0, 320, 240))
+            assert path.endswith('vacation.jpg') and future.result(timeout=30)['width'] == 320
+            path, future = encoder.capture(None, image_format='webp', scale=0.75, quality=50)
+            with Image.open(future.result(timeout=30)['path']) as image:
+                assert image.format == 'WEBP' and image.size == (480, 360)
+            assert grabs == [((0, 0, 640, 480), True), ((0, 0, 320, 240), False), ((0, 0, 640, 480), True)]
+            assert not any(name.endswith('.part') for name in os.listdir(directory))
+            print("✓ JPEG/WebP quality, downscaling and region/monitor options")
+        finally:
+            encoder.shutdown()
+        assert encoder.stats()['encoded'] == 3 and encoder.stats()['pending'] == 0
+        
+        # The tool only claims the file is saved once the encode has finished, and reports failures
+        import action_executors
+        shared = action_executors.default_encoder
+        try:
+            action_executors.default_encoder = lambda: ScreenshotEncoder(grab=grab, directory=directory,
+                                                                         use_processes=False)
+            assert action_executors.take_screenshot("done") == \
+                f"Screenshot saved at {os.path.join(directory, 'done.png')}"
+            action_executors.default_encoder = lambda: ScreenshotEncoder(grab=lambda region, all_screens: None,
+                                                                         directory=directory, use_processes=False)
+            assert action_executors.take_screenshot("broken").startswith("Sorry, couldn't save screenshot")
+        finally:
+            action_executors.default_encoder = shared
+        print("✓ take_screenshot reports the encode's outcome")
+    
+    print("✓ Screenshot encoder working correctly")
+
 if __name__ == "__main__":
     try:
         test_models()
         test_command_processor()
+        test_job_executor()
+        test_sentence_buffer()
+        test_response_cache()
+        test_command_router()
+        test_session_pool()
+        test_conversation_memory()
+        test_speech_pipeline()
+        test_stt_backends()
+        test_speech_cache()
+        test_tts_scheduler()
+        test_audio_streamer()
+        test_lazy_component()
+        test_scale_out()
+        test_socket_rooms()
+        test_status_publisher()
+        test_metrics()
+        test_tracing()
+        test_log_pipeline()
+        test_app_index()
+        test_app_resolver()
+        test_screenshot_encoder()
         print("\n✅ All basic tests passed!")
     except AssertionError as e:
         print(f"\n❌ Test failed: {e}")
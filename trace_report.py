@@ -0,0 +1,184 @@
+"""
+Trace Report - Critical path and per-stage percentiles from the JSONL trace file
+
+Reads the spans written by tracing.py (the file and its rotated backups) and prints
+where the slowest turn (or the turn given with --trace) spent its time, followed by
+p50/p95/p99 per stage across every turn in the file.
+
+Run: python trace_report.py voice_traces.jsonl [--trace <request id>]
+"""
+import argparse
+import json
+import math
+import os
+from collections import defaultdict
+
+
+def load_spans(path: str, backups: int = 9) -> list:
+    """
+    Reads spans from a trace file and its rotated backups (path.1, path.2, ...)
+
+    Args:
+        path: The current trace file
+        backups: Highest backup suffix to look for
+
+    Returns:
+        list: Span dicts, oldest file first; unreadable lines are skipped
+    """
+    files = [f"{path}.{index}" for index in range(backups, 0, -1)] + [path]
+    spans = []
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as handle:
+            for line in handle:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(span, dict) and 'trace_id' in span and 'start' in span:
+                    spans.append(span)
+    return spans
+
+
+def group_traces(spans: list) -> dict:
+    """Groups spans by trace (request) id"""
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span['trace_id']].append(span)
+    return dict(traces)
+
+
+def _end(span: dict) -> float:
+    return span['start'] + span['duration_ms'] / 1000
+
+
+def trace_duration_ms(spans: list) -> float:
+    """Wall time from the first span's start to the last span's end"""
+    return (max(_end(span) for span in spans) - min(span['start'] for span in spans)) * 1000
+
+
+def critical_path(spans: list) -> list:
+    """
+    Finds the chain of spans that determined when the turn finished
+
+    Walks back from the span that ended last: at each level the latest-ending span
+    that started before the current point is on the path, then the walk continues
+    from its start. Children are walked the same way, so the path shows nested
+    stages (e.g. agent > tool:take_screenshot). Zero-length events are left out.
+
+    Args:
+        spans: Spans of one trace
+
+    Returns:
+        list: (depth, span) pairs in chronological order
+    """
+    ids = {span['span_id'] for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span['duration_ms'] <= 0:
+            continue
+        if span.get('parent_id') in ids:
+            children[span['parent_id']].append(span)
+        else:
+            roots.append(span)
+    return _walk(roots, children, 0)
+
+
+def _walk(candidates: list, children: dict, depth: int) -> list:
+    blocks = []
+    remaining = list(candidates)
+    cursor = math.inf
+    while True:
+        before = [span for span in remaining if span['start'] < cursor]
+        if not before:
+            break
+        span = max(before, key=_end)
+        remaining.remove(span)
+        blocks.append([(depth, span)] + _walk(children[span['span_id']], children, depth + 1))
+        cursor = span['start']
+    return [step for block in reversed(blocks) for step in block]
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def stage_percentiles(traces: dict) -> dict:
+    """
+    Latency percentiles per span name across all traces
+
+    Zero-length events (first_token, emit:*) are reported as their offset from the
+    start of the turn, prefixed with '@', e.g. '@first_token' is time to first token.
+
+    Returns:
+        dict: name -> {'count', 'p50', 'p95', 'p99'} in milliseconds
+    """
+    samples = defaultdict(list)
+    for spans in traces.values():
+        first = min(span['start'] for span in spans)
+        samples['(turn total)'].append(trace_duration_ms(spans))
+        for span in spans:
+            if span['duration_ms'] > 0:
+                samples[span['name']].append(span['duration_ms'])
+            else:
+                samples['@' + span['name']].append((span['start'] - first) * 1000)
+    return {
+        name: {
+            'count': len(values),
+            'p50': percentile(values, 0.50),
+            'p95': percentile(values, 0.95),
+            'p99': percentile(values, 0.99),
+        }
+        for name, values in sorted(samples.items())
+    }
+
+
+def format_critical_path(trace_id: str, spans: list) -> list:
+    """Lines describing one trace's critical path"""
+    first = min(span['start'] for span in spans)
+    lines = [f"Critical path of {trace_id} ({trace_duration_ms(spans):.1f} ms, {len(spans)} spans)",
+             f"  {'start ms':>9} {'duration ms':>12}  stage"]
+    for depth, span in critical_path(spans):
+        status = '' if span.get('status', 'ok') == 'ok' else f"  [{span.get('error', 'error')}]"
+        lines.append(f"  {(span['start'] - first) * 1000:9.1f} {span['duration_ms']:12.1f}  "
+                     f"{'  ' * depth}{span['name']}{status}")
+    return lines
+
+
+def format_percentiles(stats: dict) -> list:
+    """Lines of the per-stage percentile table"""
+    width = max([len(name) for name in stats] + [5])
+    lines = [f"{'stage':<{width}} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+    for name, row in stats.items():
+        lines.append(f"{name:<{width}} {row['count']:6d} {row['p50']:9.1f} {row['p95']:9.1f} {row['p99']:9.1f}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', nargs='?', default=os.environ.get('TRACE_FILE', 'voice_traces.jsonl'),
+                        help='Trace file (rotated backups next to it are read too)')
+    parser.add_argument('--trace', help='Request id whose critical path is shown (default: the slowest turn)')
+    args = parser.parse_args()
+
+    traces = group_traces(load_spans(args.path))
+    if not traces:
+        print(f"No spans found in {args.path}")
+        return 1
+    trace_id = args.trace or max(traces, key=lambda key: trace_duration_ms(traces[key]))
+    if trace_id not in traces:
+        print(f"Trace {trace_id} not found in {args.path}")
+        return 1
+    print("\n".join(format_critical_path(trace_id, traces[trace_id])))
+    print()
+    print(f"Per-stage latency over {len(traces)} turns")
+    print("\n".join(format_percentiles(stage_percentiles(traces))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+"""
+Tracing - Per-turn correlation ids and timed spans written to a rotating JSONL file
+"""
+import json
+import atexit
+import queue
+import time
+import uuid
+import logging
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (trace id, span id) of the span the current code runs in; copied into agent tool threads
+_current = contextvars.ContextVar('voice_trace', default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    """Returns the correlation id of the turn being handled, or None outside a turn"""
+    context = _current.get()
+    return context[0] if context else None
+
+
+def current_context() -> Optional[Tuple[str, str]]:
+    """Returns (trace id, span id) so work handed to another thread can continue the trace"""
+    return _current.get()
+
+
+class Tracer:
+    """
+    Records spans as one JSON object per line
+
+    A span has trace_id (the correlation id of the turn), span_id, parent_id, name,
+    start (epoch seconds), duration_ms, thread and status/error, plus free attributes.
+    Spans are queued to a listener thread that owns a RotatingFileHandler, so a turn
+    never waits on the disk and the file never grows past max_bytes * (backup_count + 1).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._logger = logging.getLogger('voice_assistant.trace')
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._handler = None
+        self._listener = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def configure(self, path: Optional[str], max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3) -> None:
+        """
+        Starts (or with an empty path stops) writing spans
+
+        Args:
+            path: JSONL file the spans are appended to
+            max_bytes: Size at which the file is rotated
+            backup_count: Rotated files kept
+        """
+        with self._lock:
+            if self._handler is not None:
+                # Stopping the listener writes out the spans still queued
+                self._logger.removeHandler(self._handler)
+                self._listener.stop()
+                for handler in self._listener.handlers:
+                    handler.close()
+                self._handler = self._listener = None
+            self.enabled = False
+            if not path:
+                return
+            file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter('%(message)s'))
+            spans = queue.Queue()
+            self._handler = QueueHandler(spans)
+            self._listener = QueueListener(spans, file_handler)
+            self._listener.start()
+            self._logger.addHandler(self._handler)
+            self.enabled = True
+        logger.info(f"Writing trace spans to {path}")
+
+    def close(self) -> None:
+        """Writes out queued spans and stops tracing"""
+        self.configure(None)
+
+    @contextmanager
+    def span(self, name: str, trace_id: str = None, parent: Tuple[str, str] = None, **attributes):
+        """
+        Times the with-block as a span of the current (or given) trace
+
+        Args:
+            name: Stage name, e.g. 'agent' or 'tool:take_screenshot'
+            trace_id: Starts or joins this trace instead of the current one
+            parent: (trace id, span id) to continue, for work handed over from another thread
+            **attributes: Extra fields written with the span
+
+        Yields:
+            dict: The attributes, so the block can add fields (e.g. cache_hit)
+        """
+        context = parent or _current.get()
+        if not self.enabled or (trace_id is None and context is None):
+            # Tracing off, or not part of a turn (warm-up, background work)
+            yield attributes
+            return
+        trace_id = trace_id or context[0]
+        parent_id = context[1] if context and context[0] == trace_id else None
+        span_id = uuid.uuid4().hex[:16]
+        token = _current.set((trace_id, span_id))
+        start = time.time()
+        error = None
+        try:
+            yield attributes
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            self._write(name, trace_id, span_id, parent_id, start, time.time(), error, attributes)
+
+    def record(self, name: str, start: float, end: float, trace_id: str = None,
+               parent: Tuple[str, str] = None, **attributes) -> None:
+        """
+        Writes a span timed elsewhere (queue waits, capture before the turn had an id)
+
+        Args:
+            name: Stage name
+            start: Epoch seconds the stage began
+            end: Epoch seconds the stage ended
+            trace_id: Trace the span belongs to (default: the current one)
+            parent: (trace id, span id) of the parent span (default: the current span)
+            **attributes: Extra fields written with the span
+        """
+        if not self.enabled:
+            return
+        context = parent or _current.get()
+        trace_id = trace_id or (context[0] if context else None)
+        if trace_id is None:
+            return
+        parent_id = context[1] if context and context[0] == trace_id else None
+        self._write(name, trace_id, uuid.uuid4().hex[:16], parent_id, start, end, None, attributes)
+
+    def event(self, name: str, **attributes) -> None:
+        """Writes a zero-length span marking a moment of the current turn (e.g. first token)"""
+        now = time.time()
+        self.record(name, now, now, **attributes)
+
+    def traced(self, name: str = None):
+        """Decorator recording each call as a span of the current trace"""
+        def decorator(function):
+            span_name = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _write(self, name: str, trace_id: str, span_id: str, parent_id: Optional[str], start: float,
+               end: float, error: Optional[Exception], attributes: dict) -> None:
+        """Appends one span line"""
+        record = {
+            'trace_id': trace_id,
+            'span_id': span_id,
+            'parent_id': parent_id,
+            'name': name,
+            'start': round(start, 6),
+            'duration_ms': round((end - start) * 1000, 3),
+            'thread': threading.current_thread().name,
+            'status': 'error' if error is not None else 'ok',
+        }
+        if error is not None:
+            record['error'] = str(error)
+        record.update(attributes)
+        try:
+            self._logger.info(json.dumps(record, default=str))
+        except Exception as e:
+            logger.error(f"Could not write trace span: {e}")
+
+
+tracer = Tracer()
@@ -0,0 +1,216 @@
+"""
+TTS Scheduler - Bounded priority queue for speech with coalescing and barge-in
+"""
+import time
+import logging
+import threading
+from typing import Callable, Optional
+from models import SpeechPriority
+
+logger = logging.getLogger(__name__)
+
+
+class Utterance:
+    """One queued piece of text"""
+
+    def __init__(self, text: str, priority: SpeechPriority, group: Optional[str], sequence: int,
+                 target: Optional[str] = None, trace: Optional[tuple] = None):
+        self.text = text
+        self.priority = priority
+        self.group = group
+        self.sequence = sequence
+        self.target = target
+        # (trace id, span id) of the turn that produced the text, and when it was queued
+        self.trace = trace
+        self.enqueued_at = time.time()
+        self.key = (target, " ".join(text.lower().split()))
+
+
+class TTSScheduler:
+    """
+    Orders speech by priority, then arrival
+
+    Identical text already waiting is coalesced into one utterance. Beyond max_depth the
+    oldest utterance of the lowest priority is dropped. barge_in() discards queued
+    response speech and cuts off the utterance being spoken, so stale answers stop
+    as soon as the user speaks again or a newer answer arrives.
+    """
+
+    def __init__(self, max_depth: int = 16, stop_speaking: Callable[[], None] = None):
+        """
+        Initializes an empty scheduler
+
+        Args:
+            max_depth: Maximum number of utterances waiting to be spoken
+            stop_speaking: Cuts off the utterance currently playing
+        """
+        self.max_depth = max_depth
+        self.stop_speaking = stop_speaking
+        self._queue = []
+        self._current = None
+        self._woken = False
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self.submitted = 0
+        self.spoken = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.interrupted = 0
+        self.peak_depth = 0
+
+    def put(self, text: str, priority: SpeechPriority = SpeechPriority.RESPONSE, group: str = None,
+            target: str = None, trace: tuple = None) -> bool:
+        """
+        Queues text to be spoken
+
+        Args:
+            text: The text to speak
+            priority: SYSTEM speech goes ahead of responses and survives barge-in
+            group: Response the text belongs to (e.g. request id), used by barge_in
+            target: Client the audio is for when streaming to browsers (None for everyone)
+            trace: (trace id, span id) the speech spans are recorded under
+
+        Returns:
+            bool: False if the text was coalesced into an utterance already waiting
+        """
+        if not text or not text.strip():
+            return False
+        with self._condition:
+            self.submitted += 1
+            utterance = Utterance(text, priority, group, self._sequence, target, trace)
+            self._sequence += 1
+            if any(queued.key == utterance.key for queued in self._queue):
+                self.coalesced += 1
+                return False
+
+            self._queue.append(utterance)
+            while len(self._queue) > self.max_depth:
+                oldest = min(self._queue, key=lambda queued: (-queued.priority, queued.sequence))
+                self._queue.remove(oldest)
+                self.dropped += 1
+                logger.warning(f"TTS queue full, dropped: {oldest.text[:50]}")
+            self.peak_depth = max(self.peak_depth, len(self._queue))
+            self._condition.notify()
+            return True
+
+    def get(self, timeout: float = None) -> Optional[str]:
+        """
+        Takes the next text to speak and marks it as current
+
+        Args:
+            timeout: Seconds to wait for text
+
+        Returns:
+            str: The text, or None on timeout
+        """
+        utterance = self.get_utterance(timeout)
+        return utterance.text if utterance is not None else None
+
+    def get_utterance(self, timeout: float = None) -> Optional[Utterance]:
+        """
+        Like get(), but returns the utterance with its group and target
+
+        Args:
+            timeout: Seconds to wait for text
+
+        Returns:
+            Utterance: The next utterance, or None on timeout or wake()
+        """
+        with self._condition:
+            if not self._queue:
+                self._condition.wait_for(lambda: self._queue or self._woken, timeout=timeout)
+            self._woken = False
+            if not self._queue:
+                return None
+            utterance = min(self._queue, key=lambda queued: (queued.priority, queued.sequence))
+            self._queue.remove(utterance)
+            self._current = utterance
+            return utterance
+
+    def wake(self) -> None:
+        """Makes a waiting get_utterance() return None now, so the speaking thread can do other work"""
+        with self._condition:
+            self._woken = True
+            self._condition.notify_all()
+
+    def is_current(self, utterance: Utterance) -> bool:
+        """
+        Checks that an utterance taken with get_utterance() has not been barged in on since
+
+        Args:
+            utterance: The utterance about to be spoken
+
+        Returns:
+            bool: True if it should still be spoken
+        """
+        with self._condition:
+            return self._current is utterance
+
+    def task_done(self) -> None:
+        """Marks the current utterance as finished"""
+        with self._condition:
+            if self._current is not None:
+                self.spoken += 1
+            self._current = None
+
+    def barge_in(self, keep_group: str = None, target: str = None) -> int:
+        """
+        Discards queued responses and cuts off the one being spoken
+
+        System speech and speech belonging to keep_group are left alone.
+
+        Args:
+            keep_group: Group of the newer response that should keep playing
+            target: Only affect speech for this client (None affects all speech)
+
+        Returns:
+            int: Number of queued utterances discarded
+        """
+        def stale(utterance) -> bool:
+            return utterance.priority != SpeechPriority.SYSTEM \
+                and (keep_group is None or utterance.group != keep_group) \
+                and (target is None or utterance.target == target)
+
+        with self._condition:
+            kept = [utterance for utterance in self._queue if not stale(utterance)]
+            discarded = len(self._queue) - len(kept)
+            self._queue = kept
+            self.cancelled += discarded
+            interrupt = self._current is not None and stale(self._current)
+            if interrupt:
+                self.interrupted += 1
+                self._current = None
+                # Under the lock, so the speaker cannot reset its stop flag after this
+                if self.stop_speaking is not None:
+                    self.stop_speaking()
+
+        if discarded or interrupt:
+            logger.info(f"Barge-in: discarded {discarded} queued utterance(s), interrupted: {interrupt}")
+        return discarded
+
+    def depth(self) -> int:
+        """Returns the number of utterances waiting"""
+        with self._condition:
+            return len(self._queue)
+
+    def stats(self) -> dict:
+        """
+        Returns scheduler counters
+
+        Returns:
+            dict: Queue depth, peak depth and submitted/spoken/coalesced/dropped/cancelled/interrupted counts
+        """
+        with self._condition:
+            return {
+                'depth': len(self._queue),
+                'max_depth': self.max_depth,
+                'peak_depth': self.peak_depth,
+                'speaking': self._current is not None,
+                'submitted': self.submitted,
+                'spoken': self.spoken,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped,
+                'cancelled': self.cancelled,
+                'interrupted': self.interrupted,
+            }